@@ -8,7 +8,7 @@ import os
 import atexit
 import logging
 from extensions import db
-from websocket_handler import socketio
+from websocket_handler import socketio, broadcast_sentiment
 from datetime import datetime # Added for BVC stocks endpoint
 
 # Configure logging
@@ -53,16 +53,22 @@ socketio.init_app(app, cors_allowed_origins="*", async_mode='threading')
 from models import User, Challenge, Trade, Transaction
 
 # Register Blueprints
-from modules.challenge import challenge_bp, evaluate_all_challenges
-from modules.trading import trading_bp
+from modules.challenge import challenge_bp, evaluate_all_challenges, take_equity_snapshots
+from modules.trading import trading_bp, get_live_prices
+from modules.equity_engine import equity_engine
 from modules.payment import payment_bp
-from modules.leaderboard import leaderboard_bp
+from modules.leaderboard import leaderboard_bp, on_challenge_transitions
 from modules.auth import auth_bp
 from modules.profile import profile_bp
 from modules.ai_chat import ai_chat_bp
-from modules.macro_sentiment import macro_sentiment_bp
+from modules.macro_sentiment import macro_sentiment_bp, macro_board
 from modules.gemini_chat import gemini_chat_bp
 from modules.admin import admin_bp
+from modules.platform_metrics import rollup_daily_metrics
+from modules.bvc_board import bvc_board
+from modules.quote_engine import quote_engine
+from modules.tick_store import tick_store
+from modules.sentiment_stream import sentiment_stream
 # from modules.community import community_bp  # Temporairement désactivé - nécessite création tables
 
 app.register_blueprint(challenge_bp)
@@ -80,10 +86,49 @@ app.register_blueprint(admin_bp)
 # Background Scheduler
 def run_schedule():
     with app.app_context():
-        evaluate_all_challenges()
+        transitions = evaluate_all_challenges()
+        equity_engine.deactivate([challenge_id for challenge_id, _ in transitions])
+        on_challenge_transitions(transitions)
+
+def run_equity_refresh():
+    # Marque au marché les positions ouvertes: seuls les challenges exposés aux symboles cotés sont réévalués
+    equity_engine.on_prices(get_live_prices(equity_engine.symbols()))
+
+def run_session_rollover():
+    # Clôt la séance: dernier flush des plus hauts, puis snapshot de début de séance
+    with app.app_context():
+        equity_engine.flush_high_water_marks()
+        take_equity_snapshots()
+
+def run_high_water_mark_flush():
+    with app.app_context():
+        equity_engine.flush_high_water_marks()
+
+def run_metrics_rollup():
+    # Agrège dans daily_platform_metrics les seules lignes postérieures au watermark
+    with app.app_context():
+        rollup_daily_metrics()
+
+# Historique local: chaque cotation récupérée (Yahoo Finance, tableau BVC) est conservée
+quote_engine.add_listener(tick_store.record_quotes)
+bvc_board.add_listener(tick_store.record_board)
+# Score de sentiment: poussé aux clients Socket.IO quand il change de bande
+sentiment_stream.add_listener(broadcast_sentiment)
 
 scheduler = BackgroundScheduler()
 scheduler.add_job(func=run_schedule, trigger="interval", seconds=60)
+scheduler.add_job(func=run_equity_refresh, trigger="interval", seconds=5)
+scheduler.add_job(func=run_high_water_mark_flush, trigger="interval", seconds=60)
+scheduler.add_job(func=run_metrics_rollup, trigger="interval", minutes=5)
+# Vérifie toutes les 30 s; scrape toutes les minutes en séance BVC, toutes les 15 minutes hors séance
+scheduler.add_job(func=bvc_board.refresh_if_due, trigger="interval", seconds=30)
+# Indicateurs macro: nouveau snapshot toutes les 4 minutes, tickers téléchargés en parallèle
+scheduler.add_job(func=macro_board.refresh_if_due, trigger="interval", seconds=30)
+# Score de sentiment: point courant chaque minute, depuis les séries du cache de barres (fins retéléchargées toutes les 5 minutes)
+scheduler.add_job(func=sentiment_stream.update, trigger="interval", seconds=60)
+# Écrit les barres 1 minute des symboles qui n'ont plus reçu de tick
+scheduler.add_job(func=tick_store.flush_bars, trigger="interval", seconds=60)
+scheduler.add_job(func=run_session_rollover, trigger="cron", hour=0, minute=0, timezone="UTC")
 scheduler.start()
 
 # Shut down the scheduler when exiting the app
@@ -93,6 +138,21 @@ atexit.register(lambda: scheduler.shutdown())
 with app.app_context():
     db.create_all()
 
+# Load open positions into the real-time equity engine
+equity_engine.init_app(app)
+
+# Make sure today's start-of-day snapshot exists (no-op if already taken)
+# and catch the daily metrics rollup up (backfills the history on first start)
+with app.app_context():
+    take_equity_snapshots()
+    rollup_daily_metrics()
+
+# First BVC board, macro indicator and sentiment snapshots in the background: requests never wait on
+# casablanca-bourse.com or Yahoo Finance
+scheduler.add_job(func=bvc_board.refresh_if_due)
+scheduler.add_job(func=macro_board.refresh_if_due)
+scheduler.add_job(func=sentiment_stream.update)
+
 @app.route('/')
 def home():
     return {"message": "TradeOrange Backend is Running", "version": "2.0", "status": "active"}
@@ -104,6 +164,9 @@ def get_market_data(symbol):
         import yfinance as yf
         ticker = yf.Ticker(symbol)
         data = ticker.history(period='1d', interval='1m')
+        if not data.empty:
+            tick_store.record_bars(symbol, data.index, data['Open'], data['High'], data['Low'],
+                                   data['Close'], data['Volume'])
         
         return jsonify({
             'success': True,
@@ -117,35 +180,37 @@ def get_market_data(symbol):
 def get_bvc_stocks():
     """Get Moroccan stocks from Bourse de Casablanca (public endpoint)"""
     try:
-        from modules.bvc_scraper import BVCScraper
-        
-        scraper = BVCScraper()
+        # Served from the in-memory BVC board snapshot, refreshed by the scheduler
         symbols_param = request.args.get('symbols')
         
         if symbols_param:
             symbols = [s.strip() for s in symbols_param.split(',')]
-            stocks_data = scraper.get_multiple_stocks(symbols)
         else:
             # Default main Moroccan stocks
-            default_symbols = ['IAM', 'ATW', 'BCP', 'CIH', 'BOA', 'LHM', 'ADH']
-            stocks_data = scraper.get_multiple_stocks(default_symbols)
+            symbols = ['IAM', 'ATW', 'BCP', 'CIH', 'BOA', 'LHM', 'ADH']
+        
+        def build(snapshot):
+            stocks_list = []
+            for symbol, data in snapshot.get_many(symbols).items():
+                stocks_list.append({
+                    'symbol': symbol,
+                    'name': symbol,
+                    'price': data.get('price', 0),
+                    'currency': data.get('currency', 'MAD'),
+                    'source': data.get('source', 'BVC'),
+                    'timestamp': data.get('timestamp', datetime.now().isoformat()),
+                    'status': 'success' if data.get('price', 0) > 0 else 'error'
+                })
+            return stocks_list
         
-        stocks_list = []
-        for symbol, data in stocks_data.items():
-            stocks_list.append({
-                'symbol': symbol,
-                'name': symbol,
-                'price': data.get('price', 0),
-                'currency': data.get('currency', 'MAD'),
-                'source': data.get('source', 'BVC'),
-                'timestamp': data.get('timestamp', datetime.now().isoformat()),
-                'status': 'success' if data.get('price', 0) > 0 else 'error'
-            })
+        # Formatted once per snapshot and symbol list
+        stocks_list = bvc_board.cached(f"public-stocks:{','.join(symbols)}", build)
         
         return jsonify({
             'success': True,
             'count': len(stocks_list),
-            'stocks': stocks_list
+            'stocks': stocks_list,
+            'snapshot': bvc_board.snapshot.metadata()
         }), 200
         
     except Exception as e:
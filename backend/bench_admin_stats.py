@@ -0,0 +1,143 @@
+"""
+Benchmark des statistiques du tableau de bord admin
+Seeds users, challenges and 1M transactions, then compares one refresh of
+the dashboard + financial summary:
+- legacy: the twelve COUNT/SUM queries the endpoints used to run
+- aggregated: compute_platform_stats(), one aggregate query per table
+- cached: platform_stats.get() while the cached result is fresh
+
+SQLite is always measured (temporary file). PostgreSQL is measured when a
+connection URI is given with --postgres or the BENCH_POSTGRES_URI variable;
+its tables are dropped and recreated, so use a scratch database.
+
+Usage: python bench_admin_stats.py [--transactions 1000000] [--users 10000] [--repeat 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import func
+
+from extensions import db
+from models import User, Challenge, Transaction
+from modules.admin_stats import compute_platform_stats, platform_stats
+
+
+def create_app(uri):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    db.init_app(app)
+    return app
+
+
+def seed(n_users, n_transactions, chunk=50000):
+    db.drop_all()
+    db.create_all()
+    rng = np.random.default_rng(3)
+    now = datetime.utcnow()
+
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'x',
+         'role': 'admin' if i % 500 == 0 else 'trader', 'is_suspended': bool(i % 50 == 0),
+         'created_at': now - timedelta(days=int(d))}
+        for i, d in enumerate(rng.integers(0, 365, n_users))])
+
+    statuses = np.array(['active', 'failed', 'funded'])
+    db.session.execute(Challenge.__table__.insert(), [
+        {'user_id': 1 + i % n_users, 'status': str(s), 'start_balance': 10000.0, 'current_equity': 10000.0}
+        for i, s in enumerate(statuses[rng.integers(0, 3, n_users * 5)])])
+
+    types = np.array(['payment', 'deposit', 'withdrawal'])
+    tx_statuses = np.array(['pending', 'approved', 'completed', 'rejected'])
+    for offset in range(0, n_transactions, chunk):
+        size = min(chunk, n_transactions - offset)
+        db.session.execute(Transaction.__table__.insert(), [
+            {'user_id': 1 + (offset + i) % n_users, 'amount': float(a), 'type': str(t), 'status': str(s),
+             'timestamp': now - timedelta(minutes=offset + i)}
+            for i, (a, t, s) in enumerate(zip(rng.uniform(10, 1000, size).round(2),
+                                             types[rng.integers(0, 3, size)],
+                                             tx_statuses[rng.integers(0, 4, size)]))])
+    db.session.commit()
+
+
+def legacy_stats():
+    """Les requêtes d'origine de get_dashboard_stats et get_financial_summary"""
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+    return {
+        'users': [User.query.count(), User.query.filter_by(is_suspended=False).count(),
+                  User.query.filter_by(role='admin').count(),
+                  User.query.filter(User.created_at >= thirty_days_ago).count()],
+        'challenges': [Challenge.query.count(), Challenge.query.filter_by(status='active').count(),
+                       Challenge.query.filter_by(status='funded').count()],
+        'pending': Transaction.query.filter_by(status='pending').count(),
+        'trading_volume': db.session.query(func.sum(Challenge.current_equity)).filter(
+            Challenge.status == 'active').scalar() or 0,
+        'financials': [
+            db.session.query(func.sum(Transaction.amount)).filter(
+                Transaction.type == 'deposit', Transaction.status == 'approved').scalar() or 0,
+            db.session.query(func.sum(Transaction.amount)).filter(
+                Transaction.type == 'withdrawal', Transaction.status == 'approved').scalar() or 0,
+            db.session.query(func.sum(Transaction.amount)).filter(
+                Transaction.type == 'withdrawal', Transaction.status == 'pending').scalar() or 0,
+            db.session.query(func.sum(Transaction.amount)).filter(
+                Transaction.type == 'payment',
+                Transaction.status.in_(['approved', 'completed'])).scalar() or 0,
+        ]
+    }
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def run(label, uri, args):
+    app = create_app(uri)
+    with app.app_context():
+        seed(args.users, args.transactions)
+
+        legacy_ms, legacy = timed(legacy_stats, args.repeat)
+        aggregated_ms, stats = timed(compute_platform_stats, args.repeat)
+
+        assert legacy['users'] == list(stats['users'].values())
+        assert legacy['challenges'] == list(stats['challenges'].values())
+        assert legacy['pending'] == stats['transactions']['pending']
+        assert np.allclose(legacy['financials'], list(stats['financials'].values()))
+
+        platform_stats.invalidate()
+        platform_stats.get()
+        cached_ms, _ = timed(platform_stats.get, args.repeat)
+
+        print(f"{label:>10} | {args.transactions:>12} | {legacy_ms:>11.1f} | {aggregated_ms:>15.1f} | {cached_ms:>11.4f}")
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--transactions', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--postgres', default=os.getenv('BENCH_POSTGRES_URI'))
+    args = parser.parse_args()
+
+    print(f"{'database':>10} | {'transactions':>12} | {'legacy (ms)':>11} | {'aggregated (ms)':>15} | {'cached (ms)':>11}")
+    print("-" * 72)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run('sqlite', 'sqlite:///' + os.path.join(tmp, 'bench.db'), args)
+
+    if args.postgres:
+        run('postgresql', args.postgres, args)
+    else:
+        print("\nPostgreSQL skipped (set --postgres or BENCH_POSTGRES_URI)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark du parsing HTML des pages BVC
+Parses the saved pages in fixtures/bvc/ with the previous BeautifulSoup code
+(html.parser tree, get_text() and a regex on every cell) and with the lxml
+single-pass parser, and reports for each page:
+- parse time (median over --repeat runs)
+- peak Python memory during one parse (tracemalloc)
+  (Python heap only: libxml2 builds its tree with malloc, which tracemalloc
+  does not see; that tree is freed when the parse returns)
+
+Pages:
+- cours_bourse.html: bourseweb/Cours-Bourse.aspx, prices of the 12 BVCScraper symbols
+- cotations_actions.html: /fr/cotations/actions, full board of CasablancaBourseScaper
+
+Both implementations must produce the same output.
+
+Usage: python bench_bvc_parser.py [--repeat 20]
+"""
+import argparse
+import functools
+import os
+import re
+import statistics
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from casablanca_bourse_scraper import CasablancaBourseScaper
+from modules.bvc_parser import parse_quotation_rows
+from modules.bvc_scraper import BVCScraper
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'bvc')
+
+
+def legacy_prices(content, symbols):
+    """_extract_price_from_html d'origine, un appel par symbole sur le même arbre"""
+    soup = BeautifulSoup(content, 'html.parser')
+    prices = {}
+    for symbol in symbols:
+        for table in soup.find_all('table'):
+            for row in table.find_all('tr'):
+                if row.find('table'):
+                    continue  # lignes de mise en page, ignorées par les deux parseurs
+                cells = row.find_all(['td', 'th'])
+                if any(symbol in cell.get_text().strip() for cell in cells):
+                    for cell in cells:
+                        match = re.search(r'(\d+[\.,]\d+)', cell.get_text().strip())
+                        if match:
+                            prices[symbol] = float(match.group(1).replace(',', '.'))
+                            break
+                    if symbol in prices:
+                        break
+            if symbol in prices:
+                break
+    return prices
+
+
+def fast_prices(content, symbols):
+    return BVCScraper()._build_price_index(parse_quotation_rows(content), symbols)
+
+
+def legacy_stocks(content):
+    """scrape_stocks_from_html d'origine, sans le téléchargement"""
+    scraper = CasablancaBourseScaper()
+    soup = BeautifulSoup(content, 'html.parser')
+    tables = soup.find_all('table', {'class': ['table', 'quotation', 'cours']}) or soup.find_all('table')
+    stocks = []
+    for table in tables:
+        for row in table.find_all('tr')[1:]:
+            cols = row.find_all(['td', 'th'])
+            if len(cols) >= 4:
+                stock = {
+                    'nom': cols[0].text.strip(),
+                    'symbole': cols[1].text.strip(),
+                    'dernier_cours': scraper._parse_number(cols[2].text),
+                    'variation_pct': scraper._parse_number(cols[3].text),
+                    'volume': scraper._parse_number(cols[4].text if len(cols) > 4 else '0'),
+                    'capitalisation': scraper._parse_number(cols[5].text if len(cols) > 5 else '0'),
+                }
+                if stock['nom'] and stock['nom'] != 'N/A':
+                    stocks.append(stock)
+    return stocks
+
+
+def fast_stocks(content):
+    stocks = CasablancaBourseScaper().parse_stocks(content)
+    for stock in stocks:
+        del stock['isin'], stock['date_extraction']
+    return stocks
+
+
+def measure(parse, content, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse(content)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    result = parse(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    symbols = set(BVCScraper.SYMBOL_MAP)
+    cases = [
+        ('cours_bourse.html', functools.partial(legacy_prices, symbols=symbols),
+         functools.partial(fast_prices, symbols=symbols)),
+        ('cotations_actions.html', legacy_stocks, fast_stocks),
+    ]
+
+    print(f"{'page':>24} | {'parser':>6} | {'time (ms)':>10} | {'peak (KiB)':>10} | rows")
+    print("-" * 70)
+    for name, legacy, fast in cases:
+        with open(os.path.join(FIXTURES, name), 'rb') as f:
+            content = f.read()
+        expected, *legacy_stats = measure(legacy, content, args.repeat)
+        result, *fast_stats = measure(fast, content, args.repeat)
+        assert result == expected, f"{name}: outputs differ"
+
+        for label, (elapsed, peak) in (('bs4', legacy_stats), ('lxml', fast_stats)):
+            print(f"{name:>24} | {label:>6} | {elapsed * 1000:>10.2f} | {peak / 1024:>10.0f} | {len(result)}")
+        print(f"{'':>24} | {'':>6} | {legacy_stats[0] / fast_stats[0]:>9.1f}x | "
+              f"{legacy_stats[1] / fast_stats[1]:>9.1f}x |")
+
+    print("\nSame output for both parsers on every page")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark du scraper BVC multi-symboles
+Serves a synthetic Cours-Bourse.aspx board (and Boursorama pages) from an
+in-process fake HTTP session with a fixed latency, then compares for the 12
+known symbols:
+- legacy: get_stock_price() per symbol (one page download + parse each)
+- batch: get_multiple_stocks(), one download + one parse, misses fetched concurrently
+
+Usage: python bench_bvc_scraper.py [--latency 0.2] [--rows 75]
+"""
+import argparse
+import threading
+import time
+
+from modules.bvc_scraper import BVCScraper
+
+# Absents du tableau de cotation: IAM et ATW sont servis par Boursorama, ONA par le prix de démo
+DELISTED = {'IAM', 'ATW', 'ONA'}
+
+
+def board_html(rows):
+    """Tableau de cotation: les symboles connus puis des valeurs de remplissage"""
+    symbols = [s for s in BVCScraper.SYMBOL_MAP if s not in DELISTED]
+    symbols += [f'V{i:02d}X' for i in range(max(rows - len(symbols), 0))]
+    lines = ['<html><body><table><tr><th>Valeur</th><th>Cours</th><th>Variation</th><th>Volume</th></tr>']
+    for i, symbol in enumerate(symbols):
+        lines.append(f'<tr><td>{symbol}</td><td>{100 + i},{i % 100:02d}</td>'
+                     f'<td>{i % 7 - 3},00%</td><td>{1000 * i}</td></tr>')
+    lines.append('</table></body></html>')
+    return '\n'.join(lines).encode()
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Remplace requests.Session: latence fixe, compte les requêtes par hôte"""
+
+    def __init__(self, board, latency):
+        self.board = board
+        self.latency = latency
+        self.headers = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=None):
+        time.sleep(self.latency)
+        host = url.split('/')[2]
+        with self._lock:
+            self.requests[host] = self.requests.get(host, 0) + 1
+        if 'boursorama' in url:
+            return FakeResponse(b'<html><span class="c-instrument--last">121,30</span></html>')
+        return FakeResponse(self.board)
+
+
+def run(label, fetch, board, latency):
+    scraper = BVCScraper()
+    scraper.session = FakeSession(board, latency)
+    started = time.perf_counter()
+    quotes = fetch(scraper)
+    elapsed = time.perf_counter() - started
+    total = sum(scraper.session.requests.values())
+    print(f"{label:>8} | {elapsed * 1000:>10.0f} | {total:>8} | {scraper.session.requests}")
+    return quotes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--rows', type=int, default=75)
+    args = parser.parse_args()
+
+    board = board_html(args.rows)
+    symbols = list(BVCScraper.SYMBOL_MAP)
+
+    print(f"{'mode':>8} | {'time (ms)':>10} | {'requests':>8} | per host")
+    print("-" * 70)
+    legacy = run('legacy', lambda s: {sym: s.get_stock_price(sym) for sym in symbols}, board, args.latency)
+    batch = run('batch', lambda s: s.get_multiple_stocks(symbols), board, args.latency)
+
+    assert {k: (v['price'], v['source']) for k, v in legacy.items()} == \
+        {k: (v['price'], v['source']) for k, v in batch.items()}
+    print(f"\nSame prices and sources for {len(batch)} symbols")
+
+
+if __name__ == '__main__':
+    main()
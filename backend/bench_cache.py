@@ -0,0 +1,173 @@
+"""
+Benchmark du cache de réponses (modules/cache.py)
+- reads: lookups per second from --threads threads on a warm cache, memory
+  and SQLite backends, against the former module-level dicts
+- bounds: 10 000 distinct keys through a cache limited to 500 entries /
+  1 MiB, which must stay within both limits
+- single-flight: --threads threads miss the same key at once, the loader
+  must run once
+- workers: --workers processes (as gunicorn workers) request the macro
+  responses in turn; with the memory backend each one recomputes them, with
+  the SQLite backend only the first one does
+
+Usage: python bench_cache.py [--threads 8] [--workers 4] [--load-time 0.2]
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from modules.cache import Cache, MemoryBackend, SQLiteBackend
+
+MACRO_KEYS = ['sentiment_score'] + [f'correlation_{p}' for p in ('1mo', '3mo', '6mo', '1y')] + [
+    f'historical_{t}_{p}' for t in ('^TNX', '^VIX', 'CL=F', 'GC=F') for p in ('1mo', '6mo', '1y')
+]
+
+
+def payload(key):
+    # Ordre de grandeur d'une réponse macro en colonnes (~20 KiB)
+    return {'success': True, 'key': key, 'series': {'dates': ['2026-01-01'] * 500, 'close': [100.0] * 500}}
+
+
+class LegacyDictCache:
+    """Les dicts de module de macro_sentiment avant modules/cache.py"""
+
+    def __init__(self):
+        self._cache, self._cache_expiry = {}, {}
+
+    def get(self, key):
+        if key in self._cache and key in self._cache_expiry:
+            if time.time() < self._cache_expiry[key]:
+                return self._cache[key]
+        return None
+
+    def set(self, key, data):
+        self._cache[key] = data
+        self._cache_expiry[key] = time.time() + 300
+
+
+def read_rate(get, keys, threads, seconds=1.0):
+    counts = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def reader(i):
+        n = 0
+        while time.perf_counter() < stop:
+            for key in keys:
+                get(key)
+            n += len(keys)
+        counts[i] = n
+
+    workers = [threading.Thread(target=reader, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / seconds
+
+
+def worker(path, backend, load_time, start, results):
+    # Chaque worker démarre quand le précédent a servi ses requêtes (trafic réparti entre workers)
+    cache = Cache('macro', ttl=300, backend=SQLiteBackend('macro', path) if backend == 'sqlite' else None)
+    loads = 0
+
+    def load(key):
+        nonlocal loads
+        loads += 1
+        time.sleep(load_time)
+        return payload(key)
+
+    start.wait()
+    started = time.perf_counter()
+    for key in MACRO_KEYS:
+        cache.get_or_load(key, lambda: load(key))
+    results.put((os.getpid(), loads, time.perf_counter() - started, cache.stats()['hit_ratio']))
+
+
+def run_workers(backend, count, load_time, root):
+    path = os.path.join(root, f'{backend}.sqlite3')
+    results = multiprocessing.Queue()
+    total_loads = 0
+    elapsed = []
+    for _ in range(count):
+        start = multiprocessing.Event()
+        process = multiprocessing.Process(target=worker, args=(path, backend, load_time, start, results))
+        process.start()
+        start.set()
+        _, loads, seconds, _ = results.get()
+        process.join()
+        total_loads += loads
+        elapsed.append(seconds)
+    return total_loads, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--load-time', type=float, default=0.2)
+    args = parser.parse_args()
+    root = tempfile.mkdtemp(prefix='cache_')
+
+    # Lectures sur un cache chaud
+    legacy = LegacyDictCache()
+    memory = Cache('bench-memory', ttl=300)
+    sqlite = Cache('bench-sqlite', ttl=300, backend=SQLiteBackend('bench', os.path.join(root, 'reads.sqlite3')))
+    for key in MACRO_KEYS:
+        legacy.set(key, payload(key))
+        memory.set(key, payload(key))
+        sqlite.set(key, payload(key))
+    print(f"reads, {args.threads} threads, warm")
+    print(f"  module dicts (no bound, no lock)  {read_rate(legacy.get, MACRO_KEYS, args.threads):>12,.0f} /s")
+    print(f"  Cache + MemoryBackend             {read_rate(memory.get, MACRO_KEYS, args.threads):>12,.0f} /s")
+    print(f"  Cache + SQLiteBackend             {read_rate(sqlite.get, MACRO_KEYS, args.threads):>12,.0f} /s")
+
+    # Bornes: nombre d'entrées et budget mémoire
+    for backend in (MemoryBackend(), SQLiteBackend('bounds', os.path.join(root, 'bounds.sqlite3'))):
+        bounded = Cache('bench-bounds', ttl=300, max_entries=500, max_bytes=1024 * 1024, backend=backend)
+        peak = (0, 0)
+        for i in range(10_000):
+            bounded.set(f'key-{i}', {'i': i, 'blob': 'x' * (i % 4000)})
+            if i % 50 == 0:
+                entries, size = backend.usage()
+                peak = (max(peak[0], entries), max(peak[1], size))
+        stats = bounded.stats()
+        print(f"\nbounds {type(backend).__name__}: 10,000 keys -> {stats['entries']} entries, "
+              f"{stats['bytes'] / 1024:.0f} KiB, {stats['evictions']} evicted, peak {peak[0]} / {peak[1] / 1024:.0f} KiB")
+        assert peak[0] <= 500 and peak[1] <= 1024 * 1024
+
+    # Single-flight
+    flight = Cache('bench-flight', ttl=300)
+    calls = []
+    barrier = threading.Barrier(args.threads)
+
+    def slow():
+        calls.append(1)
+        time.sleep(args.load_time)
+        return payload('sentiment_score')
+
+    def client():
+        barrier.wait()
+        flight.get_or_load('sentiment_score', slow)
+
+    threads = [threading.Thread(target=client) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"\nsingle-flight: {args.threads} concurrent misses -> {len(calls)} load")
+    assert len(calls) == 1
+
+    # Workers: réponses recalculées par chaque processus, ou partagées par le fichier SQLite
+    print(f"\n{args.workers} workers x {len(MACRO_KEYS)} macro responses ({args.load_time * 1000:.0f} ms each)")
+    for backend in ('memory', 'sqlite'):
+        loads, elapsed = run_workers(backend, args.workers, args.load_time, root)
+        print(f"  {backend:>6}: {loads:>3} loads, per worker {' '.join(f'{e * 1000:.0f}' for e in elapsed)} ms")
+    shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
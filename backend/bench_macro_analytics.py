@@ -0,0 +1,160 @@
+"""
+Benchmark du noyau d'analyse macro
+Builds the correlation (SPY vs TNX) and historical payloads from synthetic
+bars with:
+- legacy: the previous pandas code (normalization per request, items() /
+  iterrows() loops building one dict per row, corr(), pct_change().std())
+- kernel: modules/macro_analytics (one vectorized pass, columnar payload)
+for 2 years of daily bars and 1 year of hourly bars, and reports build time
+and JSON size. Statistics must match.
+
+Usage: python bench_macro_analytics.py [--repeat 20]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.macro_analytics import (
+    PERIODS_PER_YEAR, analyze_pair, date_column, frame_arrays, summarize, value_column
+)
+
+CASES = {
+    '2y daily': (pd.bdate_range('2024-10-17', '2026-10-16'), '1d'),
+    '1y hourly': (
+        pd.DatetimeIndex([day + pd.Timedelta(hours=13 + h) for day in pd.bdate_range('2025-10-17', '2026-10-16')
+                          for h in range(7)]),
+        '1h'
+    ),
+}
+
+
+def bars(index, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    return pd.DataFrame({
+        'Open': close * 0.999, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+        'Volume': rng.integers(1000, 10000, len(index)).astype(float)
+    }, index=index)
+
+
+def legacy_correlation(spy_data, tnx_data):
+    spy_normalized = (spy_data['Close'] / spy_data['Close'].iloc[0]) * 100
+    tnx_normalized = (tnx_data['Close'] / tnx_data['Close'].iloc[0]) * 100
+    merged = pd.DataFrame({'SPY': spy_data['Close'], 'TNX': tnx_data['Close']}).dropna()
+    correlation = merged['SPY'].corr(merged['TNX'])
+    spy_chart_data = [{'date': date.strftime('%Y-%m-%d'), 'value': round(float(value), 2)}
+                      for date, value in spy_normalized.items()]
+    tnx_chart_data = [{'date': date.strftime('%Y-%m-%d'), 'value': round(float(value), 2)}
+                      for date, value in tnx_normalized.items()]
+    return {
+        'correlation': round(float(correlation), 3),
+        'spy_data': spy_chart_data,
+        'tnx_data': tnx_chart_data,
+        'spy_performance': round(float((spy_data['Close'].iloc[-1] / spy_data['Close'].iloc[0] - 1) * 100), 2),
+        'tnx_performance': round(float((tnx_data['Close'].iloc[-1] / tnx_data['Close'].iloc[0] - 1) * 100), 2),
+    }
+
+
+def kernel_correlation(spy_data, tnx_data, periods_per_year):
+    spy_index, spy_close = frame_arrays(spy_data)
+    tnx_index, tnx_close = frame_arrays(tnx_data)
+    analysis = analyze_pair(spy_index, spy_close['Close'], tnx_index, tnx_close['Close'], periods_per_year)
+    spy, tnx = analysis['a'], analysis['b']
+    return {
+        'correlation': round(analysis['correlation'], 3),
+        'series': {
+            'dates': date_column(analysis['index']),
+            'spy': value_column(spy['normalized']),
+            'tnx': value_column(tnx['normalized']),
+            'rolling_correlation': value_column(analysis['rolling_correlation'], 3),
+        },
+        'spy_performance': round(float(spy['performance']), 2),
+        'tnx_performance': round(float(tnx['performance']), 2),
+        'volatility': {'spy': round(spy['volatility'], 2), 'tnx': round(tnx['volatility'], 2)},
+        'max_drawdown': {'spy': round(spy['max_drawdown'], 2), 'tnx': round(tnx['max_drawdown'], 2)},
+    }
+
+
+def legacy_historical(data):
+    chart_data = []
+    for date, row in data.iterrows():
+        chart_data.append({
+            'date': date.strftime('%Y-%m-%d'),
+            'open': round(float(row['Open']), 2),
+            'high': round(float(row['High']), 2),
+            'low': round(float(row['Low']), 2),
+            'close': round(float(row['Close']), 2),
+            'volume': int(row['Volume']) if 'Volume' in row and not pd.isna(row['Volume']) else 0
+        })
+    return {'data': chart_data, 'stats': {
+        'current': round(float(data['Close'].iloc[-1]), 2),
+        'min': round(float(data['Close'].min()), 2),
+        'max': round(float(data['Close'].max()), 2),
+        'average': round(float(data['Close'].mean()), 2),
+        'volatility': round(float(data['Close'].pct_change().std() * np.sqrt(252) * 100), 2),
+    }}
+
+
+def kernel_historical(data, periods_per_year):
+    index, columns = frame_arrays(data, ('Open', 'High', 'Low', 'Close', 'Volume'))
+    stats = summarize(columns['Close'], periods_per_year)
+    return {'data': {
+        'dates': date_column(index),
+        'open': value_column(columns['Open']),
+        'high': value_column(columns['High']),
+        'low': value_column(columns['Low']),
+        'close': value_column(columns['Close']),
+        'volume': np.nan_to_num(columns['Volume']).astype(np.int64).tolist(),
+    }, 'stats': {
+        'current': round(stats['current'], 2), 'min': round(stats['min'], 2), 'max': round(stats['max'], 2),
+        'average': round(stats['average'], 2), 'volatility': round(stats['volatility'], 2),
+        'max_drawdown': round(stats['max_drawdown'], 2),
+    }}
+
+
+def timed(build, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = json.dumps(build())
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2], len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'input':>10} | {'payload':>11} | {'mode':>6} | {'time (ms)':>9} | {'JSON (KiB)':>10}")
+    print("-" * 60)
+    for label, (index, interval) in CASES.items():
+        spy, tnx = bars(index, 1), bars(index, 2)
+        periods_per_year = PERIODS_PER_YEAR[interval]
+
+        old, new = legacy_correlation(spy, tnx), kernel_correlation(spy, tnx, periods_per_year)
+        assert old['correlation'] == new['correlation']
+        assert [d['value'] for d in old['spy_data']] == new['series']['spy']
+        assert (old['spy_performance'], old['tnx_performance']) == (new['spy_performance'], new['tnx_performance'])
+        old, new = legacy_historical(spy), kernel_historical(spy, 252)
+        assert old['stats'] == {k: v for k, v in new['stats'].items() if k != 'max_drawdown'}
+        assert [d['close'] for d in old['data']] == new['data']['close']
+
+        builds = [
+            ('correlation', lambda: legacy_correlation(spy, tnx), lambda: kernel_correlation(spy, tnx, periods_per_year)),
+            ('historical', lambda: legacy_historical(spy), lambda: kernel_historical(spy, periods_per_year)),
+        ]
+        for payload, legacy, kernel in builds:
+            for mode, build in (('legacy', legacy), ('kernel', kernel)):
+                elapsed, size = timed(build, args.repeat)
+                print(f"{label:>10} | {payload:>11} | {mode:>6} | {elapsed * 1000:>9.2f} | {size / 1024:>10.1f}")
+        print(f"{'':>10} | {len(index)} bars")
+
+    print("\nSame correlation, normalized series, performance and stats as the previous code")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark du cache de barres des endpoints macro
+Replays the downloads behind one refresh of every macro endpoint (indicators,
+correlation and historical for each period, sentiment score) against a fake
+Yahoo Finance with a fixed latency, and counts downloads and bars received:
+- legacy: one yf.download per (ticker, period), as before
+- cold: empty cache directory, one full history per ticker
+- warm: same process, series fresh in memory
+- restart: new process on the same directory once the series are stale,
+  only the tails are downloaded
+
+Every period served by the cache must equal a direct download of that period.
+
+Usage: python bench_macro_bar_cache.py [--latency 0.3]
+"""
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.bar_cache import BarCache, PERIODS, _today
+from modules.macro_sentiment import MACRO_INDICATORS
+
+CORRELATION_PERIODS = ['1mo', '3mo', '6mo', '1y']
+HISTORICAL_PERIODS = ['1mo', '3mo', '6mo', '1y', '2y']
+
+
+def requests_per_refresh():
+    """(ticker, période) téléchargés par un rafraîchissement de tous les endpoints macro"""
+    requests = [(ticker, '5d') for ticker in MACRO_INDICATORS]
+    requests += [(ticker, period) for period in CORRELATION_PERIODS for ticker in ('SPY', '^TNX')]
+    requests += [(ticker, period) for period in HISTORICAL_PERIODS for ticker in MACRO_INDICATORS]
+    requests += [('^VIX', '5d'), ('SPY', '1mo')]
+    return requests
+
+
+class FakeYahoo:
+    """Barres quotidiennes déterministes par ticker; latence fixe, compte appels et barres"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.bars = 0
+        self._lock = threading.Lock()
+        days = pd.bdate_range(_today() - pd.DateOffset(years=3), _today())
+        self.history = {}
+        for i, ticker in enumerate(sorted(set(t for t, _ in requests_per_refresh()))):
+            rng = np.random.default_rng(i)
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(days))))
+            self.history[ticker] = pd.DataFrame({
+                'Open': close * 0.999, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                'Volume': rng.integers(1000, 10000, len(days)).astype(float)
+            }, index=days)
+
+    def download(self, ticker, start, interval='1d'):
+        time.sleep(self.latency)
+        frame = self.history[ticker][self.history[ticker].index >= start]
+        with self._lock:
+            self.calls += 1
+            self.bars += len(frame)
+        return frame
+
+    def reset(self):
+        self.calls = self.bars = 0
+
+
+def run(label, fake, fetch):
+    fake.reset()
+    started = time.perf_counter()
+    results = {(ticker, period): fetch(ticker, period) for ticker, period in requests_per_refresh()}
+    elapsed = time.perf_counter() - started
+    print(f"{label:>8} | {elapsed * 1000:>9.0f} | {fake.calls:>9} | {fake.bars:>8}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.3)
+    args = parser.parse_args()
+
+    fake = FakeYahoo(args.latency)
+    root = tempfile.mkdtemp(prefix='bars_')
+
+    print(f"{'mode':>8} | {'time (ms)':>9} | {'downloads':>9} | {'bars':>8}")
+    print("-" * 46)
+    legacy = run('legacy', fake, lambda ticker, period: fake.download(ticker, _today() - PERIODS[period]))
+
+    cache = BarCache(root, downloader=fake.download)
+    cold = run('cold', fake, cache.get)
+    run('warm', fake, cache.get)
+
+    # Redémarrage une heure plus tard: séries sur disque périmées
+    for (ticker, interval), (frame, fetched_at) in cache._series.items():
+        cache._save(ticker, interval, frame, fetched_at - 3600)
+    restarted = BarCache(root, downloader=fake.download)
+    restart = run('restart', fake, restarted.get)
+    shutil.rmtree(root)
+
+    for results in (cold, restart):
+        for key, frame in results.items():
+            expected = legacy[key]
+            assert frame.index.equals(expected.index), key
+            assert np.allclose(frame.to_numpy(), expected.to_numpy()), key
+    print(f"\nSame bars as direct downloads for all {len(legacy)} distinct (ticker, period) pairs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark de la matrice de corrélation macro
+Computes the correlations of every pair among SPY and the MACRO_INDICATORS
+tickers, over 6 months and 2 years, against the fake Yahoo Finance of
+bench_macro_bar_cache (fixed latency):
+- pairwise: what one more pair endpoint per pair would cost, two downloads
+  per pair, pandas corr() and rolling(window).corr() on the merged pair
+- panel: bar cache (one download per ticker, then slices), one aligned
+  panel, correlation_matrix / rolling_correlation_matrix
+
+Matrix and rolling values must match pandas.
+
+Usage: python bench_macro_correlation_matrix.py [--latency 0.3]
+"""
+import argparse
+import itertools
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_macro_bar_cache import FakeYahoo
+from modules.bar_cache import BarCache, PERIODS, _today
+from modules.macro_analytics import ROLLING_WINDOW, analyze_panel, frame_arrays
+from modules.macro_sentiment import MACRO_INDICATORS, MATRIX_BENCHMARKS
+
+TICKERS = MATRIX_BENCHMARKS + list(MACRO_INDICATORS)
+MATRIX_PERIODS = ['6mo', '2y']
+
+
+def pairwise(fake, period):
+    start = _today() - PERIODS[period]
+    matrix = pd.DataFrame(np.eye(len(TICKERS)), index=TICKERS, columns=TICKERS)
+    rolling = {}
+    for a, b in itertools.combinations(TICKERS, 2):
+        merged = pd.DataFrame({
+            a: fake.download(a, start)['Close'], b: fake.download(b, start)['Close']
+        }).dropna()
+        matrix.loc[a, b] = matrix.loc[b, a] = merged[a].corr(merged[b])
+        rolling[(a, b)] = merged[a].rolling(ROLLING_WINDOW).corr(merged[b]).to_numpy()
+    return matrix, rolling
+
+
+def panel(cache, period):
+    series = []
+    for ticker in TICKERS:
+        index, columns = frame_arrays(cache.get(ticker, period))
+        series.append((index, columns['Close']))
+    return analyze_panel(series)
+
+
+def run(label, fake, fn):
+    fake.reset()
+    started = time.perf_counter()
+    results = {period: fn(period) for period in MATRIX_PERIODS}
+    elapsed = time.perf_counter() - started
+    print(f"{label:>8} | {elapsed * 1000:>9.0f} | {fake.calls:>9} | {fake.bars:>8}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.3)
+    args = parser.parse_args()
+
+    fake = FakeYahoo(args.latency)
+    root = tempfile.mkdtemp(prefix='bars_')
+    cache = BarCache(root, downloader=fake.download)
+
+    pairs = len(TICKERS) * (len(TICKERS) - 1) // 2
+    print(f"{len(TICKERS)} tickers, {pairs} pairs, periods {', '.join(MATRIX_PERIODS)}\n")
+    print(f"{'mode':>8} | {'time (ms)':>9} | {'downloads':>9} | {'bars':>8}")
+    print("-" * 46)
+    legacy = run('pairwise', fake, lambda period: pairwise(fake, period))
+    run('panel', fake, lambda period: panel(cache, period))
+    cached = run('cached', fake, lambda period: panel(cache, period))
+    shutil.rmtree(root)
+
+    # Calcul seul, barres déjà en mémoire
+    started = time.perf_counter()
+    for _ in range(100):
+        panel(cache, '2y')
+    print(f"\nmatrix + rolling over 2y, bars cached: {(time.perf_counter() - started) * 10:.2f} ms")
+
+    for period in MATRIX_PERIODS:
+        matrix, rolling = legacy[period]
+        result = cached[period]
+        assert np.allclose(result['matrix'], matrix.to_numpy())
+        for (a, b), expected in rolling.items():
+            i, j = TICKERS.index(a), TICKERS.index(b)
+            assert np.allclose(result['rolling'][:, i, j], expected, equal_nan=True, atol=1e-9), (a, b)
+    print("Same matrix and rolling correlations as pandas for every pair")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark du rafraîchissement des indicateurs macro
+Against the fake Yahoo Finance of bench_macro_bar_cache (fixed latency),
+measures what a GET /api/macro/indicators costs once the 5-minute cache
+has expired:
+- legacy: the request downloads the six indicators one after another
+- warmer: MacroBoard.refresh() (the scheduler job) downloads them
+  concurrently; requests read the published snapshot
+
+Then makes one ticker fail and checks that only that ticker is flagged
+stale while the others are refreshed.
+
+Usage: python bench_macro_indicators.py [--latency 0.3] [--requests 200]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from bench_macro_bar_cache import FakeYahoo
+from modules.bar_cache import BarCache
+from modules.macro_board import MacroBoard
+from modules.macro_sentiment import MACRO_INDICATORS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    fake = FakeYahoo(args.latency)
+    root = tempfile.mkdtemp(prefix='bars_')
+    cache = BarCache(root, downloader=fake.download)
+    board = MacroBoard(MACRO_INDICATORS, cache=cache)
+    board.refresh()  # séries complètes téléchargées une fois; ensuite seules les fins
+
+    fake.reset()
+    started = time.perf_counter()
+    for ticker in MACRO_INDICATORS:
+        cache.get(ticker, '5d', max_age=0)
+    legacy = time.perf_counter() - started
+    print(f"legacy  request after cache expiry   {legacy * 1000:>8.0f} ms ({fake.calls} sequential downloads)")
+
+    fake.reset()
+    snapshot = board.refresh()
+    print(f"warmer  background refresh           {snapshot.duration * 1000:>8.0f} ms ({fake.calls} concurrent downloads)")
+
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        payload = board.indicators_payload()
+    served = (time.perf_counter() - started) / args.requests
+    print(f"warmer  request (snapshot)           {served * 1000:>8.3f} ms")
+    assert len(payload['indicators']) == len(MACRO_INDICATORS) and not payload['errors']
+
+    # Échec d'un ticker, dernier téléchargement réussi il y a 10 minutes: le cache de barres
+    # garde l'ancienne série, l'indicateur est publié avec son âge et signalé périmé
+    download = fake.download
+
+    def failing(ticker, start, interval='1d'):
+        if ticker == '^VIX':
+            raise ConnectionError('Yahoo Finance unavailable')
+        return download(ticker, start, interval)
+
+    for key, (frame, fetched_at) in list(cache._series.items()):
+        cache._series[key] = (frame, fetched_at - 600)
+    cache.downloader = failing
+    board.refresh()
+    payload = board.indicators_payload()
+    stale = [indicator['ticker'] for indicator in payload['indicators'] if indicator['stale']]
+    print(f"failure ^VIX, warm: {len(payload['indicators'])} indicators served, stale {stale}")
+    assert len(payload['indicators']) == len(MACRO_INDICATORS) and stale == ['^VIX']
+
+    # Sans série en cache (démarrage à froid), le ticker est absent et son erreur signalée
+    cold = MacroBoard(MACRO_INDICATORS, cache=BarCache(tempfile.mkdtemp(dir=root), downloader=failing))
+    payload = cold.indicators_payload()
+    print(f"failure ^VIX, cold: {len(payload['indicators'])} indicators served, errors {payload['errors']}")
+    assert len(payload['indicators']) == len(MACRO_INDICATORS) - 1 and list(payload['errors']) == ['^VIX']
+    shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
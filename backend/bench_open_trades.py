@@ -0,0 +1,111 @@
+"""
+Benchmark de /api/trades/open/<challenge_id>
+Measures the endpoint latency for a challenge with 1, 10, 50, 100 and 200 open
+positions, in 'sequential' mode (one price per trade) and 'bulk' mode (one
+batch for the distinct symbols + vectorized P&L).
+
+Prices come from a local fake source where every upstream call costs
+--latency-ms. The quote cache is cleared before each request so that both
+modes pay their real upstream cost.
+
+Usage: python bench_open_trades.py [--latency-ms 20] [--symbols 40]
+"""
+import argparse
+import time
+from flask import Flask
+
+from extensions import db
+from models import User, Challenge, Trade
+from modules import trading
+from modules.quote_cache import QuoteCache
+
+
+class FakePriceSource:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def price(self, symbol):
+        self.calls += 1
+        time.sleep(self.latency)
+        return 100.0 + len(symbol)
+
+    def prices(self, symbols):
+        self.calls += 1
+        time.sleep(self.latency)
+        return {symbol: 100.0 + len(symbol) for symbol in symbols}
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.register_blueprint(trading.trading_bp)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(n_positions, n_symbols):
+    user = User(username=f'bench{n_positions}', email=f'bench{n_positions}@example.com', password='x')
+    db.session.add(user)
+    db.session.flush()
+    challenge = Challenge(user_id=user.id)
+    db.session.add(challenge)
+    db.session.flush()
+    db.session.add_all([
+        Trade(
+            challenge_id=challenge.id,
+            symbol=f'SYM{i % n_symbols}-USD',
+            type='buy',
+            position='long' if i % 2 else 'short',
+            quantity=1 + i % 5,
+            open_price=100.0,
+            status='open'
+        )
+        for i in range(n_positions)
+    ])
+    db.session.commit()
+    return challenge.id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--symbols', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    source = FakePriceSource(args.latency_ms / 1000)
+    trading.quote_cache = QuoteCache(source.price, batch_loader=source.prices)
+
+    print(f"Simulated upstream latency: {args.latency_ms} ms, {args.symbols} distinct symbols max\n")
+    print(f"{'positions':>9} | {'sequential (ms)':>15} | {'bulk (ms)':>10} | {'upstream calls':>15}")
+    print("-" * 60)
+
+    for n in (1, 10, 50, 100, 200):
+        with app.app_context():
+            challenge_id = seed(n, args.symbols)
+
+        results = {}
+        calls = {}
+        for mode in ('sequential', 'bulk'):
+            timings = []
+            source.calls = 0
+            for _ in range(args.repeat):
+                trading.quote_cache.invalidate()
+                started = time.perf_counter()
+                response = client.get(f'/api/trades/open/{challenge_id}?mode={mode}')
+                timings.append(time.perf_counter() - started)
+                assert response.status_code == 200 and len(response.get_json()) == n
+            results[mode] = min(timings)
+            calls[mode] = source.calls // args.repeat
+
+        print(f"{n:>9} | {results['sequential'] * 1000:>15.1f} | {results['bulk'] * 1000:>10.1f} | "
+              f"{calls['sequential']:>7} vs {calls['bulk']:<5}")
+
+
+if __name__ == '__main__':
+    main()
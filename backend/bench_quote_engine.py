@@ -0,0 +1,114 @@
+"""
+Benchmark du moteur de cotations groupées
+Compares the cost of one price-stream tick for 10, 100 and 500 symbols:
+- legacy: one history request per symbol + per-symbol parsing
+- batched: one bulk request + vectorized parsing of the latest bars
+
+Uses a local fake data source (no network). Every simulated request costs
+--latency-ms, which stands for the Yahoo Finance round trip.
+
+Usage: python bench_quote_engine.py [--latency-ms 20] [--repeat 3]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from modules.quote_engine import QuoteEngine
+
+BARS_PER_DAY = 390
+
+
+class FakeMarket:
+    """Local stand-in for Yahoo Finance returning a full day of 1-minute bars"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = 0
+        self.index = pd.date_range('2026-01-15 14:30', periods=BARS_PER_DAY, freq='1min', tz='UTC')
+        self._rng = np.random.default_rng(42)
+
+    def _bars(self, n_symbols):
+        close = 100 + self._rng.standard_normal((BARS_PER_DAY, n_symbols)).cumsum(axis=0)
+        return {
+            'Open': close + 0.1,
+            'High': close + 0.5,
+            'Low': close - 0.5,
+            'Close': close,
+            'Volume': self._rng.integers(100, 10000, (BARS_PER_DAY, n_symbols)).astype(float)
+        }
+
+    def history(self, symbol):
+        """Equivalent of yf.Ticker(symbol).history(period='1d', interval='1m')"""
+        self.requests += 1
+        time.sleep(self.latency)
+        bars = self._bars(1)
+        return pd.DataFrame({field: values[:, 0] for field, values in bars.items()}, index=self.index)
+
+    def download(self, symbols):
+        """Equivalent of yf.download(symbols, period='1d', interval='1m', group_by='column')"""
+        self.requests += 1
+        time.sleep(self.latency)
+        bars = self._bars(len(symbols))
+        columns = pd.MultiIndex.from_product([list(bars.keys()), symbols], names=['Price', 'Ticker'])
+        return pd.DataFrame(np.hstack(list(bars.values())), index=self.index, columns=columns)
+
+
+def legacy_tick(market, symbols):
+    """Ancienne boucle: une requête et un parsing par symbole"""
+    quotes = {}
+    for symbol in symbols:
+        data = market.history(symbol)
+        if not data.empty:
+            current_price = float(data['Close'].iloc[-1])
+            open_price = float(data['Open'].iloc[0])
+            change = current_price - open_price
+            quotes[symbol] = {
+                'symbol': symbol,
+                'price': round(current_price, 2),
+                'change': round(change, 2),
+                'changePercent': round((change / open_price) * 100 if open_price != 0 else 0, 2),
+                'volume': int(data['Volume'].iloc[-1]),
+                'high': round(float(data['High'].iloc[-1]), 2),
+                'low': round(float(data['Low'].iloc[-1]), 2),
+                'timestamp': time.time()
+            }
+    return quotes
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Simulated upstream latency: {args.latency_ms} ms per request\n")
+    print(f"{'symbols':>8} | {'legacy (ms)':>12} | {'batched (ms)':>12} | {'requests':>15} | {'speedup':>8}")
+    print("-" * 68)
+
+    for n in (10, 100, 500):
+        symbols = [f'SYM{i}' for i in range(n)]
+
+        legacy_market = FakeMarket(args.latency_ms / 1000)
+        legacy = measure(lambda: legacy_tick(legacy_market, symbols), args.repeat)
+
+        batched_market = FakeMarket(args.latency_ms / 1000)
+        engine = QuoteEngine(downloader=batched_market.download)
+        batched = measure(lambda: engine.fetch_quotes(symbols), args.repeat)
+        assert len(engine.quotes) == n
+
+        requests = f"{legacy_market.requests // args.repeat} vs {batched_market.requests // args.repeat}"
+        print(f"{n:>8} | {legacy * 1000:>12.1f} | {batched * 1000:>12.1f} | {requests:>15} | {legacy / batched:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
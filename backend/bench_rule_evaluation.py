@@ -0,0 +1,95 @@
+"""
+Benchmark de l'évaluation des règles des challenges
+Seeds 10k, 100k and 1M synthetic active challenges and compares:
+- legacy: evaluate_all_challenges(bulk=False), one check_rules (SELECT + COMMIT) per row
+- bulk: evaluate_challenges_bulk(), set-based UPDATEs and a single commit
+
+SQLite is always measured (temporary file). PostgreSQL is measured when a
+connection URI is given with --postgres or the BENCH_POSTGRES_URI variable;
+its tables are dropped and recreated, so use a scratch database.
+
+Usage: python bench_rule_evaluation.py [--sizes 10000,100000,1000000] [--legacy-max 10000]
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from flask import Flask
+
+from extensions import db
+from models import User, Challenge
+from modules.challenge import evaluate_all_challenges, evaluate_challenges_bulk
+
+
+def create_app(uri):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    db.init_app(app)
+    return app
+
+
+def seed(n, chunk=50000):
+    """Challenges actifs: ~5% sous la limite de perte, ~5% au-dessus de l'objectif"""
+    db.drop_all()
+    db.create_all()
+    user = User(username='bench', email='bench@example.com', password='x')
+    db.session.add(user)
+    db.session.commit()
+
+    rng = np.random.default_rng(1)
+    equities = 10000.0 * (1 + rng.normal(0, 0.045, n))
+    for offset in range(0, n, chunk):
+        db.session.execute(Challenge.__table__.insert(), [
+            {'user_id': user.id, 'status': 'active', 'start_balance': 10000.0, 'current_equity': float(e)}
+            for e in equities[offset:offset + chunk]
+        ])
+    db.session.commit()
+
+
+def run(label, uri, sizes, legacy_max):
+    app = create_app(uri)
+    with app.app_context():
+        for n in sizes:
+            seed(n)
+            started = time.perf_counter()
+            transitions = evaluate_challenges_bulk()
+            bulk = time.perf_counter() - started
+            line = f"{label:>10} | {n:>9} | {bulk * 1000:>10.1f} | {len(transitions):>11}"
+
+            if n <= legacy_max:
+                seed(n)
+                db.session.remove()
+                started = time.perf_counter()
+                legacy_transitions = evaluate_all_challenges(bulk=False)
+                legacy = time.perf_counter() - started
+                assert sorted(legacy_transitions) == sorted(transitions)
+                line += f" | {legacy * 1000:>11.1f}"
+            else:
+                line += f" | {'skipped':>11}"
+            print(line)
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--legacy-max', type=int, default=10000)
+    parser.add_argument('--postgres', default=os.getenv('BENCH_POSTGRES_URI'))
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    print(f"{'database':>10} | {'challenges':>9} | {'bulk (ms)':>10} | {'transitions':>11} | {'legacy (ms)':>11}")
+    print("-" * 64)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run('sqlite', 'sqlite:///' + os.path.join(tmp, 'bench.db'), sizes, args.legacy_max)
+
+    if args.postgres:
+        run('postgresql', args.postgres, sizes, args.legacy_max)
+    else:
+        print("\nPostgreSQL skipped (set --postgres or BENCH_POSTGRES_URI)")
+
+
+if __name__ == '__main__':
+    main()
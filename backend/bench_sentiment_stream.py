@@ -0,0 +1,114 @@
+"""
+Benchmark du score de sentiment précalculé
+Against the fake Yahoo Finance of bench_macro_bar_cache (fixed latency):
+- legacy: a GET /api/macro/sentiment-score on a response cache miss
+  downloads 5 days of ^VIX and a month of SPY
+- stream: SentimentStream.update() (the scheduler job) on a cold store
+  (backfill of the daily history), then warm; requests read the current point
+
+Every backfilled point must equal the legacy score computed on that day, and
+the live point the legacy score of today. A VIX spike must call the band
+listener once; the history of every period is read back from the store.
+
+Usage: python bench_sentiment_stream.py [--latency 0.3] [--requests 10000]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_macro_bar_cache import FakeYahoo
+from modules.bar_cache import BarCache, PERIODS, _today
+from modules.sentiment_stream import SentimentStream, sentiment_band
+from modules.tick_store import TickStore
+
+
+def legacy_score(fake, today, download=True):
+    """Ancien calcul de l'endpoint, tel qu'il aurait tourné le jour `today`"""
+    if download:
+        vix = fake.download('^VIX', today - PERIODS['5d'])
+        spy = fake.download('SPY', today - PERIODS['1mo'])
+    else:
+        vix = fake.history['^VIX'][fake.history['^VIX'].index >= today - PERIODS['5d']]
+        spy = fake.history['SPY'][fake.history['SPY'].index >= today - PERIODS['1mo']]
+    vix, spy = vix[vix.index <= today], spy[spy.index <= today]
+    vix_value = float(vix['Close'].iloc[-1])
+    spy_returns = float((spy['Close'].iloc[-1] / spy['Close'].iloc[0] - 1) * 100)
+    vix_score = max(0, min(100, 100 - (vix_value - 12) * 3))
+    spy_score = max(0, min(100, 50 + spy_returns * 2))
+    return int(vix_score * 0.6 + spy_score * 0.4)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--requests', type=int, default=10000)
+    args = parser.parse_args()
+
+    fake = FakeYahoo(args.latency)
+    # VIX réaliste (autour de 18) pour parcourir les bandes
+    fake.history['^VIX'] = fake.history['^VIX'] * 0.18
+    root = tempfile.mkdtemp(prefix='sentiment_')
+    cache = BarCache(f'{root}/bars', downloader=fake.download)
+    store = TickStore(f'{root}/ticks')
+    stream = SentimentStream(cache=cache, store=store)
+
+    fake.reset()
+    started = time.perf_counter()
+    legacy_score(fake, _today())
+    legacy = time.perf_counter() - started
+    print(f"legacy  request on cache miss         {legacy * 1000:>9.1f} ms ({fake.calls} downloads)")
+
+    fake.reset()
+    started = time.perf_counter()
+    payload = stream.update()
+    cold = time.perf_counter() - started
+    backfilled = len(store.query('MARKET', kind='sentiment')['ts'])
+    print(f"stream  update, cold (backfill)       {cold * 1000:>9.1f} ms ({fake.calls} downloads, {backfilled} points)")
+
+    fake.reset()
+    started = time.perf_counter()
+    stream.update()
+    warm = time.perf_counter() - started
+    print(f"stream  update, warm                  {warm * 1000:>9.3f} ms ({fake.calls} downloads)")
+
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        payload = stream.current
+    served = (time.perf_counter() - started) / args.requests
+    print(f"stream  request (current point)       {served * 1e6:>9.3f} us")
+
+    # Points rejoués contre l'ancien calcul, jour par jour
+    points = store.query('MARKET', kind='sentiment')
+    days = points['ts'][:-1].astype('datetime64[ms]')
+    mismatches = [day for day, score in zip(days, points['score'][:-1])
+                  if legacy_score(fake, pd.Timestamp(day), download=False) != int(score)]
+    print(f"check   {len(days)} backfilled days vs legacy: {len(mismatches)} mismatches; "
+          f"live {payload['score']} vs legacy {legacy_score(fake, _today(), download=False)}")
+    assert not mismatches and payload['score'] == legacy_score(fake, _today(), download=False)
+
+    for period in PERIODS:
+        started = time.perf_counter()
+        history = stream.history(period)
+        print(f"history {period:>4}: {len(history['ts']):>4} points in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    # Pic de VIX: changement de bande, un seul appel du listener et un point de plus
+    calls = []
+    stream.add_listener(lambda payload, previous: calls.append((previous['sentiment'], payload['sentiment'])))
+    stream.update()
+    frame = fake.history['^VIX']
+    frame.loc[frame.index[-1], 'Close'] = 45.0
+    cache.series('^VIX', max_age=0)
+    stream.update()
+    stream.update()
+    print(f"band    VIX 45: {calls}, expected {sentiment_band(0)['sentiment']!r}")
+    assert len(calls) == 1 and calls[0][1] == sentiment_band(0)['sentiment']
+    assert len(store.query('MARKET', kind='sentiment')['ts']) == backfilled + 1
+    shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
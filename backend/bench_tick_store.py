@@ -0,0 +1,77 @@
+"""
+Benchmark du magasin de ticks
+Writes one trading day of ticks for --symbols symbols (one tick per symbol
+per --interval seconds, as the WebSocket price stream does) to a temporary
+store, then measures:
+- ingest: ticks per second through record_quotes (the quote engine listener)
+- query: one hour of ticks and the day's 1-minute bars of one symbol,
+  checked to be views on the memory-mapped files (no copy)
+- the same hour spanning two days (concatenated)
+
+Usage: python bench_tick_store.py [--symbols 20] [--interval 1] [--hours 6.5]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from modules.tick_store import TickStore
+
+
+def timed(fn, repeat=50):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--hours', type=float, default=6.5)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='ticks_')
+    store = TickStore(root)
+    symbols = [f'SYM{i:02d}' for i in range(args.symbols)]
+    rng = np.random.default_rng(7)
+    # Séance qui chevauche minuit UTC, pour la requête sur deux partitions
+    start = datetime(2026, 10, 15, 21, 0, tzinfo=timezone.utc).timestamp()
+    steps = int(args.hours * 3600 / args.interval)
+
+    began = time.perf_counter()
+    prices = np.full(len(symbols), 100.0)
+    for step in range(steps):
+        prices *= 1 + rng.normal(0, 0.0005, len(symbols))
+        now = start + step * args.interval
+        store.record_quotes({
+            symbol: {'last': prices[i], 'volume': 1000 + step, 'timestamp': now}
+            for i, symbol in enumerate(symbols)
+        })
+    store.flush_bars(start + steps * args.interval + 60)
+    ingest = time.perf_counter() - began
+    total = steps * len(symbols)
+    print(f"ingest        {total} ticks in {ingest:.1f} s ({total / ingest:,.0f} ticks/s)")
+
+    hour, elapsed = timed(lambda: store.ticks('SYM00', start + 3600, start + 7200))
+    mapped = all(isinstance(column.base, np.memmap) or isinstance(column, np.memmap) for column in hour.values())
+    print(f"1 h of ticks  {len(hour['ts'])} rows in {elapsed * 1000:.3f} ms, views on the mapped files: {mapped}")
+
+    bars, elapsed = timed(lambda: store.bars('SYM00', start, start + 3 * 3600))
+    print(f"3 h of bars   {len(bars['ts'])} bars in {elapsed * 1000:.3f} ms")
+
+    midnight = datetime(2026, 10, 16, tzinfo=timezone.utc).timestamp()
+    spanning, elapsed = timed(lambda: store.ticks('SYM00', midnight - 1800, midnight + 1800))
+    print(f"1 h over 0:00 {len(spanning['ts'])} rows in {elapsed * 1000:.3f} ms (two partitions, concatenated)")
+
+    assert np.all(np.diff(spanning['ts']) > 0)
+    assert len(hour['ts']) == int(3600 / args.interval)
+    shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
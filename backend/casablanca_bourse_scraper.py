@@ -11,11 +11,16 @@ import requests
 from bs4 import BeautifulSoup
 import json
 import csv
+import sys
 import time
 from datetime import datetime
 from typing import List, Dict
 import logging
 
+from modules.bvc_parser import parse_quotation_rows
+from modules.conditional_fetch import ConditionalFetcher
+from modules.crawl import PoliteClient, crawl
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,14 +28,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Classes CSS des tableaux de cotations sur la page /fr/cotations/actions
+QUOTATION_TABLE_CLASSES = ('table', 'quotation', 'cours')
+
 
 class CasablancaBourseScaper:
     """
     Classe pour scraper les données de la Bourse de Casablanca
     """
     
-    def __init__(self):
-        """Initialisation du scraper"""
+    def __init__(self, rate: float = 4.0, per_host: int = 4, workers: int = 8):
+        """
+        Initialisation du scraper
+        
+        Args:
+            rate: Requêtes par seconde au plus vers le site
+            per_host: Requêtes simultanées au plus vers le site
+            workers: Threads du crawl des pages de détail
+        """
         self.base_url = "https://www.casablanca-bourse.com"
         self.session = requests.Session()
         self.session.headers.update({
@@ -40,34 +55,29 @@ class CasablancaBourseScaper:
             'Connection': 'keep-alive',
         })
         self.stocks_data = []
+        # Limites de débit et de concurrence par hôte, retry avec backoff exponentiel
+        self.client = PoliteClient(self.session, rate=rate, burst=per_host, per_host=per_host)
+        self.workers = workers
+        # Pages inchangées depuis le dernier passage: 304 ou corps identique, pas de nouveau parsing
+        self.fetcher = ConditionalFetcher(lambda url, headers: self.fetch_page(url, headers=headers))
     
-    def fetch_page(self, url: str, max_retries: int = 3) -> requests.Response:
+    def fetch_page(self, url: str, max_retries: int = 3, headers: Dict = None) -> requests.Response:
         """
         Récupère une page avec gestion des erreurs et retry
         
         Args:
             url: URL à récupérer
             max_retries: Nombre maximum de tentatives
+            headers: En-têtes additionnels (requêtes conditionnelles)
             
         Returns:
             Response object
         """
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"Tentative {attempt + 1}/{max_retries} pour {url}")
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
-                
-                # Délai entre les requêtes pour éviter le blocage
-                time.sleep(2)
-                return response
-                
-            except requests.RequestException as e:
-                logger.warning(f"Erreur lors de la requête: {e}")
-                if attempt == max_retries - 1:
-                    logger.error(f"Échec après {max_retries} tentatives")
-                    raise
-                time.sleep(5)
+        logger.info(f"Requête {url}")
+        # Le client attend son tour (débit, concurrence) et réessaie les erreurs réseau, 429 et 5xx
+        response = self.client.get(url, headers=headers, max_retries=max_retries)
+        response.raise_for_status()
+        return response
     
     def check_for_api(self) -> bool:
         """
@@ -149,46 +159,8 @@ class CasablancaBourseScaper:
         cotations_url = f"{self.base_url}/fr/cotations/actions"
         
         try:
-            response = self.fetch_page(cotations_url)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            stocks = []
-            
-            # Recherche des tableaux de cotations
-            tables = soup.find_all('table', {'class': ['table', 'quotation', 'cours']})
-            
-            if not tables:
-                # Fallback: chercher tous les tableaux
-                tables = soup.find_all('table')
-                logger.warning(f"Recherche générique: {len(tables)} tableaux trouvés")
-            
-            for table in tables:
-                rows = table.find_all('tr')[1:]  # Skip header
-                
-                for row in rows:
-                    cols = row.find_all(['td', 'th'])
-                    
-                    if len(cols) >= 4:  # Au minimum nom, cours, variation, volume
-                        try:
-                            stock = {
-                                'nom': cols[0].text.strip(),
-                                'symbole': cols[1].text.strip() if len(cols) > 1 else 'N/A',
-                                'dernier_cours': self._parse_number(cols[2].text if len(cols) > 2 else '0'),
-                                'variation_pct': self._parse_number(cols[3].text if len(cols) > 3 else '0'),
-                                'volume': self._parse_number(cols[4].text if len(cols) > 4 else '0'),
-                                'capitalisation': self._parse_number(cols[5].text if len(cols) > 5 else '0'),
-                                'isin': 'N/A',  # À compléter si disponible
-                                'date_extraction': datetime.now().isoformat()
-                            }
-                            
-                            # Vérifier que le nom n'est pas vide
-                            if stock['nom'] and stock['nom'] != 'N/A':
-                                stocks.append(stock)
-                                
-                        except Exception as e:
-                            logger.warning(f"Erreur lors du parsing d'une ligne: {e}")
-                            continue
-            
+            rows = self.fetcher.fetch(cotations_url, self._parse_quotation_table)
+            stocks = self._stocks_from_rows(rows)
             logger.info(f"✅ {len(stocks)} actions extraites par scraping HTML")
             return stocks
             
@@ -196,6 +168,48 @@ class CasablancaBourseScaper:
             logger.error(f"Erreur lors du scraping HTML: {e}")
             return []
     
+    def parse_stocks(self, content) -> List[Dict]:
+        """
+        Extrait les actions de la page des cotations (HTML brut)
+        
+        Args:
+            content: Contenu HTML de la page
+            
+        Returns:
+            Liste des actions avec leurs données
+        """
+        return self._stocks_from_rows(self._parse_quotation_table(content))
+    
+    def _parse_quotation_table(self, content):
+        # Tableaux de cotations, lus en une passe par lxml
+        rows = parse_quotation_rows(content, table_classes=QUOTATION_TABLE_CLASSES, skip_header=True)
+        if rows.fallback:
+            logger.warning("Recherche générique: aucun tableau de cotations identifié")
+        return rows
+    
+    def _stocks_from_rows(self, rows) -> List[Dict]:
+        noms, symboles = rows.column(0), rows.column(1)
+        cours, variations = rows.column(2), rows.column(3)
+        volumes, capitalisations = rows.column(4), rows.column(5)
+        extraction = datetime.now().isoformat()
+        
+        stocks = []
+        for i, width in enumerate(rows.widths):
+            # Au minimum nom, cours, variation, volume; vérifier que le nom n'est pas vide
+            if width < 4 or not noms[i] or noms[i] == 'N/A':
+                continue
+            stocks.append({
+                'nom': noms[i],
+                'symbole': symboles[i],
+                'dernier_cours': self._parse_number(cours[i]),
+                'variation_pct': self._parse_number(variations[i]),
+                'volume': self._parse_number(volumes[i] if width > 4 else '0'),
+                'capitalisation': self._parse_number(capitalisations[i] if width > 5 else '0'),
+                'isin': 'N/A',  # À compléter si disponible
+                'date_extraction': extraction
+            })
+        return stocks
+    
     def scrape_individual_stock_detail(self, stock_url: str) -> Dict:
         """
         Extrait les détails d'une action spécifique
@@ -207,28 +221,65 @@ class CasablancaBourseScaper:
             Dictionnaire avec les détails
         """
         try:
-            response = self.fetch_page(stock_url)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            details = {}
-            
-            # Rechercher les informations spécifiques
-            # Code ISIN
-            isin_elem = soup.find(text=lambda t: t and 'ISIN' in t)
-            if isin_elem:
-                details['isin'] = isin_elem.find_next().text.strip()
-            
-            # Capitalisation
-            cap_elem = soup.find(text=lambda t: t and 'Capitalisation' in t)
-            if cap_elem:
-                details['capitalisation'] = self._parse_number(cap_elem.find_next().text)
-            
-            return details
+            return dict(self.fetcher.fetch(stock_url, self._parse_stock_detail))
             
         except Exception as e:
             logger.warning(f"Erreur lors de l'extraction des détails: {e}")
             return {}
     
+    def detail_url(self, symbole: str) -> str:
+        """URL de la page de détail d'une action"""
+        return f"{self.base_url}/fr/live-market/instruments/{symbole}"
+    
+    def scrape_stock_details(self, stocks: List[Dict] = None) -> int:
+        """
+        Complète les actions (ISIN, capitalisation) depuis leurs pages de détail
+        
+        The pages are crawled concurrently on `workers` threads; the client's
+        per-host limits keep the crawl polite.
+        
+        Args:
+            stocks: Actions à compléter (par défaut self.stocks_data)
+            
+        Returns:
+            Nombre d'actions complétées
+        """
+        stocks = self.stocks_data if stocks is None else stocks
+        targets = [stock for stock in stocks if stock.get('symbole') not in (None, '', 'N/A')]
+        logger.info(f"Crawl des pages de détail: {len(targets)} actions, {self.workers} threads")
+        
+        started = time.monotonic()
+        completed = 0
+        for stock, details, error in crawl(
+            targets, lambda stock: self.scrape_individual_stock_detail(self.detail_url(stock['symbole'])),
+            workers=self.workers
+        ):
+            if details:
+                stock.update(details)
+                completed += 1
+        
+        logger.info(f"✅ {completed}/{len(targets)} actions complétées en {time.monotonic() - started:.1f} s")
+        return completed
+    
+    def _parse_stock_detail(self, content) -> Dict:
+        """Extrait ISIN et capitalisation d'une page de détail"""
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        details = {}
+        
+        # Rechercher les informations spécifiques
+        # Code ISIN
+        isin_elem = soup.find(text=lambda t: t and 'ISIN' in t)
+        if isin_elem:
+            details['isin'] = isin_elem.find_next().text.strip()
+        
+        # Capitalisation
+        cap_elem = soup.find(text=lambda t: t and 'Capitalisation' in t)
+        if cap_elem:
+            details['capitalisation'] = self._parse_number(cap_elem.find_next().text)
+        
+        return details
+    
     def _parse_number(self, text: str) -> float:
         """
         Parse un nombre depuis une chaîne (gère les formats français)
@@ -249,10 +300,13 @@ class CasablancaBourseScaper:
         except:
             return 0.0
     
-    def run(self) -> List[Dict]:
+    def run(self, details: bool = False) -> List[Dict]:
         """
         Exécute le scraping complet
         
+        Args:
+            details: Compléter chaque action depuis sa page de détail
+            
         Returns:
             Liste des actions extraites
         """
@@ -270,6 +324,8 @@ class CasablancaBourseScaper:
         if not self.stocks_data:
             logger.error("❌ Aucune donnée n'a pu être extraite!")
         else:
+            if details:
+                self.scrape_stock_details()
             logger.info(f"✅ Extraction terminée: {len(self.stocks_data)} actions")
         
         return self.stocks_data
@@ -351,6 +407,10 @@ class CasablancaBourseScaper:
         if len(self.stocks_data) > 5:
             print(f"... et {len(self.stocks_data) - 5} autres actions")
         
+        stats = self.fetcher.stats()
+        print(f"\n🌐 Requêtes: {stats['requests']} | Non modifiées (304): {stats['not_modified']} | "
+              f"Octets économisés: {stats['bytes_saved']:,} | Parsings évités: {stats['parses_skipped']}")
+        
         print("="*60 + "\n")
 
 
@@ -370,7 +430,7 @@ def main():
     
     try:
         # Exécuter le scraping
-        stocks = scraper.run()
+        stocks = scraper.run(details='--details' in sys.argv)
         
         # Afficher le résumé
         scraper.print_summary()
@@ -0,0 +1,112 @@
+"""
+Vérification du nombre de requêtes SQL des listings admin
+Calls each admin listing through the Flask test client at several page sizes
+and counts the SQL statements it runs (SQLAlchemy before_cursor_execute).
+A listing passes when the count is the same for every page size, i.e. no
+per-row lookup (N+1) is left. Exits with code 1 otherwise.
+
+Usage: python check_admin_query_counts.py [--sizes 5,20,50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import event
+
+from extensions import db
+from models import User, Challenge, Transaction, AdminLog
+from modules.admin import admin_bp
+
+ENDPOINTS = {
+    'users': '/api/admin/users?per_page={size}',
+    'transactions': '/api/admin/transactions?per_page={size}',
+    'transactions_filtered': '/api/admin/transactions?per_page={size}&status=pending&type=withdrawal',
+    'pending_transactions': '/api/admin/transactions/pending',
+    'logs': '/api/admin/logs?per_page={size}',
+}
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def create_app(uri):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    db.init_app(app)
+    app.register_blueprint(admin_bp)
+    return app
+
+
+def seed(n):
+    """n traders avec challenges, transactions et logs; renvoie l'id de l'admin"""
+    db.drop_all()
+    db.create_all()
+    admin = User(username='admin', email='admin@example.com', password='x', role='admin')
+    db.session.add(admin)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'trader{i}', 'email': f'trader{i}@example.com', 'password': 'x',
+         'role': 'trader', 'created_at': now} for i in range(n)])
+    db.session.execute(Challenge.__table__.insert(), [
+        {'user_id': 2 + i % n, 'status': 'active', 'start_balance': 5000.0,
+         'current_equity': 5000.0, 'start_date': now} for i in range(2 * n)])
+    db.session.execute(Transaction.__table__.insert(), [
+        {'user_id': 2 + i % n, 'amount': 100.0, 'type': ('payment', 'withdrawal')[i % 2],
+         'status': ('pending', 'approved')[i % 4 == 0], 'timestamp': now - timedelta(minutes=i)}
+        for i in range(2 * n)])
+    db.session.execute(AdminLog.__table__.insert(), [
+        {'admin_id': admin.id, 'action': 'seed', 'timestamp': now - timedelta(minutes=i)}
+        for i in range(2 * n)])
+    db.session.commit()
+    return admin.id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='5,20,50')
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app('sqlite:///' + os.path.join(tmp, 'queries.db'))
+        with app.app_context():
+            counter = QueryCounter(db.engine)
+            client = app.test_client()
+
+            print(f"{'endpoint':<24} | " + ' | '.join(f'{size:>5} rows' for size in sizes))
+            print("-" * (27 + 13 * len(sizes)))
+            for name, url in ENDPOINTS.items():
+                counts = []
+                for size in sizes:
+                    admin_id = seed(size)
+                    db.session.remove()
+                    counter.count = 0
+                    # require_admin lit l'utilisateur dans le corps JSON, même en GET
+                    response = client.get(url.format(size=size), json={'user_id': admin_id},
+                                          headers={'X-User-ID': str(admin_id)})
+                    assert response.status_code == 200, (name, response.status_code, response.get_data(as_text=True))
+                    counts.append(counter.count)
+                print(f"{name:<24} | " + ' | '.join(f'{count:>10}' for count in counts))
+                if len(set(counts)) > 1:
+                    failures.append(name)
+            db.drop_all()
+
+    if failures:
+        print(f"\n❌ Query count grows with page size: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ Every admin listing runs a constant number of queries")
+
+
+if __name__ == '__main__':
+    main()
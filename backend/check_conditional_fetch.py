@@ -0,0 +1,157 @@
+"""
+Vérification des requêtes conditionnelles des scrapers BVC
+Starts a local HTTP server standing in for casablanca-bourse.com (serving the
+pages in fixtures/bvc/) and runs both scrapers against it, for each way a
+server can signal an unchanged page:
+- etag: ETag / If-None-Match -> 304
+- last-modified: Last-Modified / If-Modified-Since -> 304
+- none: no validators, full 200 every time -> content hash
+
+Each scenario fetches the page, fetches it again unchanged, then once more
+after a price changed on the server, and checks the counters and results.
+
+Usage: python check_conditional_fetch.py
+"""
+import os
+import sys
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from casablanca_bourse_scraper import CasablancaBourseScaper
+from modules.bvc_scraper import BVCScraper
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'bvc')
+
+PAGES = {
+    '/bourseweb/Cours-Bourse.aspx': 'cours_bourse.html',
+    '/fr/cotations/actions': 'cotations_actions.html',
+}
+PAGES_BY_LABEL = {'bvc': '/bourseweb/Cours-Bourse.aspx', 'market': '/fr/cotations/actions'}
+
+
+class StandIn:
+    """État du serveur: mode de validation, version des pages, en-têtes reçus"""
+
+    def __init__(self):
+        self.mode = 'etag'
+        self.version = 0
+        self.conditional_requests = 0
+        self.bodies = {}
+        for path, name in PAGES.items():
+            with open(os.path.join(FIXTURES, name), 'rb') as f:
+                self.bodies[path] = f.read()
+
+    def body(self, path):
+        if path == '/bourseweb/Cours-Bourse.aspx' and self.version:
+            # Nouveau cours pour GAZ à chaque version
+            rows = self.bodies[path].split(b'<td align="center">GAZ</td>')
+            price = f'<td align="center">GAZ</td><td align="right">{4850 + self.version},00</td>'.encode()
+            return rows[0] + price + rows[1].split(b'</td>', 1)[1]
+        if path == '/fr/cotations/actions' and self.version:
+            return self.bodies[path].replace(b'AFRIQUIA GAZ', b'AFRIQUIA GAZ SA')
+        return self.bodies[path]
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in PAGES:
+                self.send_error(404)
+                return
+            etag = f'"v{state.version}"'
+            last_modified = formatdate(1790000000 + state.version * 60, usegmt=True)
+            if self.headers.get('If-None-Match') or self.headers.get('If-Modified-Since'):
+                state.conditional_requests += 1
+
+            unchanged = (
+                (state.mode == 'etag' and self.headers.get('If-None-Match') == etag) or
+                (state.mode == 'last-modified' and self.headers.get('If-Modified-Since') == last_modified)
+            )
+            if unchanged:
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            body = state.body(self.path)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            if state.mode == 'etag':
+                self.send_header('ETag', etag)
+            elif state.mode == 'last-modified':
+                self.send_header('Last-Modified', last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def bvc_round(scraper):
+    return scraper.get_multiple_stocks(['GAZ', 'BCP', 'CIH'])['GAZ']['price']
+
+
+def market_round(scraper):
+    return next(s['nom'] for s in scraper.scrape_stocks_from_html() if s['symbole'] == 'GAZ')
+
+
+def check(label, mode, scraper, run, state):
+    state.mode, state.version, state.conditional_requests = mode, 0, 0
+    size = len(state.body(PAGES_BY_LABEL[label]))
+
+    first = run(scraper)
+    second = run(scraper)
+    state.version = 1
+    third = run(scraper)
+    stats = scraper.fetcher.stats()
+
+    expected = {
+        'requests': 3,
+        'not_modified': 1 if mode != 'none' else 0,
+        'bytes_saved': size if mode != 'none' else 0,
+        'parses': 2,
+        'parses_skipped': 1,
+    }
+    failures = [f"{key}={stats[key]} (expected {value})" for key, value in expected.items() if stats[key] != value]
+    if first != second or second == third:
+        failures.append(f"results {first!r}, {second!r}, {third!r}")
+    if state.conditional_requests != (2 if mode != 'none' else 0):
+        failures.append(f"{state.conditional_requests} conditional requests received")
+
+    print(f"{label:>10} | {mode:>13} | {stats['requests']:>8} | {stats['not_modified']:>4} | "
+          f"{stats['bytes_downloaded']:>10} | {stats['bytes_saved']:>11} | {stats['parses']:>6} | "
+          f"{stats['parses_skipped']:>7} | {'OK' if not failures else 'FAIL'}")
+    for failure in failures:
+        print(f"           {failure}")
+    return not failures
+
+
+def main():
+    state = StandIn()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"{'scraper':>10} | {'validators':>13} | {'requests':>8} | {'304':>4} | "
+          f"{'downloaded':>10} | {'bytes saved':>11} | {'parses':>6} | {'skipped':>7} |")
+    print("-" * 100)
+    ok = True
+    for mode in ('etag', 'last-modified', 'none'):
+        bvc = BVCScraper()
+        bvc.BASE_URL = base_url
+        ok &= check('bvc', mode, bvc, bvc_round, state)
+
+        market = CasablancaBourseScaper()
+        market.base_url = base_url
+        ok &= check('market', mode, market, market_round, state)
+
+    server.shutdown()
+    print("\nAll scenarios passed" if ok else "\nSome scenarios failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
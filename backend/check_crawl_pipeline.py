@@ -0,0 +1,181 @@
+"""
+Vérification du crawl des pages de détail de CasablancaBourseScaper
+Starts a local HTTP server standing in for casablanca-bourse.com: the
+quotation page from fixtures/bvc/ and one detail page per listed company,
+each answered after --latency seconds, with injected failures:
+- 503 on the first attempt (transient)
+- 429 with Retry-After on the first attempt
+- connection dropped without answer on the first attempt
+- 500 on every attempt (permanent, must be reported, not retried forever)
+
+Checks that every company except the permanent failures gets its ISIN and
+capitalisation, that the server never saw more than per_host requests in
+flight nor more than rate * window + burst requests in any window, and
+compares the crawl time with the previous sequential code (2 s sleep after
+each request, 5 s between retries).
+
+Usage: python check_crawl_pipeline.py [--latency 0.15] [--rate 8] [--per-host 4] [--workers 8]
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from casablanca_bourse_scraper import CasablancaBourseScaper
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'bvc')
+DETAIL_PREFIX = '/fr/live-market/instruments/'
+
+# Pannes injectées, selon le rang de la société dans le tableau
+TRANSIENT_503, RATE_LIMITED, DROPPED, PERMANENT = 7, 11, 13, 37
+
+
+def failure_for(rank):
+    if rank % PERMANENT == PERMANENT - 1:
+        return 'permanent'
+    for modulo, kind in ((TRANSIENT_503, '503'), (RATE_LIMITED, '429'), (DROPPED, 'drop')):
+        if rank % modulo == 0:
+            return kind
+    return None
+
+
+def isin_for(symbol):
+    return 'MA' + ''.join(f'{ord(c):03d}' for c in symbol)[:9].ljust(9, '0') + '1'
+
+
+def detail_html(name, symbol):
+    return (f'<html><head><title>{name}</title></head><body><h1>{name} ({symbol})</h1>'
+            f'<dl><dt>Code ISIN</dt><dd>{isin_for(symbol)}</dd>'
+            f'<dt>Capitalisation</dt><dd>{len(symbol) * 1000000},00</dd></dl></body></html>').encode()
+
+
+class StandIn:
+    def __init__(self, latency):
+        self.latency = latency
+        with open(os.path.join(FIXTURES, 'cotations_actions.html'), 'rb') as f:
+            self.quotation_page = f.read()
+        self.companies = {}  # symbole -> (rang, nom)
+        self.attempts = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = []
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with state.lock:
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+                state.started.append(time.monotonic())
+                attempt = state.attempts[self.path] = state.attempts.get(self.path, 0) + 1
+            try:
+                time.sleep(state.latency)
+                self.answer(attempt)
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+        def answer(self, attempt):
+            if self.path == '/fr/cotations/actions':
+                return self.send_body(state.quotation_page)
+            symbol = self.path[len(DETAIL_PREFIX):] if self.path.startswith(DETAIL_PREFIX) else None
+            if symbol not in state.companies:
+                return self.send_error(404)
+
+            rank, name = state.companies[symbol]
+            failure = failure_for(rank)
+            if failure == 'permanent' or (attempt == 1 and failure in ('503', '429')):
+                self.send_response(429 if failure == '429' else 503 if failure == '503' else 500)
+                if failure == '429':
+                    self.send_header('Retry-After', '0.2')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if attempt == 1 and failure == 'drop':
+                self.close_connection = True
+                return
+            self.send_body(detail_html(name, symbol))
+
+        def send_body(self, body):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def max_in_window(timestamps, window):
+    timestamps = sorted(timestamps)
+    best, first = 0, 0
+    for last, stamp in enumerate(timestamps):
+        while stamp - timestamps[first] >= window:
+            first += 1
+        best = max(best, last - first + 1)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.15)
+    parser.add_argument('--rate', type=float, default=8.0)
+    parser.add_argument('--per-host', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    state = StandIn(args.latency)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    scraper = CasablancaBourseScaper(rate=args.rate, per_host=args.per_host, workers=args.workers)
+    scraper.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    stocks = scraper.scrape_stocks_from_html()
+    state.companies = {stock['symbole']: (rank, stock['nom']) for rank, stock in enumerate(stocks)}
+
+    state.started.clear()
+    started = time.monotonic()
+    completed = scraper.scrape_stock_details(stocks)
+    elapsed = time.monotonic() - started
+    server.shutdown()
+
+    failures = {rank: failure_for(rank) for rank, _ in state.companies.values()}
+    permanent = [rank for rank, kind in failures.items() if kind == 'permanent']
+    transient = [rank for rank, kind in failures.items() if kind in ('503', '429', 'drop')]
+    wrong = [s['symbole'] for s in stocks
+             if failures[state.companies[s['symbole']][0]] != 'permanent' and s.get('isin') != isin_for(s['symbole'])]
+    burst = max_in_window(state.started, 1.0)
+    stats = scraper.client.stats()
+    retries_per_permanent = scraper.client.max_retries - 1
+    sequential = (len(stocks) * (args.latency + 2) + len(transient) * 5
+                  + len(permanent) * retries_per_permanent * (5 + args.latency))
+
+    print(f"companies             {len(stocks)}")
+    print(f"completed             {completed} (expected {len(stocks) - len(permanent)})")
+    print(f"injected failures     {len(transient)} transient, {len(permanent)} permanent")
+    print(f"client                {stats['requests']} requests, {stats['retries']} retries, "
+          f"{stats['failures']} failures, {stats['throttled_seconds']:.1f} s throttled")
+    print(f"max in flight         {state.max_in_flight} (limit {args.per_host})")
+    print(f"max requests in 1 s   {burst} (limit {args.rate:g}/s + burst {args.per_host})")
+    print(f"crawl time            {elapsed:.1f} s (previous sequential code: ~{sequential:.0f} s)")
+
+    ok = (completed == len(stocks) - len(permanent) and not wrong
+          and state.max_in_flight <= args.per_host and burst <= args.rate + args.per_host
+          and stats['failures'] == len(permanent))
+    if wrong:
+        print(f"wrong details for     {wrong}")
+    print("\nOK" if ok else "\nFAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
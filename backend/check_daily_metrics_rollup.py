@@ -0,0 +1,119 @@
+"""
+Vérification du rollup quotidien des transactions
+Creates transactions three days ago, runs the rollup so the watermark passes
+their creation day, then settles them through the admin endpoints and runs
+the rollup again. Every settled transaction must be counted exactly once, on
+the day it was settled:
+- payment made through /api/payment/process (completed at creation), then
+  an admin approval attempt (refused, the payment is already settled)
+- pending payment approved after the watermark passed its creation day
+- pending withdrawal approved the same way
+- pending withdrawal rejected (never counted)
+Exits with code 1 otherwise.
+
+Usage: python check_daily_metrics_rollup.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from flask import Flask
+
+from extensions import db
+from models import User, Transaction, DailyPlatformMetrics
+from modules.admin import admin_bp
+from modules.payment import payment_bp
+from modules.platform_metrics import rollup_daily_metrics
+
+
+def create_app(uri):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    db.init_app(app)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(payment_bp)
+    return app
+
+
+def totals():
+    rows = DailyPlatformMetrics.query.all()
+    return {
+        field: sum(getattr(row, field) or 0 for row in rows)
+        for field in ('payments_count', 'payments_amount', 'withdrawals_count', 'withdrawals_amount')
+    }
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app('sqlite:///' + os.path.join(tmp, 'rollup.db'))
+        with app.app_context():
+            db.create_all()
+            admin = User(username='admin', email='admin@example.com', password='x', role='admin')
+            trader = User(username='trader', email='trader@example.com', password='x', role='trader')
+            db.session.add_all([admin, trader])
+            db.session.commit()
+            client = app.test_client()
+            # require_admin lit le corps JSON même quand l'en-tête suffit
+            headers, body = {'X-User-ID': str(admin.id)}, {'user_id': admin.id}
+            created = datetime.utcnow() - timedelta(days=3)
+
+            response = client.post('/api/payment/process', json={
+                'user_id': trader.id, 'amount': 200.0, 'method': 'card', 'tier': 'starter',
+                'payment_details': {'email': 'trader@example.com'}
+            })
+            assert response.status_code == 200, response.get_data(as_text=True)
+            paid = Transaction.query.filter_by(type='payment', status='completed').one()
+            # Paiement réglé il y a trois jours
+            paid.timestamp = paid.approval_timestamp = created
+            pending = [
+                Transaction(user_id=trader.id, amount=amount, type=tx_type, status='pending', timestamp=created)
+                for amount, tx_type in ((50.0, 'payment'), (30.0, 'withdrawal'), (10.0, 'withdrawal'))
+            ]
+            db.session.add_all(pending)
+            db.session.commit()
+            pending_ids = [transaction.id for transaction in pending]
+
+            # Le watermark dépasse le jour de création de toutes les transactions
+            rollup_daily_metrics()
+            first = totals()
+
+            responses = {
+                'approve completed payment': client.put(f'/api/admin/transactions/{paid.id}/approve', headers=headers, json=body),
+                'approve pending payment': client.put(f'/api/admin/transactions/{pending_ids[0]}/approve', headers=headers, json=body),
+                'approve pending withdrawal': client.put(f'/api/admin/transactions/{pending_ids[1]}/approve', headers=headers, json=body),
+                'reject pending withdrawal': client.put(f'/api/admin/transactions/{pending_ids[2]}/reject', headers=headers,
+                                                        json={**body, 'reason': 'check'}),
+            }
+            expected_status = {'approve completed payment': 409, 'approve pending payment': 200,
+                               'approve pending withdrawal': 200, 'reject pending withdrawal': 200}
+            for name, response in responses.items():
+                print(f"{name:<28} -> HTTP {response.status_code}")
+                if response.status_code != expected_status[name]:
+                    failures.append(f'{name}: HTTP {response.status_code}')
+
+            now = datetime.utcnow()
+            rollup_daily_metrics(now=now + timedelta(minutes=2))
+            rollup_daily_metrics(now=now + timedelta(days=1))
+            final = totals()
+
+            checks = {
+                'after first rollup': (first, {'payments_count': 1, 'payments_amount': 200.0,
+                                               'withdrawals_count': 0, 'withdrawals_amount': 0.0}),
+                'after approvals': (final, {'payments_count': 2, 'payments_amount': 250.0,
+                                            'withdrawals_count': 1, 'withdrawals_amount': 30.0}),
+            }
+            for name, (actual, expected) in checks.items():
+                print(f"{name:<28} {actual}")
+                if actual != expected:
+                    failures.append(f'{name}: {actual} != {expected}')
+            db.drop_all()
+
+    if failures:
+        print(f"\n❌ Rollup totals wrong: {'; '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ Every settled transaction is counted once, on its settlement day")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Audit des plans d'exécution des requêtes chaudes
+Runs EXPLAIN on the hot queries of trading, challenge, equity engine,
+leaderboard, profile, admin and the daily rollup against a seeded database.
+The queries are the objects built by the modules themselves (the *_query()
+builders the endpoints and jobs execute), not copies of their SQL.
+
+A query fails (exit code 1) when its plan reads a whole table or a whole
+index:
+- SQLite: any SCAN line, except an index walk in ORDER BY order cut short
+  by a LIMIT on a query without WHERE (the admin listings' first page)
+- PostgreSQL: a Seq Scan, or an index scan without Index Cond that filters
+  rows or is not under a Limit
+Queries that aggregate every row by design are listed in FULL_SCANS with the
+reason; their plan is printed but does not fail.
+
+SQLite is always checked (temporary file). PostgreSQL is checked when a
+connection URI is given with --postgres or the BENCH_POSTGRES_URI variable;
+tables are dropped and recreated, so use a scratch database. On PostgreSQL
+the check runs with enable_seqscan=off: a Seq Scan that remains means no
+usable index exists.
+
+Usage: python check_query_plans.py [--postgres postgresql://...] [--rows 5000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import select
+
+from extensions import db
+from models import User, Challenge, Trade, Transaction, AdminLog, EquitySnapshot
+from modules.admin import (
+    encode_cursor, keyset_query, logs_query, newest_first, pending_transactions_query, transactions_query
+)
+from modules.admin_stats import transaction_totals_query
+from modules.challenge import (
+    current_session_date, start_of_day_snapshot_query, transition_conditions, unsnapshotted_challenges_query
+)
+from modules.equity_engine import active_challenges_query, active_open_trades_query, session_snapshots_query
+from modules.leaderboard import ranking_query
+from modules.platform_metrics import rollup_queries
+from modules.profile import user_challenges_query, user_transactions_query
+from modules.trading import open_trades_query
+
+# Agrégats sur toutes les lignes, par construction
+FULL_SCANS = {
+    'admin.platform_stats': "totaux de toutes les transactions: parcours de l'index couvrant "
+                            "(status, type, amount), résultat mis en cache ADMIN_STATS_TTL secondes",
+    'leaderboard.ranking': "chargement initial du classement matérialisé, une fois au démarrage: "
+                           "lit tous les challenges classés et leurs usernames",
+}
+
+# PostgreSQL: noeuds qui transmettent les lignes une à une (un Limit au-dessus borne encore le parcours)
+STREAMING_NODES = {'Limit', 'Nested Loop', 'Merge Join', 'Result'}
+
+
+def hot_queries():
+    """Les requêtes des endpoints et tâches de fond, construites par les modules (contexte applicatif requis)"""
+    today = current_session_date()
+    now = datetime.utcnow()
+    cursor = encode_cursor(now - timedelta(days=1), 1000)
+    queries = {
+        'trading.open_trades': open_trades_query(1),
+        'equity_engine.active_challenges': active_challenges_query(),
+        'equity_engine.open_trades': active_open_trades_query(),
+        'equity_engine.session_snapshots': session_snapshots_query(today),
+        'challenge.start_of_day_equity': start_of_day_snapshot_query(1, today),
+        'challenge.unsnapshotted': unsnapshotted_challenges_query(today),
+        'leaderboard.ranking': ranking_query(),
+        'profile.challenges': user_challenges_query(1),
+        'profile.transactions': user_transactions_query(1),
+        'admin.transactions': newest_first(transactions_query(), Transaction).limit(50),
+        'admin.transactions_status': newest_first(transactions_query('pending'), Transaction).limit(50),
+        'admin.transactions_filtered': newest_first(
+            transactions_query('approved', 'deposit'), Transaction).limit(50),
+        'admin.transactions_keyset': keyset_query(transactions_query(), Transaction, cursor, 50),
+        'admin.transactions_keyset_status': keyset_query(transactions_query('pending'), Transaction, cursor, 50),
+        'admin.pending_transactions': pending_transactions_query(),
+        'admin.platform_stats': transaction_totals_query(),
+        'admin.logs': newest_first(logs_query(), AdminLog).limit(50),
+        'admin.logs_keyset': keyset_query(logs_query(), AdminLog, cursor, 50),
+    }
+    # Les conditions exactes des UPDATE de l'évaluateur ensembliste
+    for status, where in transition_conditions(today):
+        queries[f'challenge.transition_{status}'] = select(Challenge.id).where(*where)
+    for name, query in rollup_queries(now - timedelta(minutes=5), now).items():
+        queries[f'metrics.{name}'] = query
+    return queries
+
+
+def seed(rows):
+    now = datetime.utcnow()
+    users = [{'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'x',
+              'role': 'admin' if i == 0 else 'trader', 'created_at': now} for i in range(rows // 10)]
+    db.session.execute(User.__table__.insert(), users)
+    n_users = len(users)
+
+    db.session.execute(Challenge.__table__.insert(), [
+        {'user_id': 1 + i % n_users, 'status': ('active', 'failed', 'funded')[i % 3],
+         'start_balance': 5000.0, 'current_equity': 5000.0 + i % 700, 'start_date': now,
+         'ended_at': None if i % 3 == 0 else now - timedelta(minutes=i)}
+        for i in range(rows)])
+    db.session.execute(Trade.__table__.insert(), [
+        {'challenge_id': 1 + i % rows, 'symbol': 'BTC-USD', 'type': 'buy', 'position': 'long',
+         'quantity': 1.0, 'open_price': 100.0, 'status': ('open', 'closed')[i % 2], 'timestamp': now}
+        for i in range(rows)])
+    db.session.execute(Transaction.__table__.insert(), [
+        {'user_id': 1 + i % n_users, 'amount': 100.0,
+         'type': ('payment', 'deposit', 'withdrawal')[i % 3],
+         'status': ('pending', 'approved', 'completed', 'rejected')[i % 4],
+         'timestamp': now - timedelta(minutes=i)}
+        for i in range(rows)])
+    db.session.execute(AdminLog.__table__.insert(), [
+        {'admin_id': 1, 'action': 'seed', 'timestamp': now - timedelta(minutes=i)} for i in range(rows)])
+    db.session.execute(EquitySnapshot.__table__.insert(), [
+        # Un snapshot par challenge actif et par séance: l'historique couvre 30 séances
+        {'challenge_id': 1 + i % (rows // 30), 'session_date': now.date() - timedelta(days=i // (rows // 30)),
+         'start_of_day_equity': 5000.0}
+        for i in range(rows)])
+    db.session.commit()
+
+
+def _compile(connection, stmt):
+    compiled = stmt.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+    if compiled.positional:
+        return str(compiled), tuple(compiled.params[name] for name in compiled.positiontup)
+    return str(compiled), compiled.params
+
+
+def sqlite_plan(connection, stmt):
+    """(lignes du plan, lignes fautives) d'EXPLAIN QUERY PLAN"""
+    sql, params = _compile(connection, stmt)
+    plan = [row[-1].strip() for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params)]
+    # Un LIMIT ne borne le parcours d'un index que s'il n'y a ni filtre à appliquer ni tri à faire
+    limited = stmt._limit_clause is not None and stmt.whereclause is None and \
+        not any('USE TEMP B-TREE' in line for line in plan)
+    unbounded = [
+        line for line in plan
+        if line.startswith('SCAN ') and 'CONSTANT ROW' not in line and not (limited and 'USING' in line)
+    ]
+    return plan, unbounded
+
+
+def _postgres_unbounded(node, limited=False):
+    """Parcours non bornés d'un noeud et de ses enfants; limited: un Limit au-dessus, sans tri ni agrégat entre"""
+    node_type = node['Node Type']
+    unbounded = []
+    if node_type == 'Seq Scan':
+        unbounded.append(f"Seq Scan on {node['Relation Name']}")
+    elif node_type in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in node:
+        if 'Filter' in node or not limited:
+            unbounded.append(f"{node_type} using {node['Index Name']} without Index Cond")
+
+    limited = node_type == 'Limit' or (limited and node_type in STREAMING_NODES)
+    for position, child in enumerate(node.get('Plans', ())):
+        # Jointure: seul le côté externe est arrêté par le Limit, l'interne est relu pour chaque ligne
+        unbounded += _postgres_unbounded(child, limited and position == 0)
+    return unbounded
+
+
+def postgres_plan(connection, stmt):
+    """(lignes du plan, parcours non bornés) d'EXPLAIN, l'arbre lu en JSON"""
+    sql, params = _compile(connection, stmt)
+    plan = [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + sql, params)]
+    tree = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql, params).scalar()
+    return plan, _postgres_unbounded(tree[0]['Plan'])
+
+
+def check(label, uri, rows):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    db.init_app(app)
+
+    failures = []
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(rows)
+
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('ANALYZE')
+            if connection.dialect.name == 'postgresql':
+                connection.exec_driver_sql('SET enable_seqscan = off')
+
+            explain = sqlite_plan if connection.dialect.name == 'sqlite' else postgres_plan
+            for name, query in hot_queries().items():
+                stmt = getattr(query, 'statement', query)  # Query ORM -> Select
+                plan, unbounded = explain(connection, stmt)
+                if not unbounded:
+                    status = 'ok'
+                elif name in FULL_SCANS:
+                    status = f'full scan by design ({FULL_SCANS[name]})'
+                else:
+                    status = 'UNBOUNDED SCAN'
+                    failures.append(f"{label}:{name}")
+                print(f"[{label}] {name:<36} {status}")
+                for line in plan:
+                    print(f"        {line}")
+
+        db.drop_all()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--postgres', default=os.getenv('BENCH_POSTGRES_URI'))
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        failures = check('sqlite', 'sqlite:///' + os.path.join(tmp, 'plans.db'), args.rows)
+
+    if args.postgres:
+        failures += check('postgresql', args.postgres, args.rows)
+    else:
+        print("\nPostgreSQL skipped (set --postgres or BENCH_POSTGRES_URI)")
+
+    if failures:
+        print(f"\n❌ Unbounded scans: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ Every hot query is served by an index seek or a LIMIT-bounded index walk")
+
+
+if __name__ == '__main__':
+    main()
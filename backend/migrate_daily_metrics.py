@@ -0,0 +1,69 @@
+"""
+Database migration script for the daily platform metrics rollup
+- adds challenge.ended_at (date of the failed/funded transition)
+- creates daily_platform_metrics, rollup_watermark and the indexes the rollup reads through
+- stamps approval_timestamp (the rollup's event time) on completed payments that lack it
+- runs the first rollup, which backfills the history
+
+Does not import app.py: the app loads challenges at startup and would fail
+before challenge.ended_at exists. Safe to run several times (SQLite and PostgreSQL).
+Run it before migrate_indexes.py, which indexes challenge.ended_at.
+"""
+
+import os
+from dotenv import load_dotenv
+from flask import Flask
+from sqlalchemy import inspect, text
+
+load_dotenv()
+
+from extensions import db
+from models import User, Challenge, Trade, Transaction, DailyPlatformMetrics, RollupWatermark
+from modules.platform_metrics import rollup_daily_metrics
+
+
+def get_database_uri():
+    """Same configuration as app.py"""
+    if os.getenv('DB_TYPE', 'sqlite') == 'postgresql':
+        return 'postgresql://{}:{}@{}:{}/{}'.format(
+            os.getenv('DB_USER', 'postgres'), os.getenv('DB_PASSWORD', ''),
+            os.getenv('DB_HOST', 'localhost'), os.getenv('DB_PORT', '5432'),
+            os.getenv('DB_NAME', 'tradeorange_db'))
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    return 'sqlite:///' + os.path.join(basedir, 'tradesense.db')
+
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = get_database_uri()
+db.init_app(app)
+
+print("🔄 Starting daily metrics migration...")
+
+with app.app_context():
+    columns = [column['name'] for column in inspect(db.engine).get_columns('challenge')]
+    if 'ended_at' not in columns:
+        db.session.execute(text('ALTER TABLE challenge ADD COLUMN ended_at TIMESTAMP'))
+        db.session.commit()
+        print("✅ challenge.ended_at added (existing failed/funded challenges keep NULL)")
+    else:
+        print("✅ challenge.ended_at already present")
+
+    db.create_all()  # daily_platform_metrics, rollup_watermark
+    print("✅ daily_platform_metrics and rollup_watermark tables ready")
+
+    for model in (User, Challenge, Trade, Transaction, DailyPlatformMetrics, RollupWatermark):
+        for index in model.__table__.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+    print("✅ Indexes created")
+
+    # Paiements réglés à la création avant que payment.py ne pose approval_timestamp
+    settled = Transaction.query.filter(
+        Transaction.approval_timestamp.is_(None), Transaction.status == 'completed'
+    ).update({Transaction.approval_timestamp: Transaction.timestamp}, synchronize_session=False)
+    db.session.commit()
+    print(f"✅ approval_timestamp set on {settled} completed payments")
+
+    days = rollup_daily_metrics()
+    print(f"✅ Initial rollup: {len(days)} days aggregated")
+
+print("🎉 Daily metrics migration completed successfully!")
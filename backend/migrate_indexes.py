@@ -0,0 +1,76 @@
+"""
+Database migration script to add the composite indexes declared in models.py
+Safe to run several times: existing indexes are skipped (SQLite and PostgreSQL)
+
+Run after migrate_daily_metrics.py: some indexes cover columns it adds
+(challenge.ended_at). The script checks that every indexed column exists and
+stops before creating anything otherwise. Like migrate_daily_metrics.py, it
+does not import app.py, which loads challenges at startup.
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+from flask import Flask
+from sqlalchemy import inspect, text
+
+load_dotenv()
+
+from extensions import db
+from models import User, Challenge, Trade, Transaction, AdminLog, EquitySnapshot
+
+# Index remplacés par une version composite (timestamp, id) pour la pagination keyset
+SUPERSEDED_INDEXES = ['ix_transaction_timestamp', 'ix_admin_log_timestamp']
+
+
+def get_database_uri():
+    """Same configuration as app.py"""
+    if os.getenv('DB_TYPE', 'sqlite') == 'postgresql':
+        return 'postgresql://{}:{}@{}:{}/{}'.format(
+            os.getenv('DB_USER', 'postgres'), os.getenv('DB_PASSWORD', ''),
+            os.getenv('DB_HOST', 'localhost'), os.getenv('DB_PORT', '5432'),
+            os.getenv('DB_NAME', 'tradeorange_db'))
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    return 'sqlite:///' + os.path.join(basedir, 'tradesense.db')
+
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = get_database_uri()
+db.init_app(app)
+
+print("🔄 Starting index migration...")
+
+with app.app_context():
+    tables = [model.__table__ for model in (User, Challenge, Trade, Transaction, AdminLog, EquitySnapshot)]
+
+    # Colonnes indexées absentes de la base: migration précédente non appliquée
+    inspector = inspect(db.engine)
+    missing_tables = [table.name for table in tables if not inspector.has_table(table.name)]
+    missing = []
+    for table in tables:
+        if table.name in missing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            missing += [f"{table.name}.{column.name} ({index.name})"
+                        for column in index.columns if column.name not in existing]
+    if missing_tables:
+        print(f"❌ Missing tables: {', '.join(missing_tables)} (start the app once to create them)")
+    if missing:
+        print(f"❌ Missing indexed columns: {', '.join(missing)}")
+        print("   Run migrate_daily_metrics.py first, then this script again.")
+    if missing_tables or missing:
+        sys.exit(1)
+
+    for table in tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            columns = ', '.join(column.name for column in index.columns)
+            index.create(bind=db.engine, checkfirst=True)
+            print(f"✅ {table.name}.{index.name} ({columns})")
+
+    for name in SUPERSEDED_INDEXES:
+        db.session.execute(text(f'DROP INDEX IF EXISTS {name}'))
+        print(f"🗑️  {name} dropped")
+    db.session.commit()
+
+print("🎉 Index migration completed successfully!")
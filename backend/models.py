@@ -13,6 +13,9 @@ class User(db.Model):
     last_login = db.Column(db.DateTime, nullable=True)
     challenges = db.relationship('Challenge', backref='user', lazy=True)
     transactions = db.relationship('Transaction', foreign_keys='Transaction.user_id', backref='user', lazy=True)
+    __table_args__ = (
+        db.Index('ix_user_created_at', 'created_at'),  # Rollup incrémental des inscriptions
+    )
 
 class Challenge(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -21,7 +24,13 @@ class Challenge(db.Model):
     start_balance = db.Column(db.Float, default=5000.0)
     current_equity = db.Column(db.Float, default=5000.0)
     start_date = db.Column(db.DateTime, default=datetime.utcnow)
+    ended_at = db.Column(db.DateTime, nullable=True)  # Passage en failed/funded
     trades = db.relationship('Trade', backref='challenge', lazy=True)
+    __table_args__ = (
+        db.Index('ix_challenge_status', 'status'),
+        db.Index('ix_challenge_user_id', 'user_id'),
+        db.Index('ix_challenge_ended_at_status', 'ended_at', 'status'),  # Rollup incrémental des résultats
+    )
 
 class Trade(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -35,6 +44,10 @@ class Trade(db.Model):
     status = db.Column(db.String(10), default='open') # open, closed
     profit = db.Column(db.Float, default=0.0)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.Index('ix_trade_challenge_status', 'challenge_id', 'status'),
+        db.Index('ix_trade_status_timestamp', 'status', 'timestamp'),  # Trades clôturés depuis le watermark
+    )
 
 class Transaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -46,6 +59,14 @@ class Transaction(db.Model):
     approval_timestamp = db.Column(db.DateTime, nullable=True)
     rejection_reason = db.Column(db.String(500), nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.Index('ix_transaction_status_type_timestamp', 'status', 'type', 'timestamp'),
+        db.Index('ix_transaction_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_transaction_timestamp_id', 'timestamp', 'id'),  # Admin listing, keyset cursor
+        db.Index('ix_transaction_status_timestamp_id', 'status', 'timestamp', 'id'),  # Admin listing by status, pending
+        db.Index('ix_transaction_status_type_amount', 'status', 'type', 'amount'),  # Dashboard totals, index only
+        db.Index('ix_transaction_approval_timestamp', 'approval_timestamp'),  # Rollup incrémental
+    )
 
 class AdminLog(db.Model):
     """Audit trail for all admin actions"""
@@ -58,6 +79,9 @@ class AdminLog(db.Model):
     details = db.Column(db.Text, nullable=True)
     ip_address = db.Column(db.String(50), nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.Index('ix_admin_log_timestamp_id', 'timestamp', 'id'),  # Keyset cursor
+    )
 
 class PlatformConfig(db.Model):
     """Platform configuration settings"""
@@ -67,3 +91,42 @@ class PlatformConfig(db.Model):
     value = db.Column(db.Text, nullable=False)
     updated_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class EquitySnapshot(db.Model):
+    """Start-of-day equity of each active challenge, one row per session"""
+    __tablename__ = 'equity_snapshot'
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('challenge.id'), nullable=False)
+    session_date = db.Column(db.Date, nullable=False)
+    start_of_day_equity = db.Column(db.Float, nullable=False)
+    high_water_mark = db.Column(db.Float, nullable=True)  # Intraday peak, flushed periodically by the equity engine
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # The unique index doubles as the lookup path for the daily-loss rule
+    __table_args__ = (
+        db.UniqueConstraint('challenge_id', 'session_date', name='uq_equity_snapshot_challenge_session'),
+        # Snapshots of one session: engine session start, already-taken check of the daily snapshot job
+        db.Index('ix_equity_snapshot_session_challenge', 'session_date', 'challenge_id'),
+    )
+
+class DailyPlatformMetrics(db.Model):
+    """Per-day platform aggregates, maintained incrementally by the metrics rollup job"""
+    __tablename__ = 'daily_platform_metrics'
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, unique=True)
+    signups = db.Column(db.Integer, default=0)
+    payments_count = db.Column(db.Integer, default=0)
+    payments_amount = db.Column(db.Float, default=0.0)
+    withdrawals_count = db.Column(db.Integer, default=0)
+    withdrawals_amount = db.Column(db.Float, default=0.0)
+    challenges_failed = db.Column(db.Integer, default=0)
+    challenges_funded = db.Column(db.Integer, default=0)
+    trades_closed = db.Column(db.Integer, default=0)
+    closed_pnl = db.Column(db.Float, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RollupWatermark(db.Model):
+    """Upper bound of the source rows already folded into a rollup table"""
+    __tablename__ = 'rollup_watermark'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+    value = db.Column(db.DateTime, nullable=False)
@@ -1,11 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from extensions import db
 from models import User, Transaction, Challenge, Trade, AdminLog, PlatformConfig
 from werkzeug.security import generate_password_hash, check_password_hash
 from modules.admin_auth import require_admin, log_admin_action
+from modules.admin_stats import platform_stats, invalidate_admin_stats
+from modules.platform_metrics import get_daily_metrics, get_rollup_watermark
 from datetime import datetime, timedelta
-from sqlalchemy import func, desc
-from modules.bvc_scraper import BVCScraper
+from sqlalchemy import func, desc, tuple_
+from modules.bvc_board import bvc_board
+from modules.cache import cache_stats
+from modules.leaderboard import ranking
+import base64
+import csv
+import io
+import json
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -88,6 +96,12 @@ def get_users(admin_user):
     # Pagination
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
+    # Nombre de challenges de la page en une seule requête groupée
+    user_ids = [u.id for u in pagination.items]
+    challenge_counts = dict(db.session.query(
+        Challenge.user_id, func.count(Challenge.id)
+    ).filter(Challenge.user_id.in_(user_ids)).group_by(Challenge.user_id).all()) if user_ids else {}
+    
     users = [{
         'id': u.id,
         'username': u.username,
@@ -97,7 +111,7 @@ def get_users(admin_user):
         'is_suspended': u.is_suspended,
         'created_at': u.created_at.isoformat() if u.created_at else None,
         'last_login': u.last_login.isoformat() if u.last_login else None,
-        'challenge_count': len(u.challenges)
+        'challenge_count': challenge_counts.get(u.id, 0)
     } for u in pagination.items]
     
     return jsonify({
@@ -173,6 +187,7 @@ def update_user(admin_user, user_id):
         log_admin_action(admin_user.id, action, 'user', user_id)
     
     db.session.commit()
+    invalidate_admin_stats()
     
     return jsonify({
         'success': True,
@@ -199,8 +214,12 @@ def delete_user(admin_user, user_id):
         return jsonify({'success': False, 'message': 'Impossible de supprimer votre propre compte'}), 400
     
     username = user.username
+    challenge_ids = [challenge.id for challenge in user.challenges]
     db.session.delete(user)
     db.session.commit()
+    invalidate_admin_stats()
+    # Retrait du classement: la version change, les pages en cache ne sont plus servies
+    ranking.remove(challenge_ids)
     
     log_admin_action(admin_user.id, 'user_deleted', 'user', user_id, f"Deleted user: {username}")
     
@@ -229,41 +248,160 @@ def reset_user_password(admin_user, user_id):
         'new_password': new_password
     }), 200
 
+# ==================== KEYSET PAGINATION & EXPORT ====================
+
+EXPORT_BATCH_SIZE = 1000
+
+def encode_cursor(timestamp, row_id):
+    """Curseur opaque sur (timestamp, id) de la dernière ligne servie"""
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Inverse de encode_cursor; ValueError si le curseur est invalide"""
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def newest_first(query, model):
+    """Ordre des listings admin: (timestamp, id) décroissants, servi par les index (..., timestamp, id)"""
+    return query.order_by(desc(model.timestamp), desc(model.id))
+
+def keyset_query(query, model, cursor, limit):
+    """Requête de la page suivant `cursor` (limit + 1 lignes pour savoir s'il en reste)"""
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.timestamp, model.id) < tuple_(timestamp, row_id))
+    return newest_first(query, model).limit(limit + 1)
+
+def keyset_page(query, model, cursor, limit):
+    """
+    Page suivante d'une requête triée par (timestamp, id) décroissants.
+
+    The WHERE (timestamp, id) < cursor condition seeks directly into the
+    (timestamp, id) index, so page 10 000 costs the same as page 1, unlike
+    OFFSET which reads and discards every previous row.
+    Returns (rows, next_cursor), next_cursor is None on the last page.
+    """
+    rows = keyset_query(query, model, cursor, limit).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1][0]
+    return rows, encode_cursor(last.timestamp, last.id)
+
+def stream_export(query, model, serialize, fieldnames, export_format, filename):
+    """
+    Réponse streamée (CSV ou NDJSON) depuis un curseur côté serveur.
+
+    Rows are fetched EXPORT_BATCH_SIZE at a time (yield_per: a named cursor
+    on PostgreSQL) and written out as they arrive, so memory stays constant
+    whatever the number of rows. The CSV header comes from `fieldnames`, so an
+    export that matches no row still has one.
+    """
+    rows = newest_first(query, model).yield_per(EXPORT_BATCH_SIZE)
+
+    def generate_ndjson():
+        for row in rows:
+            yield json.dumps(serialize(*row)) + '\n'
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(serialize(*row))
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    if export_format == 'ndjson':
+        generator, mimetype = generate_ndjson(), 'application/x-ndjson'
+    else:
+        generator, mimetype = generate_csv(), 'text/csv'
+
+    return Response(stream_with_context(generator), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}.{export_format}'
+    })
+
 # ==================== TRANSACTION MANAGEMENT ====================
 
+TRANSACTION_EXPORT_FIELDS = ['id', 'user_id', 'user', 'amount', 'type', 'status', 'timestamp',
+                             'approved_by', 'approval_timestamp', 'rejection_reason']
+
+def _serialize_transaction(t, username):
+    return {
+        'id': t.id,
+        'user_id': t.user_id,
+        'user': username or 'Unknown',
+        'amount': t.amount,
+        'type': t.type,
+        'status': t.status,
+        'timestamp': t.timestamp.isoformat(),
+        'approved_by': t.approved_by,
+        'approval_timestamp': t.approval_timestamp.isoformat() if t.approval_timestamp else None,
+        'rejection_reason': t.rejection_reason
+    }
+
+def transactions_query(status_filter=None, type_filter=None):
+    """Transactions filtrées par statut et type, username résolu par jointure"""
+    # Username résolu par jointure: pas de requête supplémentaire par ligne
+    query = db.session.query(Transaction, User.username).outerjoin(User, User.id == Transaction.user_id)
+    
+    if status_filter:
+        query = query.filter(Transaction.status == status_filter)
+    
+    if type_filter:
+        query = query.filter(Transaction.type == type_filter)
+    
+    return query
+
+def _request_transactions_query():
+    """transactions_query avec les filtres ?status et ?type de la requête"""
+    return transactions_query(request.args.get('status'), request.args.get('type'))
+
+def pending_transactions_query():
+    """Transactions en attente, plus anciennes d'abord (index (status, timestamp, id))"""
+    return db.session.query(Transaction, User.username).outerjoin(
+        User, User.id == Transaction.user_id
+    ).filter(Transaction.status == 'pending').order_by(Transaction.timestamp, Transaction.id)
+
 @admin_bp.route('/api/admin/transactions', methods=['GET'])
 @require_admin
 def get_transactions(admin_user):
-    """Get all transactions with filters"""
+    """
+    Get all transactions with filters
+    
+    Query params:
+        - cursor: pagination par curseur (keyset); vide pour la première page,
+          puis la valeur 'next_cursor' de la réponse précédente
+        - page / per_page: pagination par offset (historique)
+    """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
-    status_filter = request.args.get('status')
-    type_filter = request.args.get('type')
+    query = _request_transactions_query()
     
-    query = Transaction.query
-    
-    if status_filter:
-        query = query.filter_by(status=status_filter)
-    
-    if type_filter:
-        query = query.filter_by(type=type_filter)
+    if 'cursor' in request.args:
+        try:
+            rows, next_cursor = keyset_page(query, Transaction, request.args['cursor'], per_page)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'transactions': [_serialize_transaction(t, username) for t, username in rows],
+            'next_cursor': next_cursor
+        }), 200
     
-    pagination = query.order_by(desc(Transaction.timestamp)).paginate(
+    pagination = newest_first(query, Transaction).paginate(
         page=page, per_page=per_page, error_out=False
     )
     
-    transactions = [{
-        'id': t.id,
-        'user_id': t.user_id,
-        'user': User.query.get(t.user_id).username if User.query.get(t.user_id) else 'Unknown',
-        'amount': t.amount,
-        'type': t.type,
-        'status': t.status,
-        'timestamp': t.timestamp.isoformat(),
-        'approved_by': t.approved_by,
-        'approval_timestamp': t.approval_timestamp.isoformat() if t.approval_timestamp else None,
-        'rejection_reason': t.rejection_reason
-    } for t in pagination.items]
+    transactions = [_serialize_transaction(t, username) for t, username in pagination.items]
     
     return jsonify({
         'success': True,
@@ -273,20 +411,33 @@ def get_transactions(admin_user):
         'current_page': page
     }), 200
 
+@admin_bp.route('/api/admin/transactions/export', methods=['GET'])
+@require_admin
+def export_transactions(admin_user):
+    """Export streamé des transactions (?format=csv|ndjson, mêmes filtres que la liste)"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'message': 'Format non supporté (csv, ndjson)'}), 400
+    
+    log_admin_action(admin_user.id, 'transactions_exported', details=f"Format: {export_format}")
+    
+    return stream_export(_request_transactions_query(), Transaction, _serialize_transaction,
+                         TRANSACTION_EXPORT_FIELDS, export_format, 'transactions')
+
 @admin_bp.route('/api/admin/transactions/pending', methods=['GET'])
 @require_admin
 def get_pending_transactions(admin_user):
     """Get pending transactions requiring approval"""
-    pending = Transaction.query.filter_by(status='pending').order_by(Transaction.timestamp).all()
+    pending = pending_transactions_query().all()
     
     transactions = [{
         'id': t.id,
         'user_id': t.user_id,
-        'user': User.query.get(t.user_id).username if User.query.get(t.user_id) else 'Unknown',
+        'user': username or 'Unknown',
         'amount': t.amount,
         'type': t.type,
         'timestamp': t.timestamp.isoformat()
-    } for t in pending]
+    } for t, username in pending]
     
     return jsonify({
         'success': True,
@@ -303,11 +454,16 @@ def approve_transaction(admin_user, transaction_id):
     if not transaction:
         return jsonify({'success': False, 'message': 'Transaction non trouvée'}), 404
     
+    # approval_timestamp est la date d'effet du rollup quotidien: elle n'est posée qu'une fois
+    if transaction.status != 'pending':
+        return jsonify({'success': False, 'message': 'Transaction déjà traitée'}), 409
+    
     transaction.status = 'approved'
     transaction.approved_by = admin_user.id
     transaction.approval_timestamp = datetime.utcnow()
     
     db.session.commit()
+    invalidate_admin_stats()
     
     log_admin_action(admin_user.id, 'transaction_approved', 'transaction', transaction_id,
                     f"Amount: {transaction.amount}, Type: {transaction.type}")
@@ -326,6 +482,10 @@ def reject_transaction(admin_user, transaction_id):
     if not transaction:
         return jsonify({'success': False, 'message': 'Transaction non trouvée'}), 404
     
+    # approval_timestamp est la date d'effet du rollup quotidien: elle n'est posée qu'une fois
+    if transaction.status != 'pending':
+        return jsonify({'success': False, 'message': 'Transaction déjà traitée'}), 409
+    
     data = request.get_json()
     reason = data.get('reason', 'Non spécifié')
     
@@ -335,6 +495,7 @@ def reject_transaction(admin_user, transaction_id):
     transaction.rejection_reason = reason
     
     db.session.commit()
+    invalidate_admin_stats()
     
     log_admin_action(admin_user.id, 'transaction_rejected', 'transaction', transaction_id,
                     f"Reason: {reason}")
@@ -350,40 +511,11 @@ def reject_transaction(admin_user, transaction_id):
 @require_admin
 def get_financial_summary(admin_user):
     """Get platform financial summary"""
-    
-    # Total deposits
-    total_deposits = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == 'deposit',
-        Transaction.status == 'approved'
-    ).scalar() or 0
-    
-    # Total withdrawals
-    total_withdrawals = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == 'withdrawal',
-        Transaction.status == 'approved'
-    ).scalar() or 0
-    
-    # Pending withdrawals
-    pending_withdrawals = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == 'withdrawal',
-        Transaction.status == 'pending'
-    ).scalar() or 0
-    
-    # Total payments (revenue)
-    total_revenue = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.type == 'payment',
-        Transaction.status.in_(['approved', 'completed'])
-    ).scalar() or 0
+    summary = platform_stats.get()['financials']
     
     return jsonify({
         'success': True,
-        'summary': {
-            'total_deposits': total_deposits,
-            'total_withdrawals': total_withdrawals,
-            'pending_withdrawals': pending_withdrawals,
-            'total_revenue': total_revenue,
-            'net_balance': total_deposits - total_withdrawals
-        }
+        'summary': dict(summary, net_balance=summary['total_deposits'] - summary['total_withdrawals'])
     }), 200
 
 # ==================== PLATFORM CONFIGURATION ====================
@@ -437,71 +569,82 @@ def update_platform_config(admin_user):
 @require_admin
 def get_dashboard_stats(admin_user):
     """Get key metrics for admin dashboard"""
-    
-    # User statistics
-    total_users = User.query.count()
-    active_users = User.query.filter_by(is_suspended=False).count()
-    admin_users = User.query.filter_by(role='admin').count()
-    
-    # Challenge statistics
-    total_challenges = Challenge.query.count()
-    active_challenges = Challenge.query.filter_by(status='active').count()
-    funded_challenges = Challenge.query.filter_by(status='funded').count()
-    
-    # Transaction statistics
-    pending_transactions = Transaction.query.filter_by(status='pending').count()
-    
-    # Recent user growth (last 30 days)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    new_users_30d = User.query.filter(User.created_at >= thirty_days_ago).count()
-    
-    # Trading volume (total equity in active challenges)
-    total_trading_volume = db.session.query(func.sum(Challenge.current_equity)).filter(
-        Challenge.status == 'active'
-    ).scalar() or 0
+    # Une requête agrégée par table, mise en cache (voir modules/admin_stats.py)
+    stats = platform_stats.get()
     
     return jsonify({
         'success': True,
         'stats': {
-            'users': {
-                'total': total_users,
-                'active': active_users,
-                'admins': admin_users,
-                'new_30d': new_users_30d
-            },
-            'challenges': {
-                'total': total_challenges,
-                'active': active_challenges,
-                'funded': funded_challenges
-            },
-            'transactions': {
-                'pending': pending_transactions
-            },
-            'trading_volume': total_trading_volume
+            'users': stats['users'],
+            'challenges': stats['challenges'],
+            'transactions': stats['transactions'],
+            'trading_volume': stats['trading_volume']
         }
     }), 200
 
-@admin_bp.route('/api/admin/logs', methods=['GET'])
+@admin_bp.route('/api/admin/cache-stats', methods=['GET'])
 @require_admin
-def get_admin_logs(admin_user):
-    """Get admin activity logs"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
-    
-    pagination = AdminLog.query.order_by(desc(AdminLog.timestamp)).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+def get_cache_stats(admin_user):
+    """Compteurs des caches de réponses (hits, misses, évictions, taux de hit, occupation)"""
+    return jsonify({
+        'success': True,
+        'caches': cache_stats()
+    }), 200
+
+@admin_bp.route('/api/admin/analytics/daily', methods=['GET'])
+@require_admin
+def get_daily_analytics(admin_user):
+    """Série quotidienne (?days=30, max 365) lue dans la table de rollup daily_platform_metrics"""
+    days = min(max(request.args.get('days', 30, type=int), 1), 365)
+    as_of = get_rollup_watermark()
     
-    logs = [{
+    return jsonify({
+        'success': True,
+        'days': get_daily_metrics(days),
+        'as_of': as_of.isoformat() if as_of else None
+    }), 200
+
+LOG_EXPORT_FIELDS = ['id', 'admin', 'action', 'target_type', 'target_id', 'details', 'ip_address', 'timestamp']
+
+def _serialize_log(log, username):
+    return {
         'id': log.id,
-        'admin': User.query.get(log.admin_id).username if User.query.get(log.admin_id) else 'Unknown',
+        'admin': username or 'Unknown',
         'action': log.action,
         'target_type': log.target_type,
         'target_id': log.target_id,
         'details': log.details,
         'ip_address': log.ip_address,
         'timestamp': log.timestamp.isoformat()
-    } for log in pagination.items]
+    }
+
+def logs_query():
+    return db.session.query(AdminLog, User.username).outerjoin(User, User.id == AdminLog.admin_id)
+
+@admin_bp.route('/api/admin/logs', methods=['GET'])
+@require_admin
+def get_admin_logs(admin_user):
+    """Get admin activity logs (?cursor pour la pagination keyset, sinon page/per_page)"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+    
+    if 'cursor' in request.args:
+        try:
+            rows, next_cursor = keyset_page(logs_query(), AdminLog, request.args['cursor'], per_page)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'logs': [_serialize_log(log, username) for log, username in rows],
+            'next_cursor': next_cursor
+        }), 200
+    
+    pagination = newest_first(logs_query(), AdminLog).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    
+    logs = [_serialize_log(log, username) for log, username in pagination.items]
     
     return jsonify({
         'success': True,
@@ -510,6 +653,19 @@ def get_admin_logs(admin_user):
         'pages': pagination.pages,
         'current_page': page
     }), 200
+
+@admin_bp.route('/api/admin/logs/export', methods=['GET'])
+@require_admin
+def export_admin_logs(admin_user):
+    """Export streamé du journal d'audit (?format=csv|ndjson)"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'message': 'Format non supporté (csv, ndjson)'}), 400
+    
+    log_admin_action(admin_user.id, 'admin_logs_exported', details=f"Format: {export_format}")
+    
+    return stream_export(logs_query(), AdminLog, _serialize_log, LOG_EXPORT_FIELDS, export_format, 'admin_logs')
+
 # ==================== BVC STOCKS (BOURSE DE CASABLANCA) ====================
 
 @admin_bp.route('/api/admin/bvc-stocks', methods=['GET'])
@@ -523,7 +679,8 @@ def get_bvc_stocks(admin_user):
         - all: Si true, récupère toutes les actions disponibles
     """
     try:
-        scraper = BVCScraper()
+        # Lecture du snapshot du tableau BVC, rafraîchi en arrière-plan (modules/bvc_board.py)
+        snapshot = bvc_board.ensure_loaded()
         
         # Récupérer les paramètres
         symbols_param = request.args.get('symbols')
@@ -531,30 +688,33 @@ def get_bvc_stocks(admin_user):
         
         if get_all:
             # Récupérer toutes les actions disponibles
-            stocks_data = scraper.get_all_available_stocks()
+            symbols = None
             
         elif symbols_param:
             # Récupérer les actions spécifiques
             symbols = [s.strip() for s in symbols_param.split(',')]
-            stocks_data = scraper.get_multiple_stocks(symbols)
             
         else:
             # Par défaut, récupérer les principales actions
-            default_symbols = ['IAM', 'ATW', 'BCP', 'CIH', 'BOA', 'LHM', 'ADH']
-            stocks_data = scraper.get_multiple_stocks(default_symbols)
+            symbols = ['IAM', 'ATW', 'BCP', 'CIH', 'BOA', 'LHM', 'ADH']
+        
+        # Formatter les données pour la réponse, une fois par snapshot et par liste de symboles
+        def build(snapshot):
+            stocks_data = snapshot.quotes if symbols is None else snapshot.get_many(symbols)
+            stocks_list = []
+            for symbol, data in stocks_data.items():
+                stocks_list.append({
+                    'symbol': symbol,
+                    'name': symbol, 
+                    'price': data.get('price', 0),
+                    'currency': data.get('currency', 'MAD'),
+                    'source': data.get('source', 'BVC'),
+                    'timestamp': data.get('timestamp', datetime.now().isoformat()),
+                    'status': 'success' if data.get('price', 0) > 0 else 'error'
+                })
+            return stocks_list
         
-        # Formatter les données pour la réponse
-        stocks_list = []
-        for symbol, data in stocks_data.items():
-            stocks_list.append({
-                'symbol': symbol,
-                'name': symbol, 
-                'price': data.get('price', 0),
-                'currency': data.get('currency', 'MAD'),
-                'source': data.get('source', 'BVC'),
-                'timestamp': data.get('timestamp', datetime.now().isoformat()),
-                'status': 'success' if data.get('price', 0) > 0 else 'error'
-            })
+        stocks_list = bvc_board.cached(f"admin-stocks:{'*' if symbols is None else ','.join(symbols)}", build)
         
         log_admin_action(
             admin_user.id, 
@@ -566,7 +726,9 @@ def get_bvc_stocks(admin_user):
             'success': True,
             'count': len(stocks_list),
             'stocks': stocks_list,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': datetime.now().isoformat(),
+            'snapshot': snapshot.metadata(),
+            'fetch': bvc_board.scraper.fetcher.stats()
         }), 200
         
     except Exception as e:
@@ -581,8 +743,7 @@ def get_bvc_stocks(admin_user):
 def get_bvc_stock_detail(admin_user, symbol):
     """Récupère les détails d'une action BVC spécifique"""
     try:
-        scraper = BVCScraper()
-        stock_data = scraper.get_stock_price(symbol.upper())
+        stock_data = bvc_board.get(symbol)
         
         if stock_data and stock_data.get('price', 0) > 0:
             return jsonify({'success': True, 'stock': stock_data}), 200
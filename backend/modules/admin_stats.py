@@ -0,0 +1,124 @@
+"""
+Statistiques agrégées du tableau de bord admin
+One aggregate query per table (conditional aggregation for users and
+challenges, a GROUP BY (status, type) for transactions) feeds both
+/api/admin/dashboard/stats and /api/admin/financials/summary. The result is
+kept for ADMIN_STATS_TTL seconds and invalidated by the writes that move the
+figures (trade close, payment, transaction approval/rejection, user changes).
+"""
+
+import time
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+from extensions import db
+from models import User, Challenge, Transaction
+
+ADMIN_STATS_TTL = 30  # secondes
+
+
+def _count_if(condition):
+    return func.count(case((condition, 1)))
+
+
+def _sum_if(condition, column):
+    return func.coalesce(func.sum(case((condition, column))), 0)
+
+
+def transaction_totals_query():
+    """Nombre et montant des transactions par (status, type), lus sur l'index couvrant (status, type, amount)"""
+    return db.session.query(
+        Transaction.status, Transaction.type, func.count(), func.sum(Transaction.amount)
+    ).group_by(Transaction.status, Transaction.type)
+
+
+def compute_platform_stats():
+    """Les trois agrégats de la plateforme, une requête par table"""
+    # Fenêtre glissante de 30 x 24 h sur l'index de created_at, à jour à la seconde
+    # (le rollup quotidien, lui, ne compte que des jours entiers avec ROLLUP_LAG de retard)
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+
+    users = db.session.query(
+        func.count(User.id),
+        _count_if(User.is_suspended.is_(False)),
+        _count_if(User.role == 'admin'),
+        _count_if(User.created_at >= thirty_days_ago)
+    ).one()
+
+    challenges = db.session.query(
+        func.count(Challenge.id),
+        _count_if(Challenge.status == 'active'),
+        _count_if(Challenge.status == 'funded'),
+        _sum_if(Challenge.status == 'active', Challenge.current_equity)
+    ).one()
+
+    # Transactions: les totaux sont repliés ensuite sur une douzaine de groupes au plus
+    groups = {
+        (status, tx_type): (count, amount or 0)
+        for status, tx_type, count, amount in transaction_totals_query().all()
+    }
+
+    def total(statuses, tx_type):
+        return sum(groups.get((status, tx_type), (0, 0))[1] for status in statuses)
+
+    return {
+        'users': {
+            'total': users[0],
+            'active': users[1],
+            'admins': users[2],
+            'new_30d': users[3]
+        },
+        'challenges': {
+            'total': challenges[0],
+            'active': challenges[1],
+            'funded': challenges[2]
+        },
+        'trading_volume': challenges[3],
+        'transactions': {
+            'pending': sum(count for (status, _), (count, _) in groups.items() if status == 'pending')
+        },
+        'financials': {
+            'total_deposits': total(['approved'], 'deposit'),
+            'total_withdrawals': total(['approved'], 'withdrawal'),
+            'pending_withdrawals': total(['pending'], 'withdrawal'),
+            'total_revenue': total(['approved', 'completed'], 'payment')
+        }
+    }
+
+
+class PlatformStatsCache:
+    """Dernier résultat de compute_platform_stats, valable ttl secondes ou jusqu'à invalidate()"""
+
+    def __init__(self, ttl=ADMIN_STATS_TTL):
+        self.ttl = ttl
+        self._value = None
+        self._computed_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._value is not None and time.monotonic() - self._computed_at < self.ttl:
+                return self._value
+            generation = self._generation
+
+        value = compute_platform_stats()
+
+        with self._lock:
+            # Une invalidation pendant le calcul rend ce résultat potentiellement périmé
+            if generation == self._generation:
+                self._value = value
+                self._computed_at = time.monotonic()
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._generation += 1
+
+
+platform_stats = PlatformStatsCache()
+
+
+def invalidate_admin_stats():
+    platform_stats.invalidate()
@@ -0,0 +1,209 @@
+"""
+Cache persistant des barres historiques (Yahoo Finance)
+Past daily bars never change, yet the macro endpoints downloaded whole
+periods (up to 2 years) every time their response cache expired. This cache
+keeps one series per (ticker, interval) on disk and in memory:
+- the first download covers the longest period served for the interval
+- afterwards only the tail is downloaded, from the last stored bar (which
+  may still be forming) to now, at most once per REFRESH_AFTER seconds
+- every period (5d, 1mo, ..., 2y) is a slice of the cached series; a
+  period longer than MAX_HISTORY for the interval is refused, not clamped
+After a restart the series are read back from disk: a cold start only
+downloads the tails.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+# Fenêtres servies, en décalage calendaire depuis aujourd'hui (mêmes périodes que yfinance)
+PERIODS = {
+    '5d': pd.DateOffset(days=5),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+}
+
+# Historique téléchargé au premier accès, par intervalle (Yahoo limite l'horaire à 730 jours)
+MAX_HISTORY = {
+    '1d': pd.DateOffset(years=2),
+    '1h': pd.DateOffset(years=1),
+}
+
+# Âge maximal de la dernière barre avant de retélécharger la fin de série
+REFRESH_AFTER = 300
+
+DEFAULT_ROOT = os.getenv(
+    'BAR_CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'bars')
+)
+
+
+def yfinance_range(ticker, start, interval):
+    """Barres de `ticker` depuis `start` (inclus) jusqu'à maintenant"""
+    return yf.download(ticker, start=start.strftime('%Y-%m-%d'), interval=interval, progress=False)
+
+
+def _today():
+    return pd.Timestamp.now(tz='UTC').tz_localize(None).normalize()
+
+
+def period_available(period, interval='1d'):
+    """La période tient-elle dans l'historique conservé pour l'intervalle ('2y' en '1h': non)"""
+    if period not in PERIODS or interval not in MAX_HISTORY:
+        return False
+    today = _today()
+    return today - PERIODS[period] >= today - MAX_HISTORY[interval]
+
+
+def _normalize(frame):
+    """Colonnes simples Open..Volume, index UTC naïf trié, sans barres vides"""
+    if frame is None or frame.empty:
+        return pd.DataFrame(columns=list(COLUMNS), index=pd.DatetimeIndex([]), dtype=float)
+    if isinstance(frame.columns, pd.MultiIndex):
+        frame = frame.copy()
+        frame.columns = frame.columns.get_level_values(0)
+    frame = frame.reindex(columns=list(COLUMNS)).astype(float)
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    frame.index = index
+    frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+    return frame.dropna(subset=['Close'])
+
+
+class BarCache:
+    """
+    Séries de barres par (ticker, intervalle), complétées par la fin.
+
+    get() returns a DataFrame (Open, High, Low, Close, Volume) indexed by
+    tz-naive UTC timestamps; callers must not modify it.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, downloader=None, refresh_after=REFRESH_AFTER):
+        self.root = root
+        self.downloader = downloader or yfinance_range
+        self.refresh_after = refresh_after
+        self._series = {}   # {(ticker, interval): (frame, fetched_at)}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(('hits', 'disk_loads', 'full_downloads', 'tail_downloads', 'errors'), 0)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _path(self, ticker, interval):
+        name = re.sub(r'[^A-Za-z0-9._-]', lambda m: f'%{ord(m.group()):02X}', ticker.upper())
+        return os.path.join(self.root, interval, f'{name}.npz')
+
+    def _load(self, ticker, interval):
+        path = self._path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as stored:
+            frame = pd.DataFrame(
+                {column: stored[column] for column in COLUMNS},
+                index=pd.DatetimeIndex(stored['ts'].astype('datetime64[ns]'))
+            )
+            fetched_at = float(stored['fetched_at'])
+        self._count('disk_loads')
+        return frame, fetched_at
+
+    def _save(self, ticker, interval, frame, fetched_at):
+        path = self._path(ticker, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(
+                f, ts=frame.index.values.astype('datetime64[ns]').astype(np.int64),
+                fetched_at=np.float64(fetched_at),
+                **{column: frame[column].to_numpy(dtype=float) for column in COLUMNS}
+            )
+        os.replace(tmp, path)  # les lecteurs voient l'ancien fichier ou le nouveau, jamais un fichier partiel
+
+    def _download(self, ticker, start, interval):
+        return _normalize(self.downloader(ticker, start, interval))
+
+    def series(self, ticker, interval='1d', max_age=None):
+        """
+        Série complète en cache pour (ticker, intervalle), complétée si sa fin date de plus de
+        max_age secondes (refresh_after par défaut; 0 force le téléchargement de la fin)
+        """
+        max_age = self.refresh_after if max_age is None else max_age
+        key = (ticker, interval)
+        cached = self._series.get(key)
+        if cached and time.time() - cached[1] < max_age:
+            self._count('hits')
+            return cached[0]
+
+        with self._key_lock(key):
+            cached = self._series.get(key) or self._load(ticker, interval)
+            now = time.time()
+            if cached and now - cached[1] < max_age:
+                self._series[key] = cached
+                return cached[0]
+
+            try:
+                if cached and not cached[0].empty:
+                    # Depuis la dernière barre stockée: elle peut avoir changé si elle était en cours
+                    frame = cached[0]
+                    tail = self._download(ticker, frame.index[-1].normalize(), interval)
+                    self._count('tail_downloads')
+                    if not tail.empty:
+                        frame = pd.concat([frame[frame.index < tail.index[0]], tail])
+                else:
+                    start = _today() - MAX_HISTORY.get(interval, MAX_HISTORY['1d'])
+                    frame = self._download(ticker, start, interval)
+                    self._count('full_downloads')
+            except Exception as e:
+                self._count('errors')
+                logger.error(f"Bar download failed for {ticker} ({interval}): {e}")
+                if cached:
+                    return cached[0]  # série périmée plutôt que rien
+                raise
+
+            if frame.empty:
+                return frame  # rien à mettre en cache: le prochain appel retente
+            self._save(ticker, interval, frame, now)
+            self._series[key] = (frame, now)
+            return frame
+
+    def get(self, ticker, period='6mo', interval='1d', max_age=None):
+        """Barres de la période demandée, découpées dans la série en cache"""
+        if period not in PERIODS:
+            raise ValueError(f"Unsupported period: {period}")
+        if not period_available(period, interval):
+            # Pas de découpe silencieuse: la série ne couvre que MAX_HISTORY de l'intervalle
+            raise ValueError(f"Period {period} exceeds the history kept for interval {interval}")
+        frame = self.series(ticker, interval, max_age)
+        start = _today() - PERIODS[period]
+        return frame[frame.index >= start]
+
+    def fetched_at(self, ticker, interval='1d'):
+        """Epoch du dernier téléchargement réussi de la série en mémoire, ou None"""
+        cached = self._series.get((ticker, interval))
+        return cached[1] if cached else None
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+# Instance partagée par les endpoints macro
+bar_cache = BarCache()
@@ -0,0 +1,168 @@
+"""
+Tableau BVC en mémoire
+A background job scrapes the full Casablanca board on a schedule tied to the
+market session and publishes an immutable snapshot. Endpoints and the trading
+price path read the current snapshot (one dict lookup) instead of scraping on
+the request thread.
+"""
+
+import threading
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from modules.bvc_scraper import BVCScraper, is_bvc_session_open
+from modules.cache import Cache
+
+logger = logging.getLogger(__name__)
+
+# Période de rafraîchissement (secondes): en séance, et hors séance où les cours ne bougent pas
+REFRESH_INTERVAL_OPEN = 60
+REFRESH_INTERVAL_CLOSED = 900
+
+# Un snapshot est signalé périmé au-delà de STALE_FACTOR périodes sans rafraîchissement réussi
+STALE_FACTOR = 3
+
+
+def normalize_symbol(symbol):
+    return symbol.upper().replace('.MA', '')
+
+
+@dataclass(frozen=True)
+class BoardSnapshot:
+    """Cotations publiées ensemble; jamais modifié après publication"""
+    quotes: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    fetched_at: datetime = None  # UTC, None tant qu'aucun scraping n'a abouti
+    session_open: bool = False
+    duration: float = 0.0
+
+    def age(self, now=None):
+        if self.fetched_at is None:
+            return None
+        return ((now or datetime.utcnow()) - self.fetched_at).total_seconds()
+
+    def get_many(self, symbols):
+        """{symbole demandé: cotation (copie)} pour les symboles présents au tableau"""
+        results = {}
+        for symbol in symbols:
+            quote = self.quotes.get(normalize_symbol(symbol))
+            if quote:
+                results[symbol] = dict(quote)
+        return results
+
+    def metadata(self, now=None):
+        """Fraîcheur du snapshot, jointe aux réponses des endpoints BVC"""
+        age = self.age(now)
+        interval = REFRESH_INTERVAL_OPEN if is_bvc_session_open() else REFRESH_INTERVAL_CLOSED
+        sources = {}
+        for quote in self.quotes.values():
+            sources[quote['source']] = sources.get(quote['source'], 0) + 1
+        return {
+            'fetched_at': self.fetched_at.isoformat() + 'Z' if self.fetched_at else None,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'stale': age is None or age > interval * STALE_FACTOR,
+            'session_open': self.session_open,
+            'sources': sources,
+            'scrape_seconds': round(self.duration, 3),
+        }
+
+
+class BVCBoard:
+    """
+    Snapshot courant du tableau BVC et son rafraîchissement.
+
+    Readers take a reference to the current snapshot and never lock; refresh()
+    builds a complete new snapshot off to the side and swaps the reference.
+    """
+
+    def __init__(self, scraper=None):
+        self.scraper = scraper or BVCScraper()
+        self._snapshot = BoardSnapshot()
+        self._refresh_lock = threading.Lock()
+        self._listeners = []
+        self.last_error = None
+        # Réponses dérivées d'un snapshot; en mémoire, le snapshot étant propre au processus
+        self.cache = Cache('bvc', ttl=REFRESH_INTERVAL_CLOSED, max_entries=512, max_bytes=8 * 1024 * 1024)
+
+    def add_listener(self, callback):
+        """Appelé avec chaque nouveau snapshot publié"""
+        self._listeners.append(callback)
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def refresh(self):
+        """Scrape tout le tableau et publie un nouveau snapshot; conserve l'ancien en cas d'échec"""
+        with self._refresh_lock:
+            started = datetime.utcnow()
+            try:
+                quotes = self.scraper.get_all_available_stocks()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"BVC board refresh failed: {e}")
+                return self._snapshot
+
+            finished = datetime.utcnow()
+            self._snapshot = BoardSnapshot(
+                quotes=MappingProxyType({symbol: dict(quote) for symbol, quote in quotes.items()}),
+                fetched_at=finished,
+                session_open=is_bvc_session_open(),
+                duration=(finished - started).total_seconds()
+            )
+            self.last_error = None
+            snapshot = self._snapshot
+
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Error in BVC board listener: {e}")
+        return snapshot
+
+    def refresh_if_due(self):
+        """Appelé par l'ordonnanceur: rafraîchit selon la période de la séance, ou à l'ouverture/clôture"""
+        snapshot = self._snapshot
+        session_open = is_bvc_session_open()
+        interval = REFRESH_INTERVAL_OPEN if session_open else REFRESH_INTERVAL_CLOSED
+        age = snapshot.age()
+        if age is None or age >= interval or snapshot.session_open != session_open:
+            return self.refresh()
+        return snapshot
+
+    def ensure_loaded(self):
+        """Premier snapshot: seul cas où un lecteur attend le scraping (démarrage à froid)"""
+        if self._snapshot.fetched_at is None:
+            with self._refresh_lock:
+                loaded = self._snapshot.fetched_at is not None
+            if not loaded:
+                self.refresh()
+        return self._snapshot
+
+    def get(self, symbol):
+        """Cotation d'un symbole (copie), ou None s'il n'est pas au tableau"""
+        quote = self.ensure_loaded().quotes.get(normalize_symbol(symbol))
+        return dict(quote) if quote else None
+
+    def get_price(self, symbol):
+        quote = self.get(symbol)
+        return quote['price'] if quote else None
+
+    def get_many(self, symbols):
+        """{symbole demandé: cotation}, lus dans un même snapshot"""
+        return self.ensure_loaded().get_many(symbols)
+
+    def cached(self, key, build):
+        """
+        Valeur dérivée du snapshot courant (ex: liste formatée d'un endpoint),
+        calculée une fois par snapshot: build(snapshot) n'est rappelé qu'après
+        un nouveau scraping publié.
+        """
+        snapshot = self.ensure_loaded()
+        if snapshot.fetched_at is None:
+            return build(snapshot)  # premier scraping en échec: snapshot vide, rien à mettre en cache
+        return self.cache.get_or_load(f'{snapshot.fetched_at.isoformat()}:{key}', lambda: build(snapshot))
+
+
+# Instance partagée, rafraîchie par l'ordonnanceur de app.py
+bvc_board = BVCBoard()
@@ -0,0 +1,91 @@
+"""
+Parseur HTML rapide pour les pages de cotation BVC
+Parses with lxml (C parser, no BeautifulSoup tree) and only visits the rows
+of the selected quotation tables. Cell texts are extracted once, in a single
+pass, into a columnar structure shared by the BVC price scraper and the
+full-market scraper.
+"""
+
+from dataclasses import dataclass, field
+import lxml.html
+
+CELL_TAGS = ('td', 'th')
+
+
+@dataclass
+class QuotationRows:
+    """
+    Lignes de tableaux de cotation, stockées par colonne.
+
+    columns[j][i] is the stripped text of cell j of row i ('' when row i has
+    fewer cells), widths[i] the number of cells of row i.
+    """
+    columns: list = field(default_factory=list)
+    widths: list = field(default_factory=list)
+    fallback: bool = False  # aucun tableau ne portait les classes demandées
+
+    def __len__(self):
+        return len(self.widths)
+
+    def append(self, texts):
+        row = len(self.widths)
+        for j in range(len(self.columns), len(texts)):
+            self.columns.append([''] * row)
+        for j, column in enumerate(self.columns):
+            column.append(texts[j] if j < len(texts) else '')
+        self.widths.append(len(texts))
+
+    def column(self, j):
+        return self.columns[j] if j < len(self.columns) else [''] * len(self)
+
+    def row(self, i):
+        return [self.columns[j][i] for j in range(self.widths[i])]
+
+
+def _has_class(table, classes):
+    return bool(set((table.get('class') or '').split()) & set(classes))
+
+
+def _own_rows(table):
+    """
+    Lignes appartenant directement au tableau.
+
+    Rows of nested tables belong to those tables, and rows that wrap a nested
+    table (page layout) are skipped: their text is the whole inner table, so
+    every symbol would match them.
+    """
+    for tr in table.iter('tr'):
+        if next(tr.iterancestors('table'), None) is table and next(tr.iter('table'), None) is None:
+            yield tr
+
+
+def parse_quotation_rows(content, table_classes=None, skip_header=False):
+    """
+    Extrait les lignes des tableaux de cotation d'une page HTML.
+
+    Args:
+        content: HTML (bytes ou str)
+        table_classes: ne lire que les tableaux portant une de ces classes CSS;
+            tous les tableaux si aucun ne correspond (comme le scraper d'origine)
+        skip_header: ignorer la première ligne de chaque tableau
+
+    Returns:
+        QuotationRows
+    """
+    rows = QuotationRows()
+    if not content:
+        return rows
+    document = lxml.html.fromstring(content)
+
+    tables = list(document.iter('table'))
+    if table_classes:
+        selected = [table for table in tables if _has_class(table, table_classes)]
+        rows.fallback = not selected
+        tables = selected or tables
+
+    for table in tables:
+        for position, tr in enumerate(_own_rows(table)):
+            if skip_header and position == 0:
+                continue
+            rows.append([cell.text_content().strip() for cell in tr.iter(*CELL_TAGS)])
+    return rows
@@ -6,13 +6,20 @@ Récupère les prix en temps réel des actions marocaines
 import requests
 from bs4 import BeautifulSoup
 import re
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from modules.bvc_parser import QuotationRows, parse_quotation_rows
+from modules.conditional_fetch import ConditionalFetcher
+from datetime import datetime, time, timedelta, timezone
 import logging
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Premier nombre décimal d'une cellule, lu comme le cours de la ligne
+PRICE_PATTERN = re.compile(r'(\d+[\.,]\d+)')
+
+
 class BVCScraper:
     """
     Scraper pour la Bourse des Valeurs de Casablanca
@@ -57,6 +64,10 @@ class BVCScraper:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        # Requêtes conditionnelles: hors séance les pages ne changent pas, ni téléchargement ni parsing
+        self.fetcher = ConditionalFetcher(
+            lambda url, headers: self.session.get(url, headers=headers, timeout=10)
+        )
     
     def get_stock_price(self, symbol: str) -> dict:
         """
@@ -83,6 +94,13 @@ class BVCScraper:
         except Exception as e:
             logger.error(f"Error scraping BVC website for {symbol}: {e}")
         
+        return self._fetch_secondary(symbol)
+    
+    def _fetch_secondary(self, symbol: str) -> dict:
+        """
+        Sources de repli quand la page de cotation BVC ne donne pas le prix:
+        Boursorama, puis les prix de démo
+        """
         try:
             # Alternative: utiliser l'API de Boursorama (pour les actions marocaines listées)
             price_data = self._fetch_from_boursorama(symbol)
@@ -102,61 +120,71 @@ class BVCScraper:
             'variation': 0.0
         }
     
+    def _fetch_quotation_page(self) -> QuotationRows:
+        """Télécharge la page de cotation BVC et en extrait les lignes de tableaux"""
+        url = f"{self.BASE_URL}/bourseweb/Cours-Bourse.aspx"
+        return self.fetcher.fetch(url, parse_quotation_rows)
+    
+    def _bvc_quote(self, symbol: str, price: float) -> dict:
+        return {
+            'symbol': symbol,
+            'price': price,
+            'currency': 'MAD',
+            'timestamp': datetime.now().isoformat(),
+            'source': 'bvc_website'
+        }
+    
     def _scrape_bvc_website(self, symbol: str) -> dict:
         """
         Scrape le site officiel de la Bourse de Casablanca
         """
         try:
-            # URL de la page de cotation
-            url = f"{self.BASE_URL}/bourseweb/Cours-Bourse.aspx"
-            
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            rows = self._fetch_quotation_page()
             
             # Rechercher le prix dans le tableau des cotations
             # (La structure exacte dépend du site actuel de la BVC)
-            price = self._extract_price_from_html(soup, symbol)
+            price = self._extract_price_from_html(rows, symbol)
             
             if price:
-                return {
-                    'symbol': symbol,
-                    'price': price,
-                    'currency': 'MAD',
-                    'timestamp': datetime.now().isoformat(),
-                    'source': 'bvc_website'
-                }
+                return self._bvc_quote(symbol, price)
             
             return None
         except Exception as e:
             logger.error(f"Error in _scrape_bvc_website: {e}")
             return None
     
-    def _extract_price_from_html(self, soup: BeautifulSoup, symbol: str) -> float:
+    def _build_price_index(self, rows: QuotationRows, symbols) -> dict:
+        """
+        Index {symbole: prix} construit en un seul parcours des lignes.
+        
+        Matching rule of the original scraper: first row whose cells contain
+        the symbol, first number-looking cell of that row.
+        """
+        index = {}
+        pending = set(symbols)
+        for i in range(len(rows)):
+            texts = rows.row(i)
+            matched = [symbol for symbol in pending if any(symbol in text for text in texts)]
+            if not matched:
+                continue
+            for text in texts:
+                match = PRICE_PATTERN.search(text)
+                if match:
+                    price = float(match.group(1).replace(',', '.'))
+                    for symbol in matched:
+                        index[symbol] = price
+                    pending.difference_update(matched)
+                    break
+            if not pending:
+                break
+        return index
+    
+    def _extract_price_from_html(self, rows: QuotationRows, symbol: str) -> float:
         """
-        Extrait le prix depuis le HTML de la BVC
+        Extrait le prix d'un symbole depuis les lignes de la page BVC
         """
         try:
-            # Chercher dans les tableaux
-            tables = soup.find_all('table')
-            
-            for table in tables:
-                rows = table.find_all('tr')
-                for row in rows:
-                    cells = row.find_all(['td', 'th'])
-                    # Chercher le symbole dans la ligne
-                    if any(symbol in cell.get_text().strip() for cell in cells):
-                        # Le prix est généralement dans une des colonnes suivantes
-                        for cell in cells:
-                            text = cell.get_text().strip()
-                            # Chercher un nombre qui ressemble à un prix
-                            match = re.search(r'(\d+[\.,]\d+)', text)
-                            if match:
-                                price_str = match.group(1).replace(',', '.')
-                                return float(price_str)
-            
-            return None
+            return self._build_price_index(rows, {symbol}).get(symbol)
         except Exception as e:
             logger.error(f"Error extracting price from HTML: {e}")
             return None
@@ -178,17 +206,8 @@ class BVCScraper:
             code = boursorama_codes[symbol]
             url = f"https://www.boursorama.com/cours/{code}/"
             
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Chercher le prix dans la page
-            price_elem = soup.find('span', class_='c-instrument--last')
-            if price_elem:
-                price_text = price_elem.get_text().strip()
-                price = float(re.sub(r'[^\d,.]', '', price_text).replace(',', '.'))
-                
+            price = self.fetcher.fetch(url, self._parse_boursorama_price)
+            if price:
                 return {
                     'symbol': symbol,
                     'price': price,
@@ -202,16 +221,49 @@ class BVCScraper:
             logger.error(f"Error in _fetch_from_boursorama: {e}")
             return None
     
+    def _parse_boursorama_price(self, content) -> float:
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Chercher le prix dans la page
+        price_elem = soup.find('span', class_='c-instrument--last')
+        if price_elem:
+            price_text = price_elem.get_text().strip()
+            return float(re.sub(r'[^\d,.]', '', price_text).replace(',', '.'))
+        return None
+    
     def get_multiple_stocks(self, symbols: list) -> dict:
         """
         Récupère les prix de plusieurs actions
+        
+        The quotation page is downloaded and parsed once, every requested
+        symbol is answered from the resulting index; only the symbols missing
+        from the page go to the secondary sources, concurrently.
         """
-        results = {}
+        # {symbole demandé: symbole normalisé}, les symboles inconnus sont ignorés
+        requested = {}
         for symbol in symbols:
-            data = self.get_stock_price(symbol)
-            if data:
-                results[symbol] = data
-        return results
+            normalized = symbol.upper().replace('.MA', '')
+            if normalized in self.SYMBOL_MAP:
+                requested[symbol] = normalized
+            else:
+                logger.warning(f"Symbol {normalized} not in known BVC symbols")
+        
+        if not requested:
+            return {}
+        
+        try:
+            index = self._build_price_index(self._fetch_quotation_page(), set(requested.values()))
+        except Exception as e:
+            logger.error(f"Error scraping BVC website: {e}")
+            index = {}
+        
+        quotes = {symbol: self._bvc_quote(symbol, price) for symbol, price in index.items() if price}
+        misses = sorted(set(requested.values()) - set(quotes))
+        if misses:
+            with ThreadPoolExecutor(max_workers=min(8, len(misses))) as pool:
+                quotes.update(zip(misses, pool.map(self._fetch_secondary, misses)))
+        
+        return {symbol: quotes[normalized] for symbol, normalized in requested.items() if quotes.get(normalized)}
     
     def get_all_available_stocks(self) -> dict:
         """
@@ -220,6 +272,36 @@ class BVCScraper:
         return self.get_multiple_stocks(list(self.SYMBOL_MAP.keys()))
 
 
+# Séance de cotation de la Bourse de Casablanca (heure locale, lundi-vendredi)
+BVC_SESSION_OPEN = time(9, 30)
+BVC_SESSION_CLOSE = time(15, 30)
+
+try:
+    from zoneinfo import ZoneInfo
+    BVC_TIMEZONE = ZoneInfo('Africa/Casablanca')
+except Exception:
+    # Pas de base tz (ex: Windows sans tzdata) : le Maroc est à UTC+1 hors Ramadan
+    BVC_TIMEZONE = timezone(timedelta(hours=1))
+
+
+def bvc_now() -> datetime:
+    """Heure courante à Casablanca"""
+    return datetime.now(BVC_TIMEZONE)
+
+
+def is_bvc_session_open(now: datetime = None) -> bool:
+    """
+    Indique si la séance de cotation BVC est ouverte
+
+    Args:
+        now: Instant à tester (par défaut maintenant, heure de Casablanca)
+    """
+    now = now or bvc_now()
+    if now.weekday() >= 5:
+        return False
+    return BVC_SESSION_OPEN <= now.time() < BVC_SESSION_CLOSE
+
+
 # API Helper Functions
 def get_bvc_price(symbol: str) -> float:
     """
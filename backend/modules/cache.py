@@ -0,0 +1,360 @@
+"""
+Cache de réponses borné (LRU + TTL)
+Replaces the module-level dict caches, which were never evicted, not
+thread-safe and private to each worker process:
+- every entry expires after its TTL, and the cache stays within a maximum
+  number of entries and a memory budget (serialized size of the values),
+  evicting expired entries first, then the least recently read
+- reads take no data lock: one dict lookup (memory backend) or one SQLite
+  read; only the hit / miss counter update is locked
+- concurrent misses on the same key wait for a single load (per process)
+- hit / miss / eviction counters for every cache, see cache_stats()
+
+Two backends:
+- MemoryBackend: in-process, values are shared objects (callers must not
+  modify them)
+- SQLiteBackend: one local file in WAL mode with memory-mapped reads,
+  shared by all the gunicorn workers of the host, so an entry loaded by one
+  worker is warm for the others
+
+CACHE_BACKEND=sqlite (CACHE_DB for the file) moves the shared caches to
+SQLite; caches of per-process state (BVC snapshot, ranking) always stay in
+memory.
+"""
+
+import itertools
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB = os.getenv(
+    'CACHE_DB', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache.sqlite3')
+)
+
+# Une éviction libère jusqu'à cette fraction du budget, pour ne pas évincer à chaque écriture
+EVICT_TARGET = 0.9
+
+# SQLite: l'heure de dernière lecture n'est réécrite que si elle date de plus de ACCESS_RESOLUTION secondes
+ACCESS_RESOLUTION = 1.0
+
+
+class MemoryBackend:
+    """
+    Entrées en mémoire: {key: [value, expires_at, size, access]}.
+
+    get() is a lock-free dict lookup that stamps the entry with a global
+    access counter; writes and evictions take the lock.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._bytes = 0
+        self._clock = itertools.count()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry[3] = next(self._clock)
+        return entry[0], entry[1]
+
+    def set(self, key, value, blob, expires_at):
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = [value, expires_at, len(blob), next(self._clock)]
+            self._bytes += len(blob)
+
+    def delete(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[2]
+
+    def usage(self):
+        return len(self._entries), self._bytes
+
+    def evict(self, max_entries, max_bytes, now):
+        """Retire les entrées expirées, puis les moins récemment lues; renvoie le nombre retiré"""
+        with self._lock:
+            if len(self._entries) <= max_entries and self._bytes <= max_bytes:
+                return 0
+            evicted = [key for key, entry in self._entries.items() if entry[1] <= now]
+            for key in evicted:
+                self._bytes -= self._entries.pop(key)[2]
+
+            target_entries, target_bytes = int(max_entries * EVICT_TARGET), int(max_bytes * EVICT_TARGET)
+            if len(self._entries) > target_entries or self._bytes > target_bytes:
+                by_access = sorted(self._entries.items(), key=lambda item: item[1][3])
+                for key, entry in by_access:
+                    if len(self._entries) <= target_entries and self._bytes <= target_bytes:
+                        break
+                    del self._entries[key]
+                    self._bytes -= entry[2]
+                    evicted.append(key)
+            return len(evicted)
+
+
+class SQLiteBackend:
+    """
+    Entrées d'un espace de noms dans un fichier SQLite partagé entre processus.
+
+    WAL mode lets readers proceed while a worker writes; reads go through the
+    memory-mapped file. One connection per thread. The entry count and size
+    of each namespace are kept in cache_usage by triggers, so the budget check
+    of every write reads one row, whichever worker wrote the entries.
+    """
+
+    def __init__(self, namespace, path=DEFAULT_DB, mmap_size=64 * 1024 * 1024):
+        self.namespace = namespace
+        self.path = path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')  # un cache peut perdre ses dernières écritures
+            conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                ' namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,'
+                ' expires_at REAL NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL,'
+                ' PRIMARY KEY (namespace, key)) WITHOUT ROWID'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed ON cache_entries (namespace, accessed_at)'
+            )
+            self._create_usage(conn)
+            self._local.conn = conn
+        return conn
+
+    def _create_usage(self, conn):
+        """Totaux par espace de noms, tenus à jour par triggers (initialisés depuis les entrées existantes)"""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            created = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cache_usage'"
+            ).fetchone() is None
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_usage ('
+                ' namespace TEXT PRIMARY KEY, entries INTEGER NOT NULL, bytes INTEGER NOT NULL) WITHOUT ROWID'
+            )
+            conn.execute(
+                'CREATE TRIGGER IF NOT EXISTS cache_entries_insert AFTER INSERT ON cache_entries BEGIN'
+                ' INSERT INTO cache_usage VALUES (new.namespace, 1, new.size) ON CONFLICT (namespace)'
+                ' DO UPDATE SET entries = entries + 1, bytes = bytes + excluded.bytes; END'
+            )
+            conn.execute(
+                'CREATE TRIGGER IF NOT EXISTS cache_entries_delete AFTER DELETE ON cache_entries BEGIN'
+                ' UPDATE cache_usage SET entries = entries - 1, bytes = bytes - old.size'
+                ' WHERE namespace = old.namespace; END'
+            )
+            conn.execute(
+                'CREATE TRIGGER IF NOT EXISTS cache_entries_resize AFTER UPDATE OF size ON cache_entries BEGIN'
+                ' UPDATE cache_usage SET bytes = bytes + new.size - old.size'
+                ' WHERE namespace = new.namespace; END'
+            )
+            if created:
+                conn.execute(
+                    'INSERT INTO cache_usage SELECT namespace, COUNT(*), TOTAL(size) FROM cache_entries'
+                    ' GROUP BY namespace'
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute(
+            'SELECT value, expires_at, accessed_at FROM cache_entries WHERE namespace = ? AND key = ?',
+            (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[2] > ACCESS_RESOLUTION:
+            conn.execute(
+                'UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?',
+                (now, self.namespace, key)
+            )
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, key, value, blob, expires_at):
+        # Upsert plutôt que REPLACE: la suppression implicite de REPLACE ne déclenche pas les triggers
+        self._conn().execute(
+            'INSERT INTO cache_entries VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (namespace, key) DO UPDATE SET'
+            ' value = excluded.value, expires_at = excluded.expires_at, size = excluded.size,'
+            ' accessed_at = excluded.accessed_at',
+            (self.namespace, key, blob, expires_at, len(blob), time.time())
+        )
+
+    def delete(self, key=None):
+        if key is None:
+            self._conn().execute('DELETE FROM cache_entries WHERE namespace = ?', (self.namespace,))
+        else:
+            self._conn().execute(
+                'DELETE FROM cache_entries WHERE namespace = ? AND key = ?', (self.namespace, key)
+            )
+
+    def usage(self):
+        row = self._conn().execute(
+            'SELECT entries, bytes FROM cache_usage WHERE namespace = ?', (self.namespace,)
+        ).fetchone()
+        return (row[0], int(row[1])) if row else (0, 0)
+
+    def evict(self, max_entries, max_bytes, now):
+        count, size = self.usage()
+        if count <= max_entries and size <= max_bytes:
+            return 0
+        conn = self._conn()
+        evicted = conn.execute(
+            'DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?', (self.namespace, now)
+        ).rowcount
+        count, size = self.usage()
+        target_entries, target_bytes = int(max_entries * EVICT_TARGET), int(max_bytes * EVICT_TARGET)
+        keys = []
+        for key, entry_size in conn.execute(
+            'SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at', (self.namespace,)
+        ).fetchall():
+            if count <= target_entries and size <= target_bytes:
+                break
+            keys.append((self.namespace, key))
+            count -= 1
+            size -= entry_size
+        if keys:
+            conn.executemany('DELETE FROM cache_entries WHERE namespace = ? AND key = ?', keys)
+        return evicted + len(keys)
+
+
+def default_backend(namespace):
+    """Backend des caches partageables: SQLite si CACHE_BACKEND=sqlite, sinon en mémoire"""
+    if os.getenv('CACHE_BACKEND', 'memory').lower() == 'sqlite':
+        return SQLiteBackend(namespace)
+    return MemoryBackend()
+
+
+# Caches créés par l'application, pour cache_stats()
+CACHES = {}
+
+
+class Cache:
+    """
+    Cache borné devant des valeurs coûteuses à calculer.
+
+    get_or_load(key, loader) serves a fresh entry, or calls loader() once for
+    all the concurrent callers of the same key and stores its result. A loader
+    exception is raised to every waiter and nothing is stored.
+    """
+
+    def __init__(self, name, ttl=300, max_entries=1024, max_bytes=16 * 1024 * 1024, backend=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.backend = backend if backend is not None else MemoryBackend()
+        self._inflight = {}  # {key: Future}
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(('hits', 'misses', 'expired', 'loads', 'load_errors', 'evictions'), 0)
+        CACHES[name] = self
+
+    def _count(self, name, n=1):
+        # `+=` sur un dict partagé n'est pas atomique: sans verrou, des threads concurrents perdent des incréments
+        with self._lock:
+            self._stats[name] += n
+
+    def get(self, key, default=None):
+        """Valeur fraîche de `key`, ou default"""
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Cache {self.name}: read failed for {key}: {e}")
+            entry = None
+        if entry is not None:
+            if entry[1] > time.time():
+                self._count('hits')
+                return entry[0]
+            self._count('expired')
+        self._count('misses')
+        return default
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return  # plus grande que le budget entier: jamais mise en cache
+        try:
+            self.backend.set(key, value, blob, now + (self.ttl if ttl is None else ttl))
+            evicted = self.backend.evict(self.max_entries, self.max_bytes, now)
+            if evicted:
+                self._count('evictions', evicted)
+        except Exception as e:
+            logger.error(f"Cache {self.name}: write failed for {key}: {e}")
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Single-flight: seul le premier appelant exécute loader(), les autres attendent son résultat"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            self._count('loads')
+            value = loader()
+            self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            self._count('load_errors')
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def invalidate(self, key=None):
+        """Retire une entrée, ou toutes (key=None)"""
+        self.backend.delete(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        try:
+            stats['entries'], stats['bytes'] = self.backend.usage()
+        except Exception:
+            stats['entries'], stats['bytes'] = None, None
+        stats['max_entries'] = self.max_entries
+        stats['max_bytes'] = self.max_bytes
+        stats['backend'] = type(self.backend).__name__
+        return stats
+
+
+def cache_stats():
+    """Compteurs de tous les caches, par nom"""
+    return {name: cache.stats() for name, cache in CACHES.items()}
@@ -1,10 +1,78 @@
 from flask import Blueprint, jsonify
 from extensions import db
-from models import Challenge, Trade
+from models import Challenge, Trade, EquitySnapshot
 from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, or_, func
 
 challenge_bp = Blueprint('challenge', __name__)
 
+# Règles du challenge (ratios de start_balance; perte journalière: ratio de l'equity de début de séance)
+MAX_TOTAL_LOSS_RATIO = 0.90
+DAILY_LOSS_RATIO = 0.95
+PROFIT_TARGET_RATIO = 1.10
+
+def current_session_date():
+    """Date de la séance en cours (bascule à minuit UTC)"""
+    return datetime.utcnow().date()
+
+def start_of_day_snapshot_query(challenge_id, session_date):
+    """Snapshot d'un challenge pour une séance (index unique (challenge_id, session_date))"""
+    return EquitySnapshot.query.filter_by(challenge_id=challenge_id, session_date=session_date)
+
+def get_start_of_day_equity(challenge):
+    """Equity de début de séance (lecture indexée du snapshot); start_balance si absent"""
+    snapshot = start_of_day_snapshot_query(challenge.id, current_session_date()).first()
+    return snapshot.start_of_day_equity if snapshot else challenge.start_balance
+
+def unsnapshotted_challenges_query(session_date):
+    """Challenges actifs sans snapshot pour la séance"""
+    already_taken = select(EquitySnapshot.challenge_id).where(EquitySnapshot.session_date == session_date)
+    return db.session.query(
+        Challenge.id, Challenge.current_equity, Challenge.start_balance, Challenge.start_date
+    ).filter(Challenge.status == 'active', Challenge.id.not_in(already_taken))
+
+def take_equity_snapshots(session_date=None):
+    """
+    Écrit l'equity de début de séance de chaque challenge actif.
+
+    Idempotent: challenges already snapshotted for the session are skipped, the
+    others are written with one bulk INSERT. The marked-to-market equity of the
+    equity engine is used when available. A challenge started during the
+    session (caught up after a restart) did not exist at the rollover: its
+    start of day is its start_balance, not its current, possibly lower, equity.
+
+    Returns:
+        int: number of snapshots written
+    """
+    from modules.equity_engine import equity_engine
+
+    session_date = session_date or current_session_date()
+    session_start = datetime.combine(session_date, datetime.min.time())
+    rows = unsnapshotted_challenges_query(session_date).all()
+
+    now = datetime.utcnow()
+    snapshots = []
+    for challenge_id, current_equity, start_balance, start_date in rows:
+        if start_date is not None and start_date >= session_start:
+            equity = start_balance
+        else:
+            marked_equity = equity_engine.equity(challenge_id)
+            equity = marked_equity if marked_equity is not None else current_equity
+        snapshots.append({
+            'challenge_id': challenge_id,
+            'session_date': session_date,
+            'start_of_day_equity': equity,
+            'high_water_mark': equity,
+            'created_at': now
+        })
+
+    if snapshots:
+        db.session.execute(insert(EquitySnapshot), snapshots)
+    db.session.commit()
+
+    equity_engine.start_session(session_date)
+    return len(snapshots)
+
 def check_rules(challenge_id):
     challenge = Challenge.query.get(challenge_id)
     if not challenge or challenge.status != 'active':
@@ -18,34 +86,28 @@ def check_rules(challenge_id):
     current_equity = challenge.current_equity
     
     # 2. Check Max Total Loss (10%)
-    max_loss_limit = start_balance * 0.90
+    max_loss_limit = start_balance * MAX_TOTAL_LOSS_RATIO
     if current_equity <= max_loss_limit:
         challenge.status = 'failed'
+        challenge.ended_at = datetime.utcnow()
         db.session.commit()
         return "failed"
 
     # 3. Check Daily Loss (5%)
-    # We need to know the equity at the start of the day. 
-    # For MVP, let's approximate: if current_equity drops 5% below start_balance (simplified) 
-    # OR strictly: we should store 'start_of_day_equity'.
-    # Let's assume start_of_day_equity is stored or calculated. 
-    # For this MVP, let's use a simplified rule: Daily Loss is based on High Water Mark of the day? 
-    # Or just fixed 5% of starting balance for the day.
-    # Let's implement a simple version: if equity < start_balance * 0.95 (This is actually total loss of 5%)
-    # The prompt says: "If equity drops 5% in a day". 
-    # Let's assume we reset a 'daily_start_equity' every day. 
-    # For now, let's just check if it drops 5% from start_balance as a stricter rule, or we can add a field later.
-    
-    daily_loss_limit = start_balance * 0.95
+    # Measured from the equity snapshot taken at the session rollover (take_equity_snapshots).
+    # A challenge created during the session has no snapshot yet: start_balance is its start-of-day equity.
+    daily_loss_limit = get_start_of_day_equity(challenge) * DAILY_LOSS_RATIO
     if current_equity <= daily_loss_limit:
          challenge.status = 'failed'
+         challenge.ended_at = datetime.utcnow()
          db.session.commit()
          return "failed"
 
     # 4. Check Profit Target (10%)
-    profit_target = start_balance * 1.10
+    profit_target = start_balance * PROFIT_TARGET_RATIO
     if current_equity >= profit_target:
         challenge.status = 'funded'
+        challenge.ended_at = datetime.utcnow()
         db.session.commit()
         return "funded"
         
@@ -53,19 +115,82 @@ def check_rules(challenge_id):
 
 @challenge_bp.route('/api/challenge/<int:id>/status', methods=['GET'])
 def get_challenge_status(id):
+    from modules.leaderboard import on_challenge_transitions
     status = check_rules(id)
+    if status in ('failed', 'funded'):
+        on_challenge_transitions([(id, status)])
     challenge = Challenge.query.get(id)
+    from modules.equity_engine import equity_engine
     return jsonify({
         "status": challenge.status,
         "current_equity": challenge.current_equity,
+        "marked_equity": equity_engine.equity(id),
         "start_balance": challenge.start_balance
     })
 
-def evaluate_all_challenges():
-    with db.session.begin():
-        active_challenges = Challenge.query.filter_by(status='active').all()
-        for challenge in active_challenges:
-            check_rules(challenge.id)
-        # Commit is handled by the context manager or we can commit explicitly if needed
-        # db.session.commit() 
+def transition_conditions(session_date):
+    """
+    Conditions WHERE de chaque transition, dans l'ordre d'application: [(status, where)].
+
+    Each where selects active challenges through the status index; the
+    start-of-day equity is a correlated subquery on (challenge_id, session_date).
+    """
+    equity = Challenge.current_equity
+    start_balance = Challenge.start_balance
+    start_of_day_equity = select(EquitySnapshot.start_of_day_equity).where(
+        EquitySnapshot.challenge_id == Challenge.id,
+        EquitySnapshot.session_date == session_date
+    ).scalar_subquery()
+    return [
+        ('failed', (Challenge.status == 'active', or_(
+            equity <= start_balance * MAX_TOTAL_LOSS_RATIO,
+            equity <= func.coalesce(start_of_day_equity, start_balance) * DAILY_LOSS_RATIO
+        ))),
+        ('funded', (Challenge.status == 'active', equity >= start_balance * PROFIT_TARGET_RATIO)),
+    ]
+
+def evaluate_challenges_bulk():
+    """
+    Évalue les règles de tous les challenges actifs en base, de manière ensembliste.
+
+    One UPDATE per target status (failed, then funded) instead of one SELECT and
+    one COMMIT per challenge, and a single commit at the end.
+
+    Returns:
+        list: [(challenge_id, new_status)] for notification
+    """
+    use_returning = db.engine.dialect.update_returning
+    ended_at = datetime.utcnow()
+
+    transitions = []
+    for status, where in transition_conditions(current_session_date()):
+        if use_returning:
+            stmt = update(Challenge).where(*where).values(status=status, ended_at=ended_at).returning(Challenge.id)
+            ids = db.session.execute(stmt, execution_options={'synchronize_session': False}).scalars().all()
+        else:
+            # Sans RETURNING: lire les ids puis les mettre à jour dans la même transaction
+            ids = db.session.execute(select(Challenge.id).where(*where)).scalars().all()
+            if ids:
+                db.session.execute(
+                    update(Challenge).where(*where).values(status=status, ended_at=ended_at),
+                    execution_options={'synchronize_session': False}
+                )
+        transitions.extend((challenge_id, status) for challenge_id in ids)
+
+    db.session.commit()
+    return transitions
+
+def evaluate_all_challenges(bulk=True):
+    """Évalue tous les challenges actifs; retourne les transitions [(challenge_id, new_status)]"""
+    if bulk:
+        return evaluate_challenges_bulk()
 
+    # Ancien mode: un check_rules (SELECT + COMMIT éventuel) par challenge.
+    # check_rules commits itself, so no outer session.begin() here.
+    transitions = []
+    active_challenges = Challenge.query.filter_by(status='active').all()
+    for challenge in active_challenges:
+        status = check_rules(challenge.id)
+        if status in ('failed', 'funded'):
+            transitions.append((challenge.id, status))
+    return transitions
@@ -0,0 +1,99 @@
+"""
+Téléchargement conditionnel des pages scrapées
+Remembers, per URL, the validators (ETag / Last-Modified) and a hash of the
+last body with what was parsed from it:
+- the next request is conditional (If-None-Match / If-Modified-Since); a 304
+  answer reuses the previous result without downloading the page again
+- a 200 whose body hashes to the last one (servers without validators, or
+  regenerating an identical page) reuses the previous result without parsing
+Counters report what was saved.
+"""
+
+import hashlib
+import threading
+from dataclasses import dataclass
+
+
+@dataclass
+class _Entry:
+    etag: str = None
+    last_modified: str = None
+    digest: bytes = None
+    size: int = 0
+    parsed: object = None
+
+
+class ConditionalFetcher:
+    """
+    Cache de validateurs et de résultats de parsing, par URL.
+
+    get(url, headers) must perform the request and return a requests-like
+    response (status_code, headers, content, raise_for_status()); the caller
+    keeps its own session, timeouts and retries.
+    """
+
+    def __init__(self, get):
+        self._get = get
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys((
+            'requests', 'not_modified', 'bytes_downloaded', 'bytes_saved', 'parses', 'parses_skipped'
+        ), 0)
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    def fetch(self, url, parse):
+        """
+        Résultat de parse(content) pour la page courante de `url`.
+
+        parse is only called when the body differs from the last one seen for
+        this URL. Its result is shared between calls: callers must not mutate it.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+
+        headers = {}
+        if entry is not None and entry.parsed is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        response = self._get(url, headers)
+        if response.status_code == 304 and headers:
+            self._count(requests=1, not_modified=1, bytes_saved=entry.size, parses_skipped=1)
+            return entry.parsed
+        response.raise_for_status()
+
+        content = response.content
+        digest = hashlib.sha256(content).digest()
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        if entry is not None and entry.parsed is not None and entry.digest == digest:
+            self._count(requests=1, bytes_downloaded=len(content), parses_skipped=1)
+            with self._lock:
+                entry.etag, entry.last_modified = validators['etag'], validators['last_modified']
+            return entry.parsed
+
+        parsed = parse(content)
+        self._count(requests=1, bytes_downloaded=len(content), parses=1)
+        with self._lock:
+            self._entries[url] = _Entry(digest=digest, size=len(content), parsed=parsed, **validators)
+        return parsed
+
+    def forget(self, url=None):
+        """Oublie une URL (ou toutes): la prochaine requête sera complète"""
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(url, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
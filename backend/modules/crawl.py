@@ -0,0 +1,146 @@
+"""
+Client HTTP poli pour les crawls concurrents
+Replaces "sleep 2 s after every request" with limits that hold whatever the
+number of worker threads:
+- a token bucket per host caps the request rate (with a small burst)
+- a semaphore per host caps the requests in flight
+- failed requests (network errors, 429, 5xx) are retried with exponential
+  backoff and full jitter, honouring Retry-After when the host sends one
+crawl() runs a function over many URLs on a bounded thread pool.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Jetons rechargés à `rate` par seconde, au plus `capacity` en réserve"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloque jusqu'à disposer d'un jeton; renvoie le temps attendu"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Attente avant la tentative attempt+1: uniforme dans [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _retry_after(response):
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None  # forme date HTTP: on garde le backoff
+
+
+class PoliteClient:
+    """
+    Requêtes GET limitées par hôte, avec retry.
+
+    Shared by all the worker threads of a crawl; the limits apply per host
+    across all of them.
+    """
+
+    def __init__(self, session, rate=4.0, burst=4, per_host=4, max_retries=3,
+                 backoff_base=0.5, backoff_cap=30.0, timeout=30):
+        self.session = session
+        self.rate = rate
+        self.burst = burst
+        self.per_host = per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(('requests', 'retries', 'failures', 'throttled_seconds'), 0)
+
+    def _host_limits(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (TokenBucket(self.rate, self.burst), threading.BoundedSemaphore(self.per_host))
+            return self._hosts[host]
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    def get(self, url, headers=None, max_retries=None):
+        """GET avec limites et retry; lève la dernière erreur après max_retries tentatives"""
+        max_retries = max_retries or self.max_retries
+        bucket, in_flight = self._host_limits(url)
+        for attempt in range(max_retries):
+            response = None
+            try:
+                with in_flight:
+                    waited = bucket.acquire()
+                    self._count(requests=1, throttled_seconds=waited)
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                return response
+            except requests.RequestException as e:
+                if attempt == max_retries - 1:
+                    self._count(failures=1)
+                    logger.error(f"Échec après {max_retries} tentatives pour {url}: {e}")
+                    raise
+                delay = _retry_after(response)
+                if delay is None:
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+                self._count(retries=1)
+                logger.warning(f"Tentative {attempt + 1}/{max_retries} pour {url}: {e}, nouvel essai dans {delay:.2f} s")
+                time.sleep(min(delay, self.backoff_cap))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+def crawl(items, fn, workers=8):
+    """
+    Applique fn à chaque élément sur un pool de `workers` threads.
+
+    Returns:
+        list: [(item, result, error)] dans l'ordre des éléments
+    """
+    def run(item):
+        try:
+            return item, fn(item), None
+        except Exception as e:
+            return item, None, e
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(run, items))
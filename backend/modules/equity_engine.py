@@ -0,0 +1,398 @@
+"""
+Moteur d'equity incrémental
+Keeps the open-position exposure of every active challenge in memory and
+marks it to market on each price tick. Only the challenges that hold the
+ticked symbol are updated and re-checked against the challenge rules.
+"""
+
+import threading
+from datetime import datetime
+import numpy as np
+from sqlalchemy import update, bindparam
+from extensions import db
+from models import Challenge, Trade, EquitySnapshot
+from modules.challenge import MAX_TOTAL_LOSS_RATIO, DAILY_LOSS_RATIO, PROFIT_TARGET_RATIO
+
+
+def active_challenges_query():
+    return db.session.query(
+        Challenge.id, Challenge.start_balance, Challenge.current_equity
+    ).filter(Challenge.status == 'active')
+
+
+def active_open_trades_query():
+    """Positions ouvertes des challenges actifs (index (status) de trade, jointure par clé primaire)"""
+    return Trade.query.join(Challenge).filter(Trade.status == 'open', Challenge.status == 'active')
+
+
+def session_snapshots_query(session_date):
+    return db.session.query(
+        EquitySnapshot.challenge_id, EquitySnapshot.start_of_day_equity, EquitySnapshot.high_water_mark
+    ).filter(EquitySnapshot.session_date == session_date)
+
+
+def signed_quantity(trade):
+    """Quantité signée: positive pour un long, négative pour un short"""
+    position = getattr(trade, 'position', 'long')
+    return trade.quantity if position == 'long' else -trade.quantity
+
+
+class SymbolBook:
+    """
+    Exposition agrégée de tous les challenges sur un symbole.
+
+    One row per challenge: net signed quantity and signed cost basis, so the
+    unrealized P&L of a row is `net_qty * price - cost`. Rows are stored in
+    NumPy arrays so a tick updates every holder in one vectorized pass.
+    """
+
+    def __init__(self):
+        self.rows = {}  # {slot: row}
+        self.size = 0
+        self.price = None
+        self.slots = np.empty(8, dtype=np.int64)
+        self.net_qty = np.zeros(8)
+        self.cost = np.zeros(8)
+        self.contrib = np.zeros(8)
+        self.trades = np.zeros(8, dtype=np.int64)
+
+    def _grow(self):
+        capacity = len(self.slots) * 2
+        for name in ('slots', 'net_qty', 'cost', 'contrib', 'trades'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def update(self, slot, quantity, cost, trades):
+        """Ajoute (ou retire, si négatif) l'exposition de `trades` trades; retourne la variation du P&L latent du slot"""
+        row = self.rows.get(slot)
+        if row is None:
+            if self.size == len(self.slots):
+                self._grow()
+            row = self.size
+            self.rows[slot] = row
+            self.slots[row] = slot
+            self.net_qty[row] = self.cost[row] = self.contrib[row] = 0.0
+            self.trades[row] = 0
+            self.size += 1
+
+        self.net_qty[row] += quantity
+        self.cost[row] += cost
+        self.trades[row] += trades
+
+        old = self.contrib[row]
+        if self.trades[row] <= 0:
+            self._remove_row(row)
+            return -old
+
+        new = self.net_qty[row] * self.price - self.cost[row] if self.price is not None else 0.0
+        self.contrib[row] = new
+        return new - old
+
+    def remove(self, slot):
+        """Retire complètement un slot; retourne la variation du P&L latent"""
+        row = self.rows.get(slot)
+        if row is None:
+            return 0.0
+        old = self.contrib[row]
+        self._remove_row(row)
+        return -old
+
+    def _remove_row(self, row):
+        last = self.size - 1
+        del self.rows[int(self.slots[row])]
+        if row != last:
+            for name in ('slots', 'net_qty', 'cost', 'contrib', 'trades'):
+                array = getattr(self, name)
+                array[row] = array[last]
+            self.rows[int(self.slots[row])] = row
+        self.size = last
+
+    def tick(self, price):
+        """Réévalue toutes les lignes au nouveau prix; retourne (slots, variations)"""
+        self.price = price
+        n = self.size
+        new = self.net_qty[:n] * price - self.cost[:n]
+        delta = new - self.contrib[:n]
+        self.contrib[:n] = new
+        return self.slots[:n], delta
+
+
+class EquityEngine:
+    """
+    Equity en temps réel de tous les challenges actifs.
+
+    equity = current_equity (réalisé, en base) + P&L latent des positions ouvertes.
+    Status transitions detected on a tick are written with one bulk UPDATE,
+    after the engine lock is released so ticks and trades never wait on the
+    database.
+    The intraday high-water mark is tracked in memory and flushed periodically
+    to the session's equity snapshot. A symbol book has no mark until its
+    first tick: its positions count for nothing and the challenges holding it
+    are not checked against the rules until then.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._slot_of = {}     # {challenge_id: slot}
+        self._symbols_of = {}  # {slot: set(symbols)}
+        self._books = {}       # {symbol: SymbolBook}
+        self._ids = np.zeros(1024, dtype=np.int64)
+        self._start = np.zeros(1024)
+        self._balance = np.zeros(1024)
+        self._unrealized = np.zeros(1024)
+        self._active = np.zeros(1024, dtype=bool)
+        self._sod = np.zeros(1024)  # Equity de début de séance
+        self._hwm = np.zeros(1024)  # Plus haut intraday
+        self._unpriced = np.zeros(1024, dtype=np.int64)  # Symboles détenus sans cours reçu
+        self._hwm_dirty = set()
+        self._session_date = None
+        self._size = 0
+
+    def init_app(self, app):
+        """Charge l'état depuis la base et branche le moteur sur le flux de cotations"""
+        from modules.quote_engine import quote_engine
+
+        self.app = app
+        with app.app_context():
+            self.load()
+        quote_engine.add_listener(
+            lambda quotes: self.on_prices({s: q['last'] for s, q in quotes.items()})
+        )
+
+    def load(self):
+        """Reconstruit l'état: une requête pour les challenges actifs, une pour leurs trades ouverts"""
+        with self._lock:
+            self._reset()
+            rows = active_challenges_query().all()
+            for challenge_id, start_balance, current_equity in rows:
+                self._register(challenge_id, start_balance, current_equity)
+
+            trades = active_open_trades_query().all()
+            for trade in trades:
+                self._add_exposure(trade, 1)
+
+            from modules.challenge import current_session_date
+            self.start_session(current_session_date())
+
+    def start_session(self, session_date):
+        """Charge l'equity de début de séance et le plus haut intraday depuis les snapshots"""
+        with self._lock:
+            self._session_date = session_date
+            self._hwm_dirty = set()
+            n = self._size
+            self._sod[:n] = self._start[:n]
+            self._hwm[:n] = self._balance[:n] + self._unrealized[:n]
+
+            rows = session_snapshots_query(session_date).all()
+            for challenge_id, start_of_day_equity, high_water_mark in rows:
+                slot = self._slot_of.get(challenge_id)
+                if slot is not None:
+                    self._sod[slot] = start_of_day_equity
+                    self._hwm[slot] = max(self._hwm[slot], high_water_mark or start_of_day_equity)
+
+    def flush_high_water_marks(self):
+        """Écrit les plus hauts intraday modifiés depuis le dernier flush (un executemany)"""
+        with self._lock:
+            if not self._hwm_dirty or self._session_date is None:
+                return 0
+            rows = [
+                {'cid': int(self._ids[slot]), 'sdate': self._session_date, 'hwm': float(self._hwm[slot])}
+                for slot in self._hwm_dirty
+            ]
+            self._hwm_dirty = set()
+
+        table = EquitySnapshot.__table__
+        db.session.execute(
+            update(table).where(
+                table.c.challenge_id == bindparam('cid'), table.c.session_date == bindparam('sdate')
+            ).values(high_water_mark=bindparam('hwm')),
+            rows
+        )
+        db.session.commit()
+        return len(rows)
+
+    # ---------- Mutations ----------
+
+    def _register(self, challenge_id, start_balance, balance):
+        slot = self._slot_of.get(challenge_id)
+        if slot is None:
+            if self._size == len(self._ids):
+                for name in ('_ids', '_start', '_balance', '_unrealized', '_active', '_sod', '_hwm', '_unpriced'):
+                    old = getattr(self, name)
+                    new = np.zeros(len(old) * 2, dtype=old.dtype)
+                    new[:self._size] = old[:self._size]
+                    setattr(self, name, new)
+            slot = self._size
+            self._size += 1
+            self._slot_of[challenge_id] = slot
+            self._symbols_of[slot] = set()
+            self._ids[slot] = challenge_id
+            self._unrealized[slot] = 0.0
+            self._unpriced[slot] = 0
+            self._sod[slot] = start_balance
+            self._hwm[slot] = balance
+        self._start[slot] = start_balance
+        self._balance[slot] = balance
+        self._active[slot] = True
+        return slot
+
+    def _add_exposure(self, trade, direction):
+        slot = self._slot_of.get(trade.challenge_id)
+        if slot is None or not self._active[slot]:
+            return
+        book = self._books.get(trade.symbol)
+        if book is None:
+            # Pas de cours avant le premier tick: le prix d'ouverture d'un trade n'est pas un prix de marché
+            book = self._books[trade.symbol] = SymbolBook()
+        quantity = signed_quantity(trade) * direction
+        held = slot in book.rows
+        self._unrealized[slot] += book.update(slot, quantity, quantity * trade.open_price, direction)
+        if book.price is None:
+            self._unpriced[slot] += (slot in book.rows) - held
+        if slot in book.rows:
+            self._symbols_of[slot].add(trade.symbol)
+        else:
+            self._symbols_of[slot].discard(trade.symbol)
+
+    def register_challenge(self, challenge):
+        """Suit un challenge dès son activation (paiement), avant son premier trade"""
+        with self._lock:
+            if challenge.status == 'active':
+                self._register(challenge.id, challenge.start_balance, challenge.current_equity)
+
+    def on_trade_opened(self, trade):
+        # Lecture en base hors du verrou, comme les écritures de _persist
+        challenge = None
+        if trade.challenge_id not in self._slot_of:
+            challenge = Challenge.query.get(trade.challenge_id)
+        with self._lock:
+            if trade.challenge_id not in self._slot_of and challenge is not None:
+                self._register(challenge.id, challenge.start_balance, challenge.current_equity)
+            self._add_exposure(trade, 1)
+
+    def on_trade_closed(self, trade, current_equity):
+        """Retire l'exposition du trade et prend en compte l'equity réalisée"""
+        with self._lock:
+            self._add_exposure(trade, -1)
+            slot = self._slot_of.get(trade.challenge_id)
+            if slot is None:
+                return []
+            self._balance[slot] = current_equity
+            transitions = self._evaluate(np.array([slot]))
+        self._persist(transitions)
+        return transitions
+
+    def deactivate(self, challenge_ids):
+        """Oublie les challenges sortis du statut actif (ex: évaluation ensembliste)"""
+        with self._lock:
+            for challenge_id in challenge_ids:
+                slot = self._slot_of.get(challenge_id)
+                if slot is not None and self._active[slot]:
+                    self._deactivate(slot)
+
+    # ---------- Ticks ----------
+
+    def symbols(self):
+        """Symboles détenus par au moins un challenge actif"""
+        with self._lock:
+            return [symbol for symbol, book in self._books.items() if book.size]
+
+    def on_prices(self, prices):
+        """
+        Applique un tick {symbol: price}.
+
+        Only the challenges holding a ticked symbol are re-marked and re-checked.
+        Returns the list of (challenge_id, new_status) transitions.
+        """
+        with self._lock:
+            touched = []
+            for symbol, price in prices.items():
+                book = self._books.get(symbol)
+                if book is None or not book.size or price is None:
+                    continue
+                first = book.price is None
+                slots, delta = book.tick(price)
+                self._unrealized[slots] += delta
+                if first:
+                    self._unpriced[slots] -= 1
+                touched.append(slots.copy())
+
+            if not touched:
+                return []
+            transitions = self._evaluate(np.unique(np.concatenate(touched)))
+        self._persist(transitions)
+        return transitions
+
+    def _evaluate(self, slots):
+        """Contrôle les règles des slots; les challenges en transition sont désactivés, pas encore écrits"""
+        slots = slots[self._active[slots] & (self._unpriced[slots] == 0)]
+        if not len(slots):
+            return []
+
+        equity = self._balance[slots] + self._unrealized[slots]
+        start = self._start[slots]
+
+        higher = equity > self._hwm[slots]
+        if higher.any():
+            self._hwm[slots[higher]] = equity[higher]
+            self._hwm_dirty.update(slots[higher].tolist())
+
+        failed = (equity <= start * MAX_TOTAL_LOSS_RATIO) | (equity <= self._sod[slots] * DAILY_LOSS_RATIO)
+        funded = ~failed & (equity >= start * PROFIT_TARGET_RATIO)
+
+        transitions = [(int(self._ids[s]), 'failed') for s in slots[failed]]
+        transitions += [(int(self._ids[s]), 'funded') for s in slots[funded]]
+        for slot in np.concatenate([slots[failed], slots[funded]]):
+            self._deactivate(int(slot))
+        return transitions
+
+    def _deactivate(self, slot):
+        self._active[slot] = False
+        for symbol in self._symbols_of[slot]:
+            book = self._books[symbol]
+            if book.price is None and slot in book.rows:
+                self._unpriced[slot] -= 1
+            self._unrealized[slot] += book.remove(slot)
+        self._symbols_of[slot] = set()
+
+    def _persist(self, transitions):
+        """
+        Écrit les changements de statut: un UPDATE par statut, un seul commit.
+
+        Called without the engine lock; the `status == 'active'` guard makes a
+        transition written twice (or already applied by the bulk evaluation) a no-op.
+        """
+        if not transitions or self.app is None:
+            return
+        ended_at = datetime.utcnow()
+        with self.app.app_context():
+            for status in ('failed', 'funded'):
+                ids = [challenge_id for challenge_id, new_status in transitions if new_status == status]
+                if ids:
+                    Challenge.query.filter(
+                        Challenge.id.in_(ids), Challenge.status == 'active'
+                    ).update({'status': status, 'ended_at': ended_at}, synchronize_session=False)
+            db.session.commit()
+
+            # Le classement relit les challenges 'funded': même contexte d'application
+            from modules.leaderboard import on_challenge_transitions
+            on_challenge_transitions(transitions)
+
+    # ---------- Lecture ----------
+
+    def equity(self, challenge_id):
+        """Equity marquée au marché, ou None si le challenge n'est pas suivi ou détient un symbole sans cours"""
+        slot = self._slot_of.get(challenge_id)
+        if slot is None or not self._active[slot] or self._unpriced[slot]:
+            return None
+        return float(self._balance[slot] + self._unrealized[slot])
+
+
+# Instance partagée par l'ordonnanceur, le flux de prix et les endpoints de trading
+equity_engine = EquityEngine()
@@ -1,33 +1,176 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from extensions import db
 from models import Challenge, User
-from sqlalchemy import desc
+import threading
+from sortedcontainers import SortedList
+from modules.cache import Cache
 
 leaderboard_bp = Blueprint('leaderboard', __name__)
 
+RANKED_STATUSES = ('active', 'funded')
+
+def ranking_query():
+    """Challenges classés avec leur username (index sur le statut, jointure par clé primaire)"""
+    return db.session.query(
+        Challenge.id, User.username, Challenge.start_balance, Challenge.current_equity
+    ).join(User).filter(Challenge.status.in_(RANKED_STATUSES))
+
+class RankingBoard:
+    """
+    Classement matérialisé des challenges actifs/financés.
+
+    Keys (-profit_pct, challenge_id) are kept in a SortedList, so top-N,
+    "my rank" and rank-around-user reads are bisections instead of a full
+    SELECT ... ORDER BY on every request, and repositioning a challenge is
+    O(log n) (a plain list with insort shifts the whole tail on every trade).
+    Updated incrementally by close_trade, payments, challenge status
+    transitions and user deletion.
+    """
+
+    def __init__(self):
+        self._keys = SortedList()  # (-profit_pct, challenge_id)
+        self._entries = {}  # {challenge_id: entry}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.version = 0    # incrémentée à chaque modification: clé des pages en cache
+
+    def load(self):
+        """Construit le classement (une requête), à l'initialisation seulement"""
+        rows = ranking_query().all()
+
+        with self._lock:
+            self._entries = {}
+            for challenge_id, username, start_balance, equity in rows:
+                self._entries[challenge_id] = self._entry(challenge_id, username, start_balance, equity)
+            self._keys = SortedList(entry['key'] for entry in self._entries.values())
+            self.loaded = True
+            self.version += 1
+
+    def refresh(self, challenge_ids):
+        """Relit et repositionne des challenges (une requête); ceux qui ne sont plus classés sont retirés"""
+        if not self.loaded or not challenge_ids:
+            return
+        rows = ranking_query().filter(Challenge.id.in_(challenge_ids)).all()
+
+        with self._lock:
+            for challenge_id in challenge_ids:
+                self._discard(challenge_id)
+            for challenge_id, username, start_balance, equity in rows:
+                entry = self._entry(challenge_id, username, start_balance, equity)
+                self._entries[challenge_id] = entry
+                self._keys.add(entry['key'])
+            self.version += 1
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    @staticmethod
+    def _entry(challenge_id, username, start_balance, equity):
+        profit_pct = (equity - start_balance) / start_balance * 100 if start_balance else 0.0
+        return {
+            'key': (-profit_pct, challenge_id),
+            'challenge_id': challenge_id,
+            'username': username,
+            'profit_pct': profit_pct,
+            'equity': equity
+        }
+
+    def update(self, challenge, username=None):
+        """Insère ou repositionne un challenge après un changement d'equity ou de statut"""
+        if not self.loaded:
+            return
+        with self._lock:
+            self._discard(challenge.id)
+            if challenge.status in RANKED_STATUSES:
+                username = username or challenge.user.username
+                entry = self._entry(challenge.id, username, challenge.start_balance, challenge.current_equity)
+                self._entries[challenge.id] = entry
+                self._keys.add(entry['key'])
+            self.version += 1
+
+    def remove(self, challenge_ids):
+        with self._lock:
+            for challenge_id in challenge_ids:
+                self._discard(challenge_id)
+            if challenge_ids:
+                self.version += 1
+
+    def _discard(self, challenge_id):
+        entry = self._entries.pop(challenge_id, None)
+        if entry is not None:
+            self._keys.discard(entry['key'])
+
+    def page(self, offset=0, limit=10):
+        with self._lock:
+            keys = self._keys.islice(offset, offset + limit)
+            return [dict(self._entries[key[1]], rank=offset + i + 1) for i, key in enumerate(keys)]
+
+    def rank_of(self, challenge_id):
+        """Rang (1 = premier), ou None si le challenge n'est pas classé"""
+        with self._lock:
+            entry = self._entries.get(challenge_id)
+            if entry is None:
+                return None
+            return self._keys.bisect_left(entry['key']) + 1
+
+    def __len__(self):
+        return len(self._keys)
+
+# Instance partagée, mise à jour par trading, payment et l'évaluation des règles
+ranking = RankingBoard()
+
+# Pages sérialisées par version du classement; en mémoire, le classement étant propre au processus
+leaderboard_cache = Cache('leaderboard', ttl=60, max_entries=1024, max_bytes=4 * 1024 * 1024)
+
+def on_challenge_transitions(transitions):
+    """Retire du classement les challenges passés en 'failed', repositionne ceux passés en 'funded'"""
+    ranking.remove([challenge_id for challenge_id, status in transitions if status not in RANKED_STATUSES])
+    ranking.refresh([challenge_id for challenge_id, status in transitions if status in RANKED_STATUSES])
+
+def _serialize(entry):
+    return {
+        "rank": entry['rank'],
+        "username": entry['username'],
+        "profit_pct": round(entry['profit_pct'], 2),
+        "equity": entry['equity']
+    }
+
 @leaderboard_bp.route('/api/leaderboard', methods=['GET'])
 def get_leaderboard():
     # Rank traders by Profit Percentage
     # Profit % = ((Current Equity - Start Balance) / Start Balance) * 100
-    
-    # We query active or funded challenges
-    results = db.session.query(
-        User.username,
-        Challenge.start_balance,
-        Challenge.current_equity,
-        ((Challenge.current_equity - Challenge.start_balance) / Challenge.start_balance * 100).label('profit_pct')
-    ).join(User).filter(
-        Challenge.status.in_(['active', 'funded'])
-    ).order_by(
-        desc('profit_pct')
-    ).limit(10).all()
-    
-    leaderboard_data = []
-    for r in results:
-        leaderboard_data.append({
-            "username": r.username,
-            "profit_pct": round(r.profit_pct, 2),
-            "equity": r.current_equity
-        })
-        
-    return jsonify(leaderboard_data)
+    # Served from the materialized ranking: cost does not grow with the number of challenges
+    ranking.ensure_loaded()
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+
+    page = leaderboard_cache.get_or_load(
+        f'page:{ranking.version}:{offset}:{limit}',
+        lambda: [_serialize(entry) for entry in ranking.page(offset, limit)]
+    )
+    return jsonify(page)
+
+@leaderboard_bp.route('/api/leaderboard/challenge/<int:challenge_id>', methods=['GET'])
+def get_challenge_rank(challenge_id):
+    """Rang d'un challenge et les traders qui l'entourent (?radius=5)"""
+    ranking.ensure_loaded()
+    radius = min(max(request.args.get('radius', 5, type=int), 0), 50)
+
+    def build():
+        rank = ranking.rank_of(challenge_id)
+        if rank is None:
+            return None
+        offset = max(rank - 1 - radius, 0)
+        around = ranking.page(offset, rank - offset + radius)
+        return {
+            "challenge_id": challenge_id,
+            "rank": rank,
+            "total": len(ranking),
+            "around": [_serialize(entry) for entry in around]
+        }
+
+    response = leaderboard_cache.get_or_load(f'rank:{ranking.version}:{challenge_id}:{radius}', build)
+    if response is None:
+        return jsonify({"error": "Challenge not ranked"}), 404
+    return jsonify(response)
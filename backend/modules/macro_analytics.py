@@ -0,0 +1,198 @@
+"""
+Noyau d'analyse macro vectorisé
+Aligned NumPy arrays in, every statistic the macro endpoints need out, in one
+pass per array: base-100 normalization, performance, annualized volatility,
+drawdown, full-period and rolling correlation, of a pair or of every pair of
+a panel. Results are serialized as columns (one list of dates, one list per
+value) rather than one dict per row.
+"""
+
+import numpy as np
+
+# Périodes par an pour annualiser la volatilité
+PERIODS_PER_YEAR = {
+    '1d': 252,
+    '1h': 252 * 7,  # séance américaine de 6 h 30, sept barres horaires entamées
+}
+
+ROLLING_WINDOW = 20
+
+
+def frame_arrays(frame, columns=('Close',)):
+    """Index (datetime64[ns]) et colonnes d'un DataFrame de barres, sans copie quand c'est possible"""
+    return frame.index.values, {column: frame[column].to_numpy(dtype=float) for column in columns}
+
+
+def align(*series):
+    """
+    Aligne plusieurs séries (index, valeurs) sur leurs dates communes.
+
+    Returns:
+        (index, [values, ...]): dates present in every series, in order
+    """
+    index = series[0][0]
+    for other, _ in series[1:]:
+        index = np.intersect1d(index, other, assume_unique=True)
+    aligned = []
+    for own_index, values in series:
+        positions = np.searchsorted(own_index, index)
+        aligned.append(values[positions])
+    return index, aligned
+
+
+def summarize(close, periods_per_year=PERIODS_PER_YEAR['1d']):
+    """
+    Statistiques d'une série de clôtures.
+
+    Returns:
+        dict: normalized (base 100), performance (%), volatility (annualized %),
+        drawdown (% from running peak, per bar), max_drawdown (%), current,
+        min, max, average
+    """
+    close = np.asarray(close, dtype=float)
+    if close.size == 0:
+        raise ValueError("empty series")
+    returns = close[1:] / close[:-1] - 1
+    peak = np.maximum.accumulate(close)
+    drawdown = (close / peak - 1) * 100
+    volatility = np.nanstd(returns, ddof=1) * np.sqrt(periods_per_year) * 100 if returns.size > 1 else 0.0
+    return {
+        'normalized': close / close[0] * 100,
+        'performance': (close[-1] / close[0] - 1) * 100,
+        'volatility': float(volatility),
+        'drawdown': drawdown,
+        'max_drawdown': float(drawdown.min()),
+        'current': float(close[-1]),
+        'min': float(close.min()),
+        'max': float(close.max()),
+        'average': float(close.mean()),
+    }
+
+
+def correlation(x, y):
+    """Corrélation de Pearson sur toute la période"""
+    x = np.asarray(x, dtype=float) - np.mean(x)
+    y = np.asarray(y, dtype=float) - np.mean(y)
+    denominator = np.sqrt((x * x).sum() * (y * y).sum())
+    return float((x * y).sum() / denominator) if denominator else float('nan')
+
+
+def rolling_correlation(x, y, window=ROLLING_WINDOW):
+    """
+    Corrélation glissante sur `window` barres, par sommes cumulées.
+
+    Values are centered on their full-period mean first so the cumulative
+    sums stay well conditioned. The first window - 1 values are NaN.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    result = np.full(x.shape, np.nan)
+    if x.size < window:
+        return result
+    x = x - x.mean()
+    y = y - y.mean()
+
+    def window_sums(values):
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        return sums[window:] - sums[:-window]
+
+    sx, sy = window_sums(x), window_sums(y)
+    sxx, syy, sxy = window_sums(x * x), window_sums(y * y), window_sums(x * y)
+    covariance = sxy - sx * sy / window
+    variance = (sxx - sx * sx / window) * (syy - sy * sy / window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[window - 1:] = np.where(variance > 0, covariance / np.sqrt(np.clip(variance, 0, None)), np.nan)
+    return result
+
+
+def correlation_matrix(panel):
+    """
+    Matrice de corrélation de Pearson des colonnes d'un panel aligné (barres x actifs),
+    en un produit matriciel. NaN pour un actif de variance nulle.
+    """
+    panel = np.asarray(panel, dtype=float)
+    centered = panel - panel.mean(axis=0)
+    covariance = centered.T @ centered
+    scale = np.sqrt(np.diag(covariance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        matrix = covariance / np.outer(scale, scale)
+    matrix[~np.isfinite(matrix)] = np.nan
+    return matrix
+
+
+def rolling_correlation_matrix(panel, window=ROLLING_WINDOW):
+    """
+    Corrélations glissantes de toutes les paires de colonnes, par sommes cumulées.
+
+    Returns:
+        np.ndarray (bars, assets, assets): the first window - 1 matrices are NaN
+    """
+    panel = np.asarray(panel, dtype=float)
+    bars, assets = panel.shape
+    result = np.full((bars, assets, assets), np.nan)
+    if bars < window:
+        return result
+    centered = panel - panel.mean(axis=0)
+
+    def window_sums(values):
+        sums = np.cumsum(np.concatenate((np.zeros((1,) + values.shape[1:]), values)), axis=0)
+        return sums[window:] - sums[:-window]
+
+    sx = window_sums(centered)
+    sxy = window_sums(centered[:, :, None] * centered[:, None, :])
+    covariance = sxy - sx[:, :, None] * sx[:, None, :] / window
+    variance = np.clip(np.diagonal(covariance, axis1=1, axis2=2), 0, None)
+    scale = np.sqrt(variance[:, :, None] * variance[:, None, :])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[window - 1:] = np.where(scale > 0, covariance / scale, np.nan)
+    return result
+
+
+def analyze_pair(index_a, close_a, index_b, close_b, periods_per_year=PERIODS_PER_YEAR['1d'], window=ROLLING_WINDOW):
+    """
+    Analyse de deux séries sur leurs dates communes.
+
+    Returns:
+        dict: index, a and b (summarize() of each), correlation, rolling_correlation
+    """
+    index, (a, b) = align((index_a, close_a), (index_b, close_b))
+    return {
+        'index': index,
+        'a': summarize(a, periods_per_year),
+        'b': summarize(b, periods_per_year),
+        'correlation': correlation(a, b),
+        'rolling_correlation': rolling_correlation(a, b, window),
+    }
+
+
+def analyze_panel(series, window=ROLLING_WINDOW):
+    """
+    Corrélations de toutes les paires d'un ensemble de séries, sur leurs dates communes.
+
+    Args:
+        series: [(index, close), ...]
+
+    Returns:
+        dict: index, matrix (assets x assets), rolling (bars x assets x assets)
+    """
+    index, closes = align(*series)
+    panel = np.column_stack(closes) if closes else np.empty((0, 0))
+    return {
+        'index': index,
+        'matrix': correlation_matrix(panel),
+        'rolling': rolling_correlation_matrix(panel, window),
+    }
+
+
+def date_column(index, unit='D'):
+    """Dates d'un index datetime64 en chaînes ISO, en une conversion ('D': jour, 'm': minute)"""
+    return np.datetime_as_string(np.asarray(index, dtype='datetime64[ns]'), unit=unit).tolist()
+
+
+def value_column(values, decimals=2):
+    """Valeurs arrondies pour JSON; NaN -> None"""
+    values = np.round(np.asarray(values, dtype=float), decimals)
+    column = values.tolist()
+    if np.isnan(values).any():
+        column = [None if value != value else value for value in column]
+    return column
@@ -0,0 +1,154 @@
+"""
+Indicateurs macro en mémoire
+A background job refreshes the last value of every macro indicator before
+the response cache would have expired, downloading the tickers concurrently
+through the bar cache (tails only), and publishes an immutable snapshot.
+/api/macro/indicators answers from the current snapshot: no request waits
+on Yahoo Finance, except the very first one on a cold start.
+
+A ticker whose download fails keeps its previous value, flagged stale; the
+others are published normally.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+
+from modules.bar_cache import bar_cache
+from modules.crawl import crawl
+
+logger = logging.getLogger(__name__)
+
+# Période de rafraîchissement (secondes), plus courte que les 5 minutes du cache de réponse
+REFRESH_INTERVAL = 240
+
+# Une valeur est signalée périmée au-delà de STALE_FACTOR périodes sans téléchargement réussi
+STALE_FACTOR = 2
+
+
+@dataclass(frozen=True)
+class IndicatorSnapshot:
+    """Dernières valeurs publiées ensemble; jamais modifié après publication"""
+    indicators: tuple = ()  # dicts, dans l'ordre de MACRO_INDICATORS
+    errors: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    fetched_at: datetime = None  # UTC, None tant qu'aucun rafraîchissement n'a eu lieu
+    duration: float = 0.0
+
+    def age(self, now=None):
+        if self.fetched_at is None:
+            return None
+        return ((now or datetime.utcnow()) - self.fetched_at).total_seconds()
+
+
+class MacroBoard:
+    """
+    Snapshot courant des indicateurs macro et son rafraîchissement.
+
+    Readers take a reference to the current snapshot and never lock; refresh()
+    builds a complete new snapshot off to the side and swaps the reference.
+    """
+
+    def __init__(self, indicators, cache=None, refresh_interval=REFRESH_INTERVAL):
+        self.indicators = indicators
+        self.cache = cache or bar_cache
+        self.refresh_interval = refresh_interval
+        self._snapshot = IndicatorSnapshot()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def _indicator(self, ticker):
+        """Dernière valeur et variation sur la veille, à partir de la fin de série fraîchement téléchargée"""
+        data = self.cache.get(ticker, '5d', max_age=0)
+        if data.empty:
+            raise ValueError('Données non disponibles')
+
+        last_price = float(data['Close'].iloc[-1])
+        if len(data) >= 2:
+            prev_price = float(data['Close'].iloc[-2])
+            change = last_price - prev_price
+            change_pct = (change / prev_price) * 100
+        else:
+            change = 0
+            change_pct = 0
+
+        info = self.indicators[ticker]
+        fetched_at = self.cache.fetched_at(ticker) or time.time()
+        return {
+            'ticker': ticker,
+            'name': info['name'],
+            'category': info['category'],
+            'description': info['description'],
+            'unit': info['unit'],
+            'value': round(last_price, 2),
+            'change': round(change, 2),
+            'change_pct': round(change_pct, 2),
+            'timestamp': data.index[-1].strftime('%Y-%m-%d %H:%M:%S'),
+            'fetched_at': fetched_at,
+        }
+
+    def refresh(self):
+        """Télécharge tous les indicateurs en parallèle et publie un nouveau snapshot"""
+        with self._refresh_lock:
+            started = datetime.utcnow()
+            previous = {indicator['ticker']: indicator for indicator in self._snapshot.indicators}
+            indicators, errors = [], {}
+            for ticker, indicator, error in crawl(list(self.indicators), self._indicator,
+                                                  workers=len(self.indicators)):
+                if error is not None:
+                    errors[ticker] = str(error)
+                    logger.error(f"Macro indicator refresh failed for {ticker}: {error}")
+                    indicator = previous.get(ticker)  # valeur précédente plutôt que rien
+                if indicator is not None:
+                    indicators.append(indicator)
+
+            finished = datetime.utcnow()
+            self._snapshot = IndicatorSnapshot(
+                indicators=tuple(indicators),
+                errors=MappingProxyType(errors),
+                fetched_at=finished,
+                duration=(finished - started).total_seconds()
+            )
+            return self._snapshot
+
+    def refresh_if_due(self):
+        """Appelé par l'ordonnanceur: rafraîchit avant l'expiration de la période"""
+        snapshot = self._snapshot
+        age = snapshot.age()
+        if age is None or age >= self.refresh_interval:
+            return self.refresh()
+        return snapshot
+
+    def ensure_loaded(self):
+        """Premier snapshot: seul cas où un lecteur attend les téléchargements (démarrage à froid)"""
+        if self._snapshot.fetched_at is None:
+            with self._refresh_lock:
+                loaded = self._snapshot.fetched_at is not None
+            if not loaded:
+                self.refresh()
+        return self._snapshot
+
+    def indicators_payload(self, now=None):
+        """Indicateurs du snapshot courant, avec leur fraîcheur (âge et drapeau stale)"""
+        snapshot = self.ensure_loaded()
+        now = now or time.time()
+        stale_after = self.refresh_interval * STALE_FACTOR
+        indicators = []
+        for indicator in snapshot.indicators:
+            age = now - indicator['fetched_at']
+            indicators.append({
+                **indicator,
+                'fetched_at': datetime.utcfromtimestamp(indicator['fetched_at']).isoformat() + 'Z',
+                'age_seconds': round(age, 1),
+                'stale': age > stale_after,
+            })
+        return {
+            'indicators': indicators,
+            'errors': dict(snapshot.errors),
+            'last_update': snapshot.fetched_at.isoformat() + 'Z' if snapshot.fetched_at else None,
+        }
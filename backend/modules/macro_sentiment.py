@@ -4,12 +4,21 @@ Expert-level module for tracking macro-financial indicators that impact stock ma
 """
 
 from flask import Blueprint, jsonify
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from functools import lru_cache
-import time
+from models import Trade
+from modules.bar_cache import bar_cache, PERIODS, COLUMNS
+from modules.cache import Cache, default_backend
+from modules.bvc_board import normalize_symbol
+from modules.bvc_scraper import BVCScraper
+from modules.macro_board import MacroBoard
+from modules.macro_analytics import (
+    ROLLING_WINDOW, align, analyze_pair, analyze_panel, date_column, frame_arrays, summarize, value_column
+)
+from modules.tick_store import tick_store
+from modules.sentiment_stream import sentiment_stream, BANDS
 
 macro_sentiment_bp = Blueprint('macro_sentiment', __name__)
 
@@ -53,22 +62,37 @@ MACRO_INDICATORS = {
     }
 }
 
-# Cache simple avec expiration (5 minutes)
-_cache = {}
-_cache_expiry = {}
+# Dernières valeurs des indicateurs, rafraîchies en arrière-plan par l'ordonnanceur de app.py
+macro_board = MacroBoard(MACRO_INDICATORS)
+
+# Actifs de la matrice de corrélation, en plus des indicateurs macro et des actions BVC détenues
+MATRIX_BENCHMARKS = ['SPY']
+
+# Une action BVC n'entre dans la matrice que si son historique local couvre cette part des dates du panel
+MIN_MATRIX_COVERAGE = 0.8
+
+# Réponses calculées, partagées entre workers si CACHE_BACKEND=sqlite (voir modules/cache.py)
 CACHE_DURATION = 300  # 5 minutes
+macro_cache = Cache('macro', ttl=CACHE_DURATION, max_entries=256, max_bytes=32 * 1024 * 1024,
+                    backend=default_backend('macro'))
 
-def get_cached_data(key):
-    """Récupère les données du cache si elles sont encore valides"""
-    if key in _cache and key in _cache_expiry:
-        if time.time() < _cache_expiry[key]:
-            return _cache[key]
-    return None
+class DataUnavailable(Exception):
+    """Données absentes: réponse 404, jamais mise en cache"""
 
-def set_cached_data(key, data):
-    """Met en cache les données avec expiration"""
-    _cache[key] = data
-    _cache_expiry[key] = time.time() + CACHE_DURATION
+def cached_response(cache_key, build):
+    """Réponse depuis le cache, ou construite par un seul appelant pendant que les autres attendent"""
+    try:
+        return jsonify(macro_cache.get_or_load(cache_key, build))
+    except DataUnavailable as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
 @macro_sentiment_bp.route('/api/macro/indicators', methods=['GET'])
 def get_macro_indicators():
@@ -76,58 +100,12 @@ def get_macro_indicators():
     Récupère les dernières valeurs de tous les indicateurs macro
     Returns: Dashboard avec prix actuel, variation %, variation absolue
     """
-    cache_key = 'macro_indicators'
-    cached = get_cached_data(cache_key)
-    if cached:
-        return jsonify(cached)
-    
     try:
-        indicators_data = []
-        
-        for ticker, info in MACRO_INDICATORS.items():
-            try:
-                # Télécharger les 5 derniers jours pour avoir une valeur fiable
-                data = yf.download(ticker, period='5d', interval='1d', progress=False)
-                
-                if data.empty:
-                    continue
-                
-                # Dernière valeur
-                last_price = float(data['Close'].iloc[-1])
-                
-                # Variation par rapport à la veille
-                if len(data) >= 2:
-                    prev_price = float(data['Close'].iloc[-2])
-                    change = last_price - prev_price
-                    change_pct = (change / prev_price) * 100
-                else:
-                    change = 0
-                    change_pct = 0
-                
-                indicators_data.append({
-                    'ticker': ticker,
-                    'name': info['name'],
-                    'category': info['category'],
-                    'description': info['description'],
-                    'unit': info['unit'],
-                    'value': round(last_price, 2),
-                    'change': round(change, 2),
-                    'change_pct': round(change_pct, 2),
-                    'timestamp': data.index[-1].strftime('%Y-%m-%d %H:%M:%S')
-                })
-                
-            except Exception as e:
-                print(f"Erreur pour {ticker}: {str(e)}")
-                continue
-        
-        response = {
+        # Snapshot en mémoire: aucun téléchargement dans la requête (sauf démarrage à froid)
+        return jsonify({
             'success': True,
-            'indicators': indicators_data,
-            'last_update': datetime.now().isoformat()
-        }
-        
-        set_cached_data(cache_key, response)
-        return jsonify(response)
+            **macro_board.indicators_payload()
+        })
         
     except Exception as e:
         return jsonify({
@@ -141,73 +119,53 @@ def get_correlation_analysis(period='6mo'):
     Analyse de corrélation SPY vs TNX
     Period: 1mo, 3mo, 6mo, 1y
     """
-    cache_key = f'correlation_{period}'
-    cached = get_cached_data(cache_key)
-    if cached:
-        return jsonify(cached)
-    
-    try:
-        # Télécharger SPY (S&P500) et TNX (Taux 10 ans)
-        spy_data = yf.download('SPY', period=period, interval='1d', progress=False)
-        tnx_data = yf.download('^TNX', period=period, interval='1d', progress=False)
-        
-        if spy_data.empty or tnx_data.empty:
-            return jsonify({
-                'success': False,
-                'error': 'Données non disponibles'
-            }), 404
-        
-        # Normaliser les données pour comparer les performances (base 100)
-        spy_normalized = (spy_data['Close'] / spy_data['Close'].iloc[0]) * 100
-        tnx_normalized = (tnx_data['Close'] / tnx_data['Close'].iloc[0]) * 100
-        
-        # Calculer la corrélation
-        merged = pd.DataFrame({
-            'SPY': spy_data['Close'],
-            'TNX': tnx_data['Close']
-        }).dropna()
-        
-        correlation = merged['SPY'].corr(merged['TNX'])
-        
-        # Préparer les données pour le graphique
-        spy_chart_data = []
-        tnx_chart_data = []
-        
-        for date, value in spy_normalized.items():
-            spy_chart_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'value': round(float(value), 2)
-            })
-        
-        for date, value in tnx_normalized.items():
-            tnx_chart_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'value': round(float(value), 2)
-            })
-        
-        # Performance totale
-        spy_performance = round(float((spy_data['Close'].iloc[-1] / spy_data['Close'].iloc[0] - 1) * 100), 2)
-        tnx_performance = round(float((tnx_data['Close'].iloc[-1] / tnx_data['Close'].iloc[0] - 1) * 100), 2)
-        
-        response = {
-            'success': True,
-            'correlation': round(float(correlation), 3),
-            'spy_data': spy_chart_data,
-            'tnx_data': tnx_chart_data,
-            'spy_performance': spy_performance,
-            'tnx_performance': tnx_performance,
-            'period': period,
-            'analysis': get_correlation_interpretation(correlation, spy_performance, tnx_performance)
-        }
-        
-        set_cached_data(cache_key, response)
-        return jsonify(response)
-        
-    except Exception as e:
+    if period not in PERIODS:
         return jsonify({
             'success': False,
-            'error': str(e)
-        }), 500
+            'error': 'Période invalide'
+        }), 400
+    
+    return cached_response(f'correlation_{period}', lambda: correlation_payload(period))
+
+def correlation_payload(period):
+    """Réponse de l'analyse SPY vs TNX, mise en cache par cached_response"""
+    # SPY (S&P500) et TNX (Taux 10 ans), découpés dans le cache de barres
+    spy_data = bar_cache.get('SPY', period)
+    tnx_data = bar_cache.get('^TNX', period)
+    
+    if spy_data.empty or tnx_data.empty:
+        raise DataUnavailable('Données non disponibles')
+    
+    # Normalisation, performance, volatilité, drawdown et corrélations en une passe vectorisée
+    spy_index, spy_close = frame_arrays(spy_data)
+    tnx_index, tnx_close = frame_arrays(tnx_data)
+    analysis = analyze_pair(spy_index, spy_close['Close'], tnx_index, tnx_close['Close'])
+    spy, tnx = analysis['a'], analysis['b']
+    correlation = analysis['correlation']
+    
+    spy_performance = round(float(spy['performance']), 2)
+    tnx_performance = round(float(tnx['performance']), 2)
+    
+    # Séries en colonnes, sur les dates communes aux deux actifs
+    response = {
+        'success': True,
+        'correlation': round(correlation, 3),
+        'series': {
+            'dates': date_column(analysis['index']),
+            'spy': value_column(spy['normalized']),
+            'tnx': value_column(tnx['normalized']),
+            'rolling_correlation': value_column(analysis['rolling_correlation'], 3),
+        },
+        'rolling_window': ROLLING_WINDOW,
+        'spy_performance': spy_performance,
+        'tnx_performance': tnx_performance,
+        'volatility': {'spy': round(spy['volatility'], 2), 'tnx': round(tnx['volatility'], 2)},
+        'max_drawdown': {'spy': round(spy['max_drawdown'], 2), 'tnx': round(tnx['max_drawdown'], 2)},
+        'period': period,
+        'analysis': get_correlation_interpretation(correlation, spy_performance, tnx_performance)
+    }
+    
+    return response
 
 def get_correlation_interpretation(corr, spy_perf, tnx_perf):
     """Interprète la corrélation et donne des insights"""
@@ -233,159 +191,191 @@ def get_correlation_interpretation(corr, spy_perf, tnx_perf):
         'message': f"SPY: {spy_perf:+.2f}% | TNX: {tnx_perf:+.2f}% | Corrélation: {corr:.2f}"
     }
 
-@macro_sentiment_bp.route('/api/macro/historical/<ticker>/<period>', methods=['GET'])
-def get_historical_data(ticker, period='6mo'):
+def held_bvc_symbols():
+    """Actions BVC des positions ouvertes (noms du tableau BVC, sans .MA)"""
+    rows = Trade.query.with_entities(Trade.symbol).filter_by(status='open').distinct().all()
+    symbols = {normalize_symbol(symbol) for symbol, in rows
+               if symbol.endswith('.MA') or symbol.upper() in BVCScraper.SYMBOL_MAP}
+    return sorted(symbols)
+
+@macro_sentiment_bp.route('/api/macro/correlation-matrix/<period>', methods=['GET'])
+def get_correlation_matrix(period='6mo'):
     """
-    Récupère l'historique d'un indicateur spécifique
+    Matrice de corrélation de tous les indicateurs macro, de SPY et des actions BVC détenues
     Period: 1mo, 3mo, 6mo, 1y, 2y
+
+    Every series comes from the bar cache (Yahoo Finance) or the local tick
+    store (BVC daily closes); the panel is aligned once on common dates and
+    the matrix and rolling correlations are computed in one pass.
     """
-    cache_key = f'historical_{ticker}_{period}'
-    cached = get_cached_data(cache_key)
-    if cached:
-        return jsonify(cached)
+    if period not in PERIODS:
+        return jsonify({
+            'success': False,
+            'error': 'Période invalide'
+        }), 400
     
     try:
-        # Valider le ticker
-        if ticker not in MACRO_INDICATORS:
-            return jsonify({
-                'success': False,
-                'error': 'Ticker invalide'
-            }), 400
-        
-        # Télécharger les données historiques
-        data = yf.download(ticker, period=period, interval='1d', progress=False)
-        
-        if data.empty:
-            return jsonify({
-                'success': False,
-                'error': 'Données non disponibles'
-            }), 404
-        
-        # Préparer les données pour le graphique
-        chart_data = []
-        for date, row in data.iterrows():
-            chart_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'open': round(float(row['Open']), 2),
-                'high': round(float(row['High']), 2),
-                'low': round(float(row['Low']), 2),
-                'close': round(float(row['Close']), 2),
-                'volume': int(row['Volume']) if 'Volume' in row and not pd.isna(row['Volume']) else 0
-            })
-        
-        # Statistiques
-        current_value = float(data['Close'].iloc[-1])
-        min_value = float(data['Close'].min())
-        max_value = float(data['Close'].max())
-        avg_value = float(data['Close'].mean())
-        volatility = float(data['Close'].pct_change().std() * np.sqrt(252) * 100)  # Annualisée
-        
-        response = {
-            'success': True,
-            'ticker': ticker,
-            'name': MACRO_INDICATORS[ticker]['name'],
-            'data': chart_data,
-            'stats': {
-                'current': round(current_value, 2),
-                'min': round(min_value, 2),
-                'max': round(max_value, 2),
-                'average': round(avg_value, 2),
-                'volatility': round(volatility, 2)
-            },
-            'period': period
-        }
-        
-        set_cached_data(cache_key, response)
-        return jsonify(response)
-        
+        bvc_symbols = held_bvc_symbols()
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
+    
+    return cached_response(f"correlation_matrix_{period}_{','.join(bvc_symbols)}",
+                           lambda: correlation_matrix_payload(period, bvc_symbols))
+
+def correlation_matrix_payload(period, bvc_symbols):
+    """Réponse de la matrice de corrélation, mise en cache par période et actions BVC détenues"""
+    tickers, series, excluded = [], [], []
+    for ticker in MATRIX_BENCHMARKS + list(MACRO_INDICATORS):
+        data = bar_cache.get(ticker, period)
+        if data.empty:
+            excluded.append({'ticker': ticker, 'reason': 'Données non disponibles'})
+            continue
+        index, columns = frame_arrays(data)
+        tickers.append(ticker)
+        series.append((index, columns['Close']))
+    
+    base_index = align(*series)[0] if len(series) >= 2 else []
+    if not len(base_index):
+        raise DataUnavailable('Données non disponibles')
+    
+    # Actions BVC: clôtures quotidiennes du magasin de ticks, si elles couvrent assez de dates
+    for symbol in bvc_symbols:
+        index, close = tick_store.daily_closes(symbol, pd.Timestamp(base_index[0]).to_pydatetime())
+        coverage = float(np.isin(base_index, index).mean())
+        if coverage < MIN_MATRIX_COVERAGE:
+            excluded.append({'ticker': symbol, 'reason': f'Historique insuffisant ({coverage:.0%} des dates)'})
+            continue
+        tickers.append(symbol)
+        series.append((index, close))
+    
+    analysis = analyze_panel(series)
+    rolling = analysis['rolling']
+    pairs = [(i, j) for i in range(len(tickers)) for j in range(i + 1, len(tickers))]
+    
+    response = {
+        'success': True,
+        'tickers': tickers,
+        'matrix': [value_column(row, 3) for row in analysis['matrix']],
+        # Corrélations glissantes en colonnes: une liste par paire (triangle supérieur)
+        'rolling': {
+            'dates': date_column(analysis['index']),
+            'pairs': [[tickers[i], tickers[j]] for i, j in pairs],
+            'values': [value_column(rolling[:, i, j], 3) for i, j in pairs],
+        },
+        'rolling_window': ROLLING_WINDOW,
+        'excluded': excluded,
+        'period': period
+    }
+    
+    return response
+
+@macro_sentiment_bp.route('/api/macro/historical/<ticker>/<period>', methods=['GET'])
+def get_historical_data(ticker, period='6mo'):
+    """
+    Récupère l'historique d'un indicateur spécifique
+    Period: 1mo, 3mo, 6mo, 1y, 2y
+    """
+    # Valider le ticker
+    if ticker not in MACRO_INDICATORS:
+        return jsonify({
+            'success': False,
+            'error': 'Ticker invalide'
+        }), 400
+    
+    if period not in PERIODS:
+        return jsonify({
+            'success': False,
+            'error': 'Période invalide'
+        }), 400
+    
+    return cached_response(f'historical_{ticker}_{period}', lambda: historical_payload(ticker, period))
+
+def historical_payload(ticker, period):
+    """Réponse de l'historique d'un indicateur, mise en cache par cached_response"""
+    # Données historiques, découpées dans le cache de barres
+    data = bar_cache.get(ticker, period)
+    
+    if data.empty:
+        raise DataUnavailable('Données non disponibles')
+    
+    index, columns = frame_arrays(data, COLUMNS)
+    stats = summarize(columns['Close'])
+    
+    response = {
+        'success': True,
+        'ticker': ticker,
+        'name': MACRO_INDICATORS[ticker]['name'],
+        # Barres en colonnes: une liste de dates, une liste par champ
+        'data': {
+            'dates': date_column(index),
+            'open': value_column(columns['Open']),
+            'high': value_column(columns['High']),
+            'low': value_column(columns['Low']),
+            'close': value_column(columns['Close']),
+            'volume': np.nan_to_num(columns['Volume']).astype(np.int64).tolist(),
+        },
+        'stats': {
+            'current': round(stats['current'], 2),
+            'min': round(stats['min'], 2),
+            'max': round(stats['max'], 2),
+            'average': round(stats['average'], 2),
+            'volatility': round(stats['volatility'], 2),  # Annualisée
+            'max_drawdown': round(stats['max_drawdown'], 2)
+        },
+        'period': period
+    }
+    
+    return response
 
 @macro_sentiment_bp.route('/api/macro/sentiment-score', methods=['GET'])
 def get_market_sentiment_score():
     """
-    Calcule un score de sentiment global basé sur les indicateurs
+    Score de sentiment global basé sur les indicateurs
     Score: 0-100 (0 = Très Bearish, 50 = Neutre, 100 = Très Bullish)
     """
-    cache_key = 'sentiment_score'
-    cached = get_cached_data(cache_key)
-    if cached:
-        return jsonify(cached)
-    
-    try:
-        # Récupérer VIX et autres indicateurs
-        vix = yf.download('^VIX', period='5d', interval='1d', progress=False)
-        spy = yf.download('SPY', period='1mo', interval='1d', progress=False)
-        
-        if vix.empty or spy.empty:
-            return jsonify({
-                'success': False,
-                'error': 'Données insuffisantes'
-            }), 404
-        
-        # Calcul du score
-        vix_value = float(vix['Close'].iloc[-1])
-        spy_returns = float((spy['Close'].iloc[-1] / spy['Close'].iloc[0] - 1) * 100)
-        
-        # Score VIX (inversé: VIX bas = bullish)
-        # VIX normal: 12-20, panique: >30
-        vix_score = max(0, min(100, 100 - (vix_value - 12) * 3))
-        
-        # Score S&P500 (performance mensuelle)
-        spy_score = max(0, min(100, 50 + spy_returns * 2))
-        
-        # Score global (moyenne pondérée)
-        global_score = int(vix_score * 0.6 + spy_score * 0.4)
-        
-        # Interprétation
-        if global_score >= 70:
-            sentiment = "Très Bullish 🚀"
-            color = "#FF8C00"
-            recommendation = "Conditions favorables pour les achats"
-        elif global_score >= 55:
-            sentiment = "Bullish 📈"
-            color = "#FFAA00"
-            recommendation = "Marché positif, prudence recommandée"
-        elif global_score >= 45:
-            sentiment = "Neutre ⚖️"
-            color = "#FFB84D"
-            recommendation = "Attendre des signaux plus clairs"
-        elif global_score >= 30:
-            sentiment = "Bearish 📉"
-            color = "#FF9500"
-            recommendation = "Prudence, envisager des protections"
-        else:
-            sentiment = "Très Bearish 💔"
-            color = "#FF7A00"
-            recommendation = "Risque élevé, éviter les nouvelles positions"
-        
-        response = {
-            'success': True,
-            'score': global_score,
-            'sentiment': sentiment,
-            'color': color,
-            'recommendation': recommendation,
-            'components': {
-                'vix': {
-                    'value': round(vix_value, 2),
-                    'score': round(vix_score, 1)
-                },
-                'spy_1m': {
-                    'returns': round(spy_returns, 2),
-                    'score': round(spy_score, 1)
-                }
-            },
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        set_cached_data(cache_key, response)
-        return jsonify(response)
-        
-    except Exception as e:
+    # Dernier point de la série, calculé par l'ordonnanceur (voir modules/sentiment_stream.py)
+    payload = sentiment_stream.ensure_loaded()
+    if payload is None:
         return jsonify({
             'success': False,
-            'error': str(e)
-        }), 500
+            'error': sentiment_stream.error or 'Données insuffisantes'
+        }), 404
+    return jsonify(payload)
+
+@macro_sentiment_bp.route('/api/macro/sentiment-score/history/<period>', methods=['GET'])
+def get_sentiment_history(period='1mo'):
+    """
+    Historique du score de sentiment (un point par séance, puis à chaque variation)
+    Period: 5d, 1mo, 3mo, 6mo, 1y, 2y
+    """
+    if period not in PERIODS:
+        return jsonify({
+            'success': False,
+            'error': 'Période invalide'
+        }), 400
+    
+    sentiment_stream.ensure_loaded()
+    # La clé change avec le dernier point stocké: une réponse n'est jamais plus ancienne que la série
+    last_ts = sentiment_stream.last_ts()
+    return cached_response(f'sentiment_history_{period}_{last_ts}', lambda: sentiment_history_payload(period))
+
+def sentiment_history_payload(period):
+    """Réponse de l'historique du score, en colonnes, mise en cache par cached_response"""
+    points = sentiment_stream.history(period)
+    
+    if not len(points['ts']):
+        raise DataUnavailable('Données non disponibles')
+    
+    return {
+        'success': True,
+        'timestamps': date_column(points['ts'].astype('datetime64[ms]'), unit='m'),
+        'score': points['score'].astype(int).tolist(),
+        'vix': value_column(points['vix']),
+        'spy_1m': value_column(points['spy_returns']),
+        'bands': [{'min': minimum, 'sentiment': sentiment, 'color': color}
+                  for minimum, sentiment, color, _ in BANDS],
+        'period': period
+    }
@@ -2,6 +2,9 @@ from flask import Blueprint, request, jsonify
 from extensions import db
 from models import User, Challenge, Transaction
 from datetime import datetime
+from modules.leaderboard import ranking
+from modules.equity_engine import equity_engine
+from modules.admin_stats import invalidate_admin_stats
 
 payment_bp = Blueprint('payment', __name__)
 
@@ -42,7 +45,8 @@ def process_payment():
         user_id=user_id,
         amount=amount,
         type='payment',
-        status='completed'
+        status='completed',
+        approval_timestamp=datetime.utcnow()  # Réglé à la création: date d'effet du rollup quotidien
     )
     db.session.add(transaction)
     
@@ -63,6 +67,9 @@ def process_payment():
     )
     db.session.add(challenge)
     db.session.commit()
+    ranking.update(challenge)
+    equity_engine.register_challenge(challenge)
+    invalidate_admin_stats()
     
     # 4. Send confirmation email (in production)
     # send_confirmation_email(payment_details.get('email'), challenge.id)
@@ -0,0 +1,157 @@
+"""
+Rollup quotidien des métriques de la plateforme
+Folds signups, payments, withdrawals, challenge outcomes and closed-trade P&L
+into one DailyPlatformMetrics row per day. Each run only reads the source rows
+whose event time falls between the stored watermark and now - ROLLUP_LAG, adds
+them to the affected days and moves the watermark, in a single transaction.
+
+Event time of each source:
+- signup: User.created_at
+- payment / withdrawal: approval_timestamp, set once when the transaction is
+  settled (admin approval, or creation of a payment that completes at once),
+  so a transaction falls into a single window
+- challenge outcome: Challenge.ended_at
+- closed trade: Trade.timestamp (close_trade stamps the closing time)
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, and_, or_
+from extensions import db
+from models import User, Challenge, Trade, Transaction, DailyPlatformMetrics, RollupWatermark
+
+WATERMARK_NAME = 'daily_platform_metrics'
+
+# Marge laissée aux transactions en cours: une ligne horodatée avant son commit reste visible au run suivant
+ROLLUP_LAG = timedelta(seconds=60)
+
+METRIC_FIELDS = (
+    'signups', 'payments_count', 'payments_amount', 'withdrawals_count', 'withdrawals_amount',
+    'challenges_failed', 'challenges_funded', 'trades_closed', 'closed_pnl',
+)
+
+
+def _as_date(value):
+    # date() renvoie une chaîne sous SQLite, un objet date sous PostgreSQL
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _window(column, lower, upper):
+    if lower is None:
+        return and_(column.isnot(None), column <= upper)
+    return and_(column > lower, column <= upper)
+
+
+def rollup_queries(lower, upper):
+    """Une requête par source, sur les lignes dont l'événement tombe dans ]lower, upper]"""
+    signup_day = func.date(User.created_at)
+    # Une seule colonne d'événement: une transaction réglée puis approuvée ne change pas de fenêtre
+    settlement_day = func.date(Transaction.approval_timestamp)
+    outcome_day = func.date(Challenge.ended_at)
+    close_day = func.date(Trade.timestamp)
+    return {
+        'signups': db.session.query(signup_day, func.count()).filter(
+            _window(User.created_at, lower, upper)
+        ).group_by(signup_day),
+        'transactions': db.session.query(
+            settlement_day, Transaction.type, func.count(), func.sum(Transaction.amount)
+        ).filter(
+            _window(Transaction.approval_timestamp, lower, upper),
+            or_(
+                and_(Transaction.type == 'payment', Transaction.status.in_(['approved', 'completed'])),
+                and_(Transaction.type == 'withdrawal', Transaction.status == 'approved')
+            )
+        ).group_by(settlement_day, Transaction.type),
+        'challenge_outcomes': db.session.query(outcome_day, Challenge.status, func.count()).filter(
+            _window(Challenge.ended_at, lower, upper), Challenge.status.in_(['failed', 'funded'])
+        ).group_by(outcome_day, Challenge.status),
+        'closed_trades': db.session.query(close_day, func.count(), func.sum(Trade.profit)).filter(
+            Trade.status == 'closed', _window(Trade.timestamp, lower, upper)
+        ).group_by(close_day),
+    }
+
+
+def _collect(lower, upper):
+    """Deltas par jour des lignes dont l'événement tombe dans ]lower, upper]"""
+    deltas = defaultdict(lambda: dict.fromkeys(METRIC_FIELDS, 0))
+    queries = rollup_queries(lower, upper)
+
+    for value, count in queries['signups'].all():
+        deltas[_as_date(value)]['signups'] += count
+
+    for value, tx_type, count, amount in queries['transactions'].all():
+        prefix = 'payments' if tx_type == 'payment' else 'withdrawals'
+        deltas[_as_date(value)][f'{prefix}_count'] += count
+        deltas[_as_date(value)][f'{prefix}_amount'] += amount or 0.0
+
+    for value, status, count in queries['challenge_outcomes'].all():
+        deltas[_as_date(value)][f'challenges_{status}'] += count
+
+    for value, count, pnl in queries['closed_trades'].all():
+        deltas[_as_date(value)]['trades_closed'] += count
+        deltas[_as_date(value)]['closed_pnl'] += pnl or 0.0
+
+    return deltas
+
+
+def rollup_daily_metrics(now=None):
+    """
+    Ajoute aux métriques quotidiennes les événements depuis le dernier watermark.
+
+    The first run (no watermark yet) backfills the whole history.
+
+    Returns:
+        dict: {day: deltas} folded by this run
+    """
+    upper = (now or datetime.utcnow()) - ROLLUP_LAG
+    watermark = RollupWatermark.query.filter_by(name=WATERMARK_NAME).first()
+    lower = watermark.value if watermark else None
+    if lower is not None and lower >= upper:
+        return {}
+
+    deltas = _collect(lower, upper)
+
+    existing = {
+        row.day: row for row in
+        DailyPlatformMetrics.query.filter(DailyPlatformMetrics.day.in_(list(deltas))).all()
+    } if deltas else {}
+    for day, values in deltas.items():
+        row = existing.get(day)
+        if row is None:
+            row = DailyPlatformMetrics(day=day, **dict.fromkeys(METRIC_FIELDS, 0))
+            db.session.add(row)
+        for field, value in values.items():
+            setattr(row, field, (getattr(row, field) or 0) + value)
+
+    if watermark is None:
+        watermark = RollupWatermark(name=WATERMARK_NAME, value=upper)
+        db.session.add(watermark)
+    else:
+        watermark.value = upper
+    db.session.commit()
+    return dict(deltas)
+
+
+def get_rollup_watermark():
+    watermark = RollupWatermark.query.filter_by(name=WATERMARK_NAME).first()
+    return watermark.value if watermark else None
+
+
+def get_daily_metrics(days=30):
+    """Série des `days` derniers jours (jours sans activité à zéro), du plus ancien au plus récent"""
+    today = datetime.utcnow().date()
+    first_day = today - timedelta(days=days - 1)
+    rows = {
+        row.day: row for row in
+        DailyPlatformMetrics.query.filter(DailyPlatformMetrics.day >= first_day).all()
+    }
+
+    series = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        row = rows.get(day)
+        entry = {'day': day.isoformat()}
+        entry.update({field: (getattr(row, field) or 0) if row else 0 for field in METRIC_FIELDS})
+        series.append(entry)
+    return series
+
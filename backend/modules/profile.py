@@ -5,9 +5,15 @@ from sqlalchemy import func
 
 profile_bp = Blueprint('profile', __name__)
 
+def user_challenges_query(user_id):
+    return Challenge.query.filter_by(user_id=user_id)
+
+def user_transactions_query(user_id):
+    return Transaction.query.filter_by(user_id=user_id).order_by(Transaction.timestamp.desc())
+
 @profile_bp.route('/api/user/<int:user_id>/challenges', methods=['GET'])
 def get_user_challenges(user_id):
-    challenges = Challenge.query.filter_by(user_id=user_id).all()
+    challenges = user_challenges_query(user_id).all()
     
     challenges_data = []
     for challenge in challenges:
@@ -23,7 +29,7 @@ def get_user_challenges(user_id):
 
 @profile_bp.route('/api/user/<int:user_id>/transactions', methods=['GET'])
 def get_user_transactions(user_id):
-    transactions = Transaction.query.filter_by(user_id=user_id).order_by(Transaction.timestamp.desc()).all()
+    transactions = user_transactions_query(user_id).all()
     
     transactions_data = []
     for transaction in transactions:
@@ -40,7 +46,7 @@ def get_user_transactions(user_id):
 @profile_bp.route('/api/user/<int:user_id>/stats', methods=['GET'])
 def get_user_stats(user_id):
     # Get all challenges
-    challenges = Challenge.query.filter_by(user_id=user_id).all()
+    challenges = user_challenges_query(user_id).all()
     
     total_challenges = len(challenges)
     active_challenges = len([c for c in challenges if c.status == 'active'])
@@ -0,0 +1,211 @@
+"""
+Cache de cotations en mémoire
+Per-asset-class TTLs, stale-while-revalidate and single-flight loading for live prices
+"""
+
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from modules.bvc_scraper import BVCScraper, is_bvc_session_open
+
+# Durée de fraîcheur par classe d'actif (secondes)
+ASSET_CLASS_TTL = {
+    'crypto': 5,
+    'equity': 15,
+    'bvc': 60,
+    'bvc_closed': 900,  # Hors séance BVC, les cours ne bougent pas
+}
+
+# Au-delà du TTL, un prix reste servi (et rafraîchi en arrière-plan) jusqu'à TTL * STALE_FACTOR.
+# Lectures d'affichage seulement: l'exécution des trades passe max_age (voir get)
+STALE_FACTOR = 10
+
+CRYPTO_QUOTES = ('-USD', '-USDT', '-EUR', '-BTC')
+
+
+def asset_class(symbol):
+    """Classe d'actif d'un symbole: 'bvc', 'crypto' ou 'equity'"""
+    symbol = symbol.upper()
+    if symbol.endswith('.MA') or symbol in BVCScraper.SYMBOL_MAP:
+        return 'bvc'
+    if symbol.endswith(CRYPTO_QUOTES):
+        return 'crypto'
+    return 'equity'
+
+
+def ttl_for(symbol):
+    cls = asset_class(symbol)
+    if cls == 'bvc' and not is_bvc_session_open():
+        return ASSET_CLASS_TTL['bvc_closed']
+    return ASSET_CLASS_TTL[cls]
+
+
+class QuoteCache:
+    """
+    Shared quote cache in front of a price loader.
+
+    - fresh entries are served from memory;
+    - stale entries are served immediately while one background refresh runs,
+      unless the caller passes `max_age` (trade execution);
+    - concurrent misses on the same symbol wait for a single upstream call.
+    """
+
+    def __init__(self, loader, batch_loader=None, max_workers=4):
+        self.loader = loader
+        self.batch_loader = batch_loader  # {symbols} -> {symbol: price}, une seule requête groupée
+        self._entries = {}   # {symbol: (price, fetched_at)}
+        self._inflight = {}  # {symbol: Future}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='quote-refresh')
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'refresh_errors': 0,
+            'refresh_time_total': 0.0,
+            'refresh_time_max': 0.0,
+        }
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _record_refresh(self, elapsed):
+        with self._lock:
+            self._stats['refreshes'] += 1
+            self._stats['refresh_time_total'] += elapsed
+            self._stats['refresh_time_max'] = max(self._stats['refresh_time_max'], elapsed)
+
+    def get(self, symbol, max_age=None):
+        """
+        Prix de `symbol`, depuis le cache si possible.
+
+        With `max_age` (seconds) the stale-while-revalidate path is skipped: an
+        entry older than `max_age` is reloaded before returning, so the price
+        can be used to execute a trade.
+        """
+        entry = self._entries.get(symbol)
+        if entry is not None:
+            age = time.time() - entry[1]
+            ttl = ttl_for(symbol)
+            if age < (ttl if max_age is None else max_age):
+                self._count('hits')
+                return entry[0]
+            if max_age is None and age < ttl * STALE_FACTOR:
+                self._count('stale_hits')
+                self._refresh_async(symbol)
+                return entry[0]
+
+        self._count('misses')
+        return self._load(symbol).result()
+
+    def get_many(self, symbols):
+        """Prix de plusieurs symboles: les absents sont chargés ensemble en un seul lot"""
+        prices = {}
+        missing = []
+        now = time.time()
+        for symbol in dict.fromkeys(symbols):
+            entry = self._entries.get(symbol)
+            if entry is not None:
+                age = now - entry[1]
+                ttl = ttl_for(symbol)
+                if age < ttl:
+                    self._count('hits')
+                    prices[symbol] = entry[0]
+                    continue
+                if age < ttl * STALE_FACTOR:
+                    self._count('stale_hits')
+                    self._refresh_async(symbol)
+                    prices[symbol] = entry[0]
+                    continue
+            missing.append(symbol)
+
+        if missing:
+            self._count('misses', len(missing))
+            prices.update(self._load_many(missing))
+        return prices
+
+    def put(self, symbol, price):
+        """Injecte un prix obtenu ailleurs (ex: tick du flux de prix)"""
+        if price is not None:
+            self._entries[symbol] = (price, time.time())
+
+    def invalidate(self, symbol=None):
+        if symbol is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(symbol, None)
+
+    def _refresh_async(self, symbol):
+        with self._lock:
+            if symbol in self._inflight:
+                return
+        self._executor.submit(self._load, symbol)
+
+    def _load(self, symbol):
+        """Single-flight: only the first caller hits the loader, the others share its Future"""
+        with self._lock:
+            future = self._inflight.get(symbol)
+            if future is not None:
+                return future
+            future = Future()
+            self._inflight[symbol] = future
+
+        started = time.perf_counter()
+        price = None
+        try:
+            price = self.loader(symbol)
+        except Exception as e:
+            self._count('refresh_errors')
+            print(f"Error refreshing quote for {symbol}: {e}")
+        finally:
+            self._record_refresh(time.perf_counter() - started)
+            self.put(symbol, price)
+            with self._lock:
+                del self._inflight[symbol]
+            future.set_result(price)
+        return future
+
+    def _load_many(self, symbols):
+        """Single-flight par lot: les symboles déjà en cours de chargement sont attendus, pas rechargés"""
+        with self._lock:
+            waiting = {s: self._inflight[s] for s in symbols if s in self._inflight}
+            owned = {s: Future() for s in symbols if s not in waiting}
+            self._inflight.update(owned)
+
+        started = time.perf_counter()
+        loaded = {}
+        try:
+            if owned:
+                if self.batch_loader:
+                    loaded = self.batch_loader(list(owned))
+                else:
+                    loaded = {s: self.loader(s) for s in owned}
+        except Exception as e:
+            self._count('refresh_errors')
+            print(f"Error refreshing quotes for {len(owned)} symbols: {e}")
+        finally:
+            if owned:
+                self._record_refresh(time.perf_counter() - started)
+
+            for symbol, future in owned.items():
+                price = loaded.get(symbol)
+                self.put(symbol, price)
+                with self._lock:
+                    del self._inflight[symbol]
+                future.set_result(price)
+
+        prices = {s: loaded.get(s) for s in owned}
+        for symbol, future in waiting.items():
+            prices[symbol] = future.result()
+        return prices
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0.0
+        stats['refresh_time_avg'] = stats['refresh_time_total'] / stats['refreshes'] if stats['refreshes'] else 0.0
+        stats['entries'] = len(self._entries)
+        return stats
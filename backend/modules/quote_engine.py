@@ -0,0 +1,176 @@
+"""
+Moteur de cotations groupées
+Refreshes many Yahoo Finance symbols with one bulk request per tick.
+"""
+
+import time
+import threading
+import numpy as np
+import yfinance as yf
+
+
+def yfinance_download(symbols):
+    """
+    Source par défaut des cotations.
+
+    One multi-ticker request for today's 1-minute bars.
+    """
+    return yf.download(
+        tickers=list(symbols),
+        period='1d',
+        interval='1m',
+        group_by='column',
+        auto_adjust=False,
+        threads=True,
+        progress=False
+    )
+
+
+def parse_latest_bars(frame, symbols):
+    """
+    Extrait la dernière barre de chaque symbole d'un DataFrame multi-tickers.
+
+    `frame` has (field, symbol) columns as returned by yf.download. The last
+    valid row of every column is located with one vectorized pass, so the cost
+    does not grow with a Python loop over the bars.
+
+    Returns:
+        dict: {symbol: price_data} for the symbols that have at least one bar
+    """
+    if frame is None or frame.empty:
+        return {}
+
+    symbols = [s for s in symbols if ('Close', s) in frame.columns]
+    if not symbols:
+        return {}
+
+    close = frame['Close'][symbols].to_numpy(dtype=float)
+    opens = frame['Open'][symbols].to_numpy(dtype=float)
+    highs = frame['High'][symbols].to_numpy(dtype=float)
+    lows = frame['Low'][symbols].to_numpy(dtype=float)
+    if 'Volume' in frame.columns.get_level_values(0):
+        volumes = frame['Volume'][symbols].to_numpy(dtype=float)
+    else:
+        volumes = np.zeros_like(close)
+
+    cols = np.arange(len(symbols))
+    valid = ~np.isnan(close)
+    has_data = valid.any(axis=0)
+
+    # Last valid close and first valid open of each column
+    last_row = close.shape[0] - 1 - valid[::-1].argmax(axis=0)
+    open_valid = ~np.isnan(opens)
+    first_row = open_valid.argmax(axis=0)
+
+    last_close = close[last_row, cols]
+    first_open = opens[first_row, cols]
+    first_open = np.where(open_valid.any(axis=0), first_open, last_close)
+    last_high = highs[last_row, cols]
+    last_low = lows[last_row, cols]
+    last_volume = np.nan_to_num(volumes[last_row, cols])
+
+    change = last_close - first_open
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_pct = np.where(first_open != 0, change / first_open * 100, 0.0)
+
+    price = np.round(last_close, 2)
+    change = np.round(change, 2)
+    change_pct = np.round(change_pct, 2)
+    last_high = np.round(last_high, 2)
+    last_low = np.round(last_low, 2)
+
+    now = time.time()
+    quotes = {}
+    for i in np.flatnonzero(has_data):
+        symbol = symbols[i]
+        quotes[symbol] = {
+            'symbol': symbol,
+            'price': float(price[i]),
+            'last': float(last_close[i]),
+            'change': float(change[i]),
+            'changePercent': float(change_pct[i]),
+            'volume': int(last_volume[i]),
+            'high': float(last_high[i]),
+            'low': float(last_low[i]),
+            'timestamp': now
+        }
+    return quotes
+
+
+class QuoteEngine:
+    """
+    Moteur de cotations groupées.
+
+    Every call to `fetch_quotes` costs one upstream request whatever the number
+    of symbols. The latest quotes are kept in memory so that single-symbol
+    readers (trading endpoints) can reuse the last tick of the price stream.
+    """
+
+    def __init__(self, downloader=None, max_age=2.0):
+        self.downloader = downloader or yfinance_download
+        self.max_age = max_age
+        self.quotes = {}  # {symbol: price_data}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """
+        Abonne un listener au flux de cotations.
+
+        `callback` is called with {symbol: price_data} after every refresh.
+        """
+        self._listeners.append(callback)
+
+    def fetch_quotes(self, symbols):
+        """
+        Rafraîchit les cotations de `symbols`.
+
+        All symbols are refreshed with one bulk request. Returns
+        {symbol: price_data}, empty if the request failed.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+
+        try:
+            frame = self.downloader(symbols)
+            quotes = parse_latest_bars(frame, symbols)
+        except Exception as e:
+            print(f"Error fetching quotes for {len(symbols)} symbols: {e}")
+            return {}
+
+        with self._lock:
+            self.quotes.update(quotes)
+
+        for callback in self._listeners:
+            try:
+                callback(quotes)
+            except Exception as e:
+                print(f"Error in quote listener: {e}")
+        return quotes
+
+    def get_quote(self, symbol, max_age=None):
+        """
+        Dernière cotation d'un symbole.
+
+        Returns the cached quote if it is fresher than `max_age` seconds,
+        otherwise fetches it.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        quote = self.quotes.get(symbol)
+        if quote and time.time() - quote['timestamp'] <= max_age:
+            return quote
+        return self.fetch_quotes([symbol]).get(symbol)
+
+    def get_price(self, symbol, max_age=None):
+        """
+        Dernier prix d'un symbole.
+
+        Returns the `last` field of get_quote(), or None if no quote is available.
+        """
+        quote = self.get_quote(symbol, max_age)
+        return quote['last'] if quote else None
+
+
+# Instance partagée par le flux WebSocket et les endpoints de trading
+quote_engine = QuoteEngine()
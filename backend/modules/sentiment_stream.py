@@ -0,0 +1,207 @@
+"""
+Score de sentiment précalculé
+A scheduled job computes the market sentiment score (VIX level, SPY return
+over one calendar month) from the daily series of the bar cache, which only
+ever tops them up with tail downloads, and appends it to a time series in
+the tick store:
+- one point per past session, backfilled from the daily bars (first start,
+  or sessions missed while the server was down)
+- then one point per update, whenever the score or its inputs move
+
+/api/macro/sentiment-score answers from the last point in memory, the
+history endpoint reads the stored series, and listeners (Socket.IO push)
+are called when the score crosses into another band.
+"""
+
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from modules.bar_cache import bar_cache, PERIODS
+from modules.tick_store import tick_store
+
+logger = logging.getLogger(__name__)
+
+# Symbole de la série dans le magasin (kind 'sentiment')
+SENTIMENT_SYMBOL = 'MARKET'
+
+# (score minimal, sentiment, couleur, recommandation), de la bande la plus haute à la plus basse
+BANDS = (
+    (70, "Très Bullish 🚀", "#FF8C00", "Conditions favorables pour les achats"),
+    (55, "Bullish 📈", "#FFAA00", "Marché positif, prudence recommandée"),
+    (45, "Neutre ⚖️", "#FFB84D", "Attendre des signaux plus clairs"),
+    (30, "Bearish 📉", "#FF9500", "Prudence, envisager des protections"),
+    (0, "Très Bearish 💔", "#FF7A00", "Risque élevé, éviter les nouvelles positions"),
+)
+
+
+def sentiment_band(score):
+    """Interprétation d'un score 0-100"""
+    for minimum, sentiment, color, recommendation in BANDS:
+        if score >= minimum:
+            break
+    return {'sentiment': sentiment, 'color': color, 'recommendation': recommendation}
+
+
+def compute_scores(vix_index, vix_close, spy_index, spy_close, at):
+    """
+    Scores aux instants `at` (datetime64[ns], UTC naïf), à partir des dernières clôtures
+    connues à chaque instant: VIX des 5 derniers jours, rendement SPY depuis la première
+    séance du mois calendaire écoulé (mêmes fenêtres que les périodes '5d' et '1mo').
+
+    Returns:
+        dict of arrays (at, score, vix, vix_score, spy_returns, spy_score), only the
+        instants with enough data
+    """
+    at = np.asarray(at, dtype='datetime64[ns]')
+    day = pd.DatetimeIndex(at).normalize()
+    vix_pos = np.searchsorted(vix_index, at, side='right') - 1
+    spy_pos = np.searchsorted(spy_index, at, side='right') - 1
+    spy_since = (day - PERIODS['1mo']).values.astype('datetime64[ns]')
+    spy_first = np.searchsorted(spy_index, spy_since, side='left')
+    vix_since = (day - PERIODS['5d']).values.astype('datetime64[ns]')
+
+    # Fenêtre SPY entière: pas de point au début de la série en cache
+    valid = (vix_pos >= 0) & (spy_pos >= spy_first) & (spy_since >= spy_index[0])
+    valid &= vix_index[np.maximum(vix_pos, 0)] >= vix_since
+    at, vix_pos, spy_pos, spy_first = at[valid], vix_pos[valid], spy_pos[valid], spy_first[valid]
+
+    # VIX inversé (normal 12-20, panique > 30), SPY sur un mois; moyenne pondérée tronquée
+    vix = vix_close[vix_pos]
+    spy_returns = (spy_close[spy_pos] / spy_close[spy_first] - 1) * 100
+    vix_score = np.clip(100 - (vix - 12) * 3, 0, 100)
+    spy_score = np.clip(50 + spy_returns * 2, 0, 100)
+    return {
+        'at': at,
+        'score': np.floor(vix_score * 0.6 + spy_score * 0.4),
+        'vix': vix,
+        'vix_score': vix_score,
+        'spy_returns': spy_returns,
+        'spy_score': spy_score,
+    }
+
+
+def _rows(points):
+    """Lignes du magasin (ts en ms, puis les colonnes de SENTIMENT_COLUMNS)"""
+    ts = points['at'].astype('datetime64[ms]').astype(np.int64)
+    return list(zip(ts.tolist(), *(points[name].tolist() for name in
+                                   ('score', 'vix', 'vix_score', 'spy_returns', 'spy_score'))))
+
+
+class SentimentStream:
+    """
+    Série du score de sentiment et son dernier point.
+
+    update() (scheduler job) extends the stored series and swaps the current
+    payload; readers take the reference without locking.
+    """
+
+    def __init__(self, cache=None, store=None, symbol=SENTIMENT_SYMBOL):
+        self.cache = cache or bar_cache
+        self.store = store or tick_store
+        self.symbol = symbol
+        self.error = None
+        self._current = None  # payload du dernier point
+        self._last_values = None  # (score, vix, spy_returns) du dernier point écrit
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """callback(payload, previous) appelé quand le score change de bande"""
+        self._listeners.append(callback)
+
+    @property
+    def current(self):
+        return self._current
+
+    def _inputs(self):
+        vix = self.cache.series('^VIX')
+        spy = self.cache.series('SPY')
+        if vix.empty or spy.empty:
+            raise ValueError('Données insuffisantes')
+        return (vix.index.values.astype('datetime64[ns]'), vix['Close'].to_numpy(dtype=float),
+                spy.index.values.astype('datetime64[ns]'), spy['Close'].to_numpy(dtype=float))
+
+    def backfill(self, inputs, today):
+        """Un point par séance antérieure à aujourd'hui et postérieure au dernier point stocké"""
+        last = self.store.last_ts(self.symbol, 'sentiment')
+        sessions = inputs[2][inputs[2] < today]
+        if last is not None:
+            sessions = sessions[sessions > np.datetime64(last, 'ms')]
+        if not len(sessions):
+            return 0
+        return self.store.record_rows('sentiment', self.symbol, _rows(compute_scores(*inputs, sessions)))
+
+    def update(self, now=None):
+        """Appelé par l'ordonnanceur: complète la série et publie le point courant"""
+        with self._lock:
+            now = np.datetime64(now or datetime.utcnow(), 'ns')
+            try:
+                inputs = self._inputs()
+                self.backfill(inputs, now.astype('datetime64[D]'))
+                points = compute_scores(*inputs, [now])
+                if not len(points['at']):
+                    raise ValueError('Données insuffisantes')
+            except Exception as e:
+                # Le dernier point reste publié; le prochain passage retente
+                self.error = str(e)
+                logger.error(f"Sentiment score update failed: {e}")
+                return self._current
+            self.error = None
+
+            point = {name: values[0] for name, values in points.items()}
+            values = (int(point['score']), round(float(point['vix']), 2), round(float(point['spy_returns']), 2))
+            if values != self._last_values:
+                self.store.record_rows('sentiment', self.symbol, _rows(points))
+                self._last_values = values
+
+            previous = self._current
+            self._current = self._payload(point)
+            if previous is not None and previous['sentiment'] != self._current['sentiment']:
+                for callback in self._listeners:
+                    try:
+                        callback(self._current, previous)
+                    except Exception as e:
+                        logger.error(f"Sentiment listener failed: {e}")
+            return self._current
+
+    def ensure_loaded(self):
+        """Premier point: seul cas où un lecteur attend le calcul (démarrage à froid)"""
+        if self._current is None:
+            self.update()
+        return self._current
+
+    def _payload(self, point):
+        score = int(point['score'])
+        return {
+            'success': True,
+            'score': score,
+            **sentiment_band(score),
+            'components': {
+                'vix': {
+                    'value': round(float(point['vix']), 2),
+                    'score': round(float(point['vix_score']), 1)
+                },
+                'spy_1m': {
+                    'returns': round(float(point['spy_returns']), 2),
+                    'score': round(float(point['spy_score']), 1)
+                }
+            },
+            'timestamp': np.datetime_as_string(point['at'], unit='s') + 'Z'
+        }
+
+    def last_ts(self):
+        """ts (ms) du dernier point stocké, ou None"""
+        return self.store.last_ts(self.symbol, 'sentiment')
+
+    def history(self, period):
+        """Points de la période (colonnes du magasin, ts en ms)"""
+        start = pd.Timestamp.now(tz='UTC').tz_localize(None).normalize() - PERIODS[period]
+        return self.store.query(self.symbol, start.to_pydatetime(), kind='sentiment')
+
+
+# Instance partagée: job de l'ordonnanceur et listener Socket.IO branchés dans app.py
+sentiment_stream = SentimentStream()
@@ -0,0 +1,309 @@
+"""
+Historique local des cotations (ticks et barres 1 minute) et séries dérivées
+Every price fetched by the quote engine (Yahoo Finance) and the BVC board is
+appended to an on-disk store instead of being thrown away, so charts and
+analytics can read history locally.
+
+Layout, one directory per (kind, symbol, UTC day):
+    <root>/ticks/<SYMBOL>/<YYYY-MM-DD>/ts.i8 price.f8 volume.f8
+    <root>/bars_1m/<SYMBOL>/<YYYY-MM-DD>/ts.i8 open.f8 high.f8 low.f8 close.f8 volume.f8
+    <root>/sentiment/<SYMBOL>/<YYYY-MM-DD>/ts.i8 score.f8 vix.f8 ...  (see KINDS)
+Each file is a raw little-endian column (ts in epoch milliseconds), only ever
+appended to. Reads memory-map the columns of a day: a range inside one day is
+returned as views on the mapping, without copying.
+"""
+
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+TICK_COLUMNS = (('ts', '<i8'), ('price', '<f8'), ('volume', '<f8'))
+BAR_COLUMNS = (('ts', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'), ('volume', '<f8'))
+# Série du score de sentiment macro (modules/sentiment_stream.py)
+SENTIMENT_COLUMNS = (
+    ('ts', '<i8'), ('score', '<f8'), ('vix', '<f8'), ('vix_score', '<f8'), ('spy_returns', '<f8'), ('spy_score', '<f8')
+)
+KINDS = {'ticks': TICK_COLUMNS, 'bars_1m': BAR_COLUMNS, 'sentiment': SENTIMENT_COLUMNS}
+
+MINUTE_MS = 60_000
+
+DEFAULT_ROOT = os.getenv(
+    'TICK_STORE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'ticks')
+)
+
+
+def _symbol_dir(symbol):
+    # Noms de fichiers sûrs et réversibles: BTC-USD, IAM.MA, ^GSPC -> %5EGSPC
+    return re.sub(r'[^A-Za-z0-9._-]', lambda m: f'%{ord(m.group()):02X}', symbol.upper())
+
+
+def _day(ts_ms):
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def _to_ms(value):
+    """Horodatage en ms: epoch (s), datetime (naïf = UTC) ou chaîne ISO; None = maintenant"""
+    if value is None:
+        return int(time.time() * 1000)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return int(float(value) * 1000)
+
+
+def _empty(columns):
+    return {name: np.empty(0, dtype=dtype) for name, dtype in columns}
+
+
+class TickStore:
+    """
+    Magasin append-only de ticks et de barres 1 minute, partitionné par jour.
+
+    Ticks are written as they arrive. 1-minute bars are aggregated from the
+    ticks in memory and written when their minute is over (next tick of the
+    symbol, or flush_bars() from the scheduler). Ticks older than the last
+    one stored for a symbol are dropped: each partition stays sorted by ts.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self._lock = threading.Lock()
+        self._last_ts = {}      # {(kind, symbol): ts du dernier enregistrement}
+        self._open_bars = {}    # {symbol: [minute, open, high, low, close, volume]}
+        self.dropped = 0
+
+    # ---------- écriture ----------
+
+    def _partition(self, kind, symbol, day):
+        return os.path.join(self.root, kind, _symbol_dir(symbol), day)
+
+    def _append(self, kind, symbol, rows):
+        """Ajoute des lignes (liste de tuples, ts croissants) aux partitions du jour de chacune"""
+        columns = KINDS[kind]
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(_day(row[0]), []).append(row)
+        for day, day_rows in by_day.items():
+            path = self._partition(kind, symbol, day)
+            os.makedirs(path, exist_ok=True)
+            data = list(zip(*day_rows))
+            # ts en dernier: une écriture interrompue laisse au plus des colonnes de valeurs plus longues,
+            # ignorées à la lecture (longueur = colonne la plus courte)
+            for (name, dtype), values in sorted(zip(columns, data), key=lambda item: item[0][0] == 'ts'):
+                with open(os.path.join(path, f'{name}.{dtype[1:]}'), 'ab') as f:
+                    f.write(np.asarray(values, dtype=dtype).tobytes())
+
+    def _last(self, kind, symbol):
+        key = (kind, symbol)
+        if key not in self._last_ts:
+            days = self.days(symbol, kind)
+            ts = self._read_day(kind, symbol, days[-1])['ts'] if days else []
+            self._last_ts[key] = int(ts[-1]) if len(ts) else None
+        return self._last_ts[key]
+
+    def _close_bar(self, symbol):
+        bar = self._open_bars.pop(symbol)
+        last = self._last('bars_1m', symbol)
+        if last is None or bar[0] > last:
+            self._append('bars_1m', symbol, [tuple(bar)])
+            self._last_ts[('bars_1m', symbol)] = bar[0]
+
+    def record(self, symbol, price, volume=0.0, ts=None):
+        """Enregistre un tick; renvoie False s'il est antérieur au dernier tick stocké"""
+        if price is None:
+            return False
+        ts = _to_ms(ts)
+        price = float(price)
+        volume = float(volume or 0.0)
+        with self._lock:
+            last = self._last('ticks', symbol)
+            if last is not None and ts < last:
+                self.dropped += 1
+                return False
+            self._append('ticks', symbol, [(ts, price, volume)])
+            self._last_ts[('ticks', symbol)] = ts
+
+            minute = ts - ts % MINUTE_MS
+            bar = self._open_bars.get(symbol)
+            if bar is not None and bar[0] != minute:
+                self._close_bar(symbol)
+                bar = None
+            if bar is None:
+                self._open_bars[symbol] = [minute, price, price, price, price, volume]
+            else:
+                bar[2] = max(bar[2], price)
+                bar[3] = min(bar[3], price)
+                bar[4] = price
+                # Le volume publié est celui de la barre 1 minute en cours chez la source
+                bar[5] = volume
+        return True
+
+    def record_quotes(self, quotes, ts=None):
+        """
+        Listener du moteur de cotations: {symbol: price_data}.
+
+        Uses each quote's own epoch timestamp when it has one, `ts` otherwise.
+        """
+        for symbol, quote in quotes.items():
+            stamp = quote.get('timestamp')
+            self.record(
+                symbol,
+                quote.get('last', quote.get('price')),
+                quote.get('volume', 0.0),
+                stamp if isinstance(stamp, (int, float)) else ts
+            )
+
+    def record_board(self, snapshot):
+        """Listener du tableau BVC: les cotations d'un snapshot, horodatées à son scraping"""
+        # Les prix de démo (source 'fallback') ne sont pas des cotations
+        quotes = {symbol: quote for symbol, quote in snapshot.quotes.items() if quote.get('source') != 'fallback'}
+        self.record_quotes(quotes, ts=snapshot.fetched_at)
+
+    def record_bars(self, symbol, ts, opens, highs, lows, closes, volumes):
+        """
+        Ajoute des barres 1 minute déjà formées (historique intraday de la source).
+
+        Only bars after the last stored one are kept; ts are epoch seconds or
+        datetimes, in increasing order.
+        """
+        rows = [
+            (_to_ms(t), float(o), float(h), float(l), float(c), float(np.nan_to_num(v)))
+            for t, o, h, l, c, v in zip(ts, opens, highs, lows, closes, volumes)
+            if not np.isnan(c)
+        ]
+        with self._lock:
+            last = self._last('bars_1m', symbol)
+            open_bar = self._open_bars.get(symbol)
+            rows = [
+                row for row in rows
+                if (last is None or row[0] > last) and (open_bar is None or row[0] < open_bar[0])
+            ]
+            if rows:
+                self._append('bars_1m', symbol, rows)
+                self._last_ts[('bars_1m', symbol)] = rows[-1][0]
+        return len(rows)
+
+    def record_rows(self, kind, symbol, rows):
+        """
+        Ajoute des lignes déjà calculées à une série (tuples dans l'ordre de KINDS[kind], ts en ms
+        croissants); celles qui ne sont pas postérieures à la dernière stockée sont ignorées.
+        """
+        with self._lock:
+            last = self._last(kind, symbol)
+            rows = [row for row in rows if last is None or row[0] > last]
+            if rows:
+                self._append(kind, symbol, rows)
+                self._last_ts[(kind, symbol)] = rows[-1][0]
+        return len(rows)
+
+    def last_ts(self, symbol, kind='ticks'):
+        """ts (ms) de la dernière ligne stockée pour un symbole, ou None"""
+        with self._lock:
+            return self._last(kind, symbol)
+
+    def flush_bars(self, now=None):
+        """Écrit les barres dont la minute est terminée (symboles sans nouveau tick)"""
+        current = _to_ms(now)
+        current -= current % MINUTE_MS
+        with self._lock:
+            for symbol in [s for s, bar in self._open_bars.items() if bar[0] < current]:
+                self._close_bar(symbol)
+
+    # ---------- lecture ----------
+
+    def symbols(self, kind='ticks'):
+        path = os.path.join(self.root, kind)
+        if not os.path.isdir(path):
+            return []
+        return sorted(re.sub(r'%([0-9A-F]{2})', lambda m: chr(int(m.group(1), 16)), name)
+                      for name in os.listdir(path))
+
+    def days(self, symbol, kind='ticks'):
+        path = os.path.join(self.root, kind, _symbol_dir(symbol))
+        return sorted(os.listdir(path)) if os.path.isdir(path) else []
+
+    def _read_day(self, kind, symbol, day):
+        """Colonnes d'une partition, mappées en mémoire (lecture seule)"""
+        path = self._partition(kind, symbol, day)
+        columns = KINDS[kind]
+        sizes = []
+        for name, dtype in columns:
+            file = os.path.join(path, f'{name}.{dtype[1:]}')
+            sizes.append(os.path.getsize(file) // 8 if os.path.exists(file) else 0)
+        length = min(sizes)
+        if length == 0:
+            return _empty(columns)
+        return {
+            name: np.memmap(os.path.join(path, f'{name}.{dtype[1:]}'), dtype=dtype, mode='r', shape=(length,))
+            for name, dtype in columns
+        }
+
+    def query(self, symbol, start=None, end=None, kind='ticks'):
+        """
+        Lignes de [start, end[ pour un symbole, en colonnes NumPy.
+
+        start / end: epoch seconds, datetimes (naive = UTC) or ISO strings.
+        A range within one day is returned as views on the memory-mapped
+        files (no copy); a range spanning several days is concatenated.
+
+        Returns:
+            dict: {column: np.ndarray}, ts in epoch milliseconds
+        """
+        columns = KINDS[kind]
+        start_ms = _to_ms(start) if start is not None else None
+        end_ms = _to_ms(end) if end is not None else None
+        first_day = _day(start_ms) if start_ms is not None else None
+        last_day = _day(end_ms - 1) if end_ms is not None else None
+
+        parts = []
+        for day in self.days(symbol, kind):
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            data = self._read_day(kind, symbol, day)
+            ts = data['ts']
+            lo = int(np.searchsorted(ts, start_ms, side='left')) if start_ms is not None else 0
+            hi = int(np.searchsorted(ts, end_ms, side='left')) if end_ms is not None else len(ts)
+            if hi > lo:
+                parts.append({name: values[lo:hi] for name, values in data.items()})
+
+        if not parts:
+            return _empty(columns)
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([part[name] for part in parts]) for name, _ in columns}
+
+    def ticks(self, symbol, start=None, end=None):
+        return self.query(symbol, start, end, kind='ticks')
+
+    def bars(self, symbol, start=None, end=None):
+        return self.query(symbol, start, end, kind='bars_1m')
+
+    def daily_closes(self, symbol, start=None):
+        """
+        Clôture de chaque jour UTC: dernière barre 1 minute de chaque partition
+        (une ligne lue par jour).
+
+        Returns:
+            (np.ndarray datetime64[ns] at midnight, np.ndarray close)
+        """
+        first_day = _day(_to_ms(start)) if start is not None else None
+        dates, closes = [], []
+        for day in self.days(symbol, 'bars_1m'):
+            if first_day and day < first_day:
+                continue
+            close = self._read_day('bars_1m', symbol, day)['close']
+            if len(close):
+                dates.append(day)
+                closes.append(float(close[-1]))
+        return np.array(dates, dtype='datetime64[ns]'), np.array(closes, dtype=float)
+
+
+# Instance partagée, alimentée par le moteur de cotations et le tableau BVC (app.py)
+tick_store = TickStore()
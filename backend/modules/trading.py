@@ -1,50 +1,95 @@
 from flask import Blueprint, request, jsonify
 from extensions import db
 from models import Trade, Challenge
-import yfinance as yf
 from datetime import datetime
-from modules.bvc_scraper import get_bvc_price, BVCScraper
+import numpy as np
+from modules.bvc_scraper import BVCScraper
+from modules.quote_engine import quote_engine
+from modules.quote_cache import QuoteCache, ttl_for
+from modules.equity_engine import equity_engine
+from modules.leaderboard import ranking
+from modules.admin_stats import invalidate_admin_stats
+from modules.bvc_board import bvc_board
 
 trading_bp = Blueprint('trading', __name__)
 
-# Instance du scraper BVC
-bvc_scraper = BVCScraper()
-
-def get_live_price(symbol):
+def fetch_live_price(symbol):
     """
-    Récupère le prix en temps réel d'une action
+    Récupère le prix en temps réel d'une action (sans cache)
     Supporte:
     - Actions marocaines (BVC) : IAM, ATW, BCP, etc.
     - Cryptos : BTC-USD, ETH-USD
     - Actions US : AAPL, TSLA, etc.
     """
     
-    # 1. Actions marocaines (Bourse de Casablanca)
+    # 1. Actions marocaines (Bourse de Casablanca), lues dans le snapshot du tableau BVC
     if symbol.endswith('.MA'):
-        # Retirer le suffixe .MA
-        clean_symbol = symbol.replace('.MA', '')
-        price_data = bvc_scraper.get_stock_price(clean_symbol)
-        if price_data:
-            return price_data['price']
-        return None
+        return bvc_board.get_price(symbol)
     
     # Si le symbole est directement une action marocaine connue
     moroccan_stocks = ['IAM', 'ATW', 'BCP', 'CIH', 'GAZ', 'LHM', 'MNG', 'ONA', 'SAM', 'SNI', 'TQM', 'WAA']
     if symbol.upper() in moroccan_stocks:
-        price_data = bvc_scraper.get_stock_price(symbol)
-        if price_data:
-            return price_data['price']
-        return None
+        return bvc_board.get_price(symbol)
     
     # 2. Cryptos et actions US/internationales (via yfinance)
-    try:
-        ticker = yf.Ticker(symbol)
-        # fast_info is faster than history
-        price = ticker.fast_info['last_price']
-        return price
-    except Exception as e:
-        print(f"Error fetching price for {symbol}: {e}")
-        return None
+    # Réutilise le dernier tick du flux de prix s'il est récent, sinon requête groupée
+    return quote_engine.get_price(symbol)
+
+def fetch_live_prices(symbols):
+    """
+    Récupère les prix de plusieurs symboles en un lot (sans cache):
+    une requête groupée yfinance, et les actions BVC lues dans le snapshot du tableau
+    """
+    bvc_symbols = []
+    yf_symbols = []
+    for symbol in symbols:
+        if symbol.endswith('.MA') or symbol.upper() in BVCScraper.SYMBOL_MAP:
+            bvc_symbols.append(symbol)
+        else:
+            yf_symbols.append(symbol)
+
+    prices = {}
+    if bvc_symbols:
+        for symbol, quote in bvc_board.get_many(bvc_symbols).items():
+            prices[symbol] = quote['price']
+
+    for symbol, quote in quote_engine.fetch_quotes(yf_symbols).items():
+        prices[symbol] = quote['last']
+    return prices
+
+# Cache partagé: TTL par classe d'actif, stale-while-revalidate et single-flight
+quote_cache = QuoteCache(fetch_live_price, batch_loader=fetch_live_prices)
+
+def get_live_price(symbol):
+    """Prix en temps réel servi par le cache de cotations (affichage: peut être périmé)"""
+    return quote_cache.get(symbol)
+
+def get_execution_price(symbol):
+    """Prix d'exécution d'un trade: au plus un TTL de classe d'actif, sinon rechargé avant de répondre"""
+    return quote_cache.get(symbol, max_age=ttl_for(symbol))
+
+def get_live_prices(symbols):
+    """Prix de plusieurs symboles: un seul lot upstream pour les absents du cache"""
+    return quote_cache.get_many(symbols)
+
+def compute_unrealized_pnl(open_prices, current_prices, quantities, positions):
+    """
+    P&L latent de toutes les positions en une opération vectorisée
+
+    Long: (current - open) * qty, Short: (open - current) * qty.
+    Positions without a current price (NaN) get 0.
+    """
+    open_prices = np.asarray(open_prices, dtype=float)
+    current_prices = np.asarray(current_prices, dtype=float)
+    quantities = np.asarray(quantities, dtype=float)
+    sign = np.where(np.asarray(positions) == 'long', 1.0, -1.0)
+
+    pnl = (current_prices - open_prices) * quantities * sign
+    return np.where(np.isnan(current_prices), 0.0, pnl)
+
+def open_trades_query(challenge_id):
+    """Positions ouvertes d'un challenge (index (challenge_id, status))"""
+    return Trade.query.filter_by(challenge_id=challenge_id, status='open')
 
 @trading_bp.route('/api/trade', methods=['POST'])
 def place_trade():
@@ -59,7 +104,7 @@ def place_trade():
     if not challenge or challenge.status != 'active':
         return jsonify({"error": "Challenge not active"}), 400
 
-    current_price = get_live_price(symbol)
+    current_price = get_execution_price(symbol)
     if not current_price:
         return jsonify({"error": "Invalid symbol or price unavailable"}), 400
 
@@ -83,6 +128,7 @@ def place_trade():
     
     db.session.add(trade)
     db.session.commit()
+    equity_engine.on_trade_opened(trade)
     
     return jsonify({
         "message": "Trade executed", 
@@ -97,7 +143,9 @@ def close_trade(trade_id):
     if not trade or trade.status != 'open':
         return jsonify({"error": "Invalid trade"}), 400
         
-    current_price = get_live_price(trade.symbol)
+    current_price = get_execution_price(trade.symbol)
+    if not current_price:
+        return jsonify({"error": "Price unavailable"}), 400
     
     trade.close_price = current_price
     trade.status = 'closed'
@@ -120,6 +168,10 @@ def close_trade(trade_id):
     # Here we update equity on close.
     
     db.session.commit()
+    # Classement d'abord: une transition détectée par le moteur le corrige ensuite (challenge en session encore 'active')
+    ranking.update(challenge)
+    equity_engine.on_trade_closed(trade, challenge.current_equity)
+    invalidate_admin_stats()
     
     return jsonify({
         "message": "Trade closed", 
@@ -130,9 +182,48 @@ def close_trade(trade_id):
 
 @trading_bp.route('/api/trades/open/<int:challenge_id>', methods=['GET'])
 def get_open_trades(challenge_id):
-    """Get all open trades for a challenge"""
-    trades = Trade.query.filter_by(challenge_id=challenge_id, status='open').all()
-    
+    """
+    Get all open trades for a challenge
+
+    Query params:
+        - mode: 'bulk' (défaut) fetches each distinct symbol once in a single batch
+          and marks every position to market in one vectorized pass;
+          'sequential' keeps the one-price-per-trade loop
+    """
+    trades = open_trades_query(challenge_id).all()
+
+    if request.args.get('mode', 'bulk') == 'sequential':
+        return jsonify(_open_trades_sequential(trades))
+
+    prices = get_live_prices([trade.symbol for trade in trades])
+    current_prices = [prices.get(trade.symbol) for trade in trades]
+    positions = [getattr(trade, 'position', 'long') for trade in trades]
+
+    unrealized = compute_unrealized_pnl(
+        [trade.open_price for trade in trades],
+        [np.nan if price is None else price for price in current_prices],
+        [trade.quantity for trade in trades],
+        positions
+    ).tolist()
+
+    trades_data = []
+    for trade, current_price, position, unrealized_pnl in zip(trades, current_prices, positions, unrealized):
+        trades_data.append({
+            'id': trade.id,
+            'symbol': trade.symbol,
+            'type': trade.type,
+            'position': position,
+            'quantity': trade.quantity,
+            'open_price': trade.open_price,
+            'current_price': current_price,
+            'unrealized_pnl': unrealized_pnl,
+            'timestamp': trade.timestamp.isoformat() if trade.timestamp else None
+        })
+
+    return jsonify(trades_data)
+
+def _open_trades_sequential(trades):
+    """Ancien calcul: un prix et un P&L par trade"""
     trades_data = []
     for trade in trades:
         current_price = get_live_price(trade.symbol)
@@ -156,7 +247,7 @@ def get_open_trades(challenge_id):
             'timestamp': trade.timestamp.isoformat() if trade.timestamp else None
         })
     
-    return jsonify(trades_data)
+    return trades_data
 
 @trading_bp.route('/api/bvc/stocks', methods=['GET'])
 def get_bvc_stocks():
@@ -164,25 +255,29 @@ def get_bvc_stocks():
     Récupère la liste des actions marocaines disponibles avec leurs prix
     """
     try:
-        # Récupérer toutes les actions BVC disponibles
-        stocks_data = bvc_scraper.get_all_available_stocks()
+        # Toutes les actions du dernier snapshot du tableau BVC (rafraîchi en arrière-plan),
+        # formatées pour le frontend une fois par snapshot
+        def build(snapshot):
+            stocks_list = []
+            for symbol, data in snapshot.quotes.items():
+                stocks_list.append({
+                    'symbol': data['symbol'],
+                    'name': get_stock_name(symbol),
+                    'price': data['price'],
+                    'currency': data['currency'],
+                    'source': data['source'],
+                    'timestamp': data['timestamp']
+                })
+            return stocks_list
         
-        # Formater pour le frontend
-        stocks_list = []
-        for symbol, data in stocks_data.items():
-            stocks_list.append({
-                'symbol': data['symbol'],
-                'name': get_stock_name(symbol),
-                'price': data['price'],
-                'currency': data['currency'],
-                'source': data['source'],
-                'timestamp': data['timestamp']
-            })
+        stocks_list = bvc_board.cached('all-stocks', build)
+        snapshot = bvc_board.snapshot
         
         return jsonify({
             'status': 'success',
             'count': len(stocks_list),
-            'stocks': stocks_list
+            'stocks': stocks_list,
+            'snapshot': snapshot.metadata()
         })
     except Exception as e:
         return jsonify({
@@ -196,7 +291,7 @@ def get_bvc_stock_price(symbol):
     Récupère le prix d'une action marocaine spécifique
     """
     try:
-        price_data = bvc_scraper.get_stock_price(symbol.upper())
+        price_data = bvc_board.get(symbol)
         
         if price_data:
             return jsonify({
@@ -208,7 +303,8 @@ def get_bvc_stock_price(symbol):
                     'currency': price_data['currency'],
                     'source': price_data['source'],
                     'timestamp': price_data['timestamp']
-                }
+                },
+                'snapshot': bvc_board.snapshot.metadata()
             })
         else:
             return jsonify({
@@ -221,6 +317,11 @@ def get_bvc_stock_price(symbol):
             'message': str(e)
         }), 500
 
+@trading_bp.route('/api/trading/quote-cache/stats', methods=['GET'])
+def get_quote_cache_stats():
+    """Compteurs du cache de cotations (hits, misses, latence des rafraîchissements)"""
+    return jsonify(quote_cache.stats())
+
 def get_stock_name(symbol):
     """Retourne le nom complet de l'action"""
     names = {
@@ -1,56 +1,102 @@
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask import request
-import yfinance as yf
+from modules.quote_engine import quote_engine
+from modules.sentiment_stream import sentiment_stream
 import threading
 import time
 
 socketio = SocketIO(cors_allowed_origins="*")
 
-# Active subscriptions: {symbol: set(room_ids)}
-active_subscriptions = {}
-subscription_locks = {}
-
 def get_real_time_price(symbol):
     """Fetch current price from Yahoo Finance"""
-    try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period='1d', interval='1m')
-        if not data.empty:
-            current_price = float(data['Close'].iloc[-1])
-            open_price = float(data['Open'].iloc[0])
-            change = current_price - open_price
-            change_percent = (change / open_price) * 100 if open_price != 0 else 0
-            
-            return {
-                'symbol': symbol,
-                'price': round(current_price, 2),
-                'change': round(change, 2),
-                'changePercent': round(change_percent, 2),
-                'volume': int(data['Volume'].iloc[-1]) if 'Volume' in data else 0,
-                'high': round(float(data['High'].iloc[-1]), 2),
-                'low': round(float(data['Low'].iloc[-1]), 2),
-                'timestamp': time.time()
-            }
-    except Exception as e:
-        print(f"Error fetching price for {symbol}: {e}")
-        return None
-
-def price_stream_worker(symbol):
-    """Background worker for streaming prices to all subscribers"""
-    print(f"Starting price stream for {symbol}")
-    
-    while symbol in active_subscriptions and active_subscriptions[symbol]:
-        price_data = get_real_time_price(symbol)
-        
-        if price_data:
-            # Emit to all rooms subscribed to this symbol
-            rooms = list(active_subscriptions[symbol])
-            for room in rooms:
-                socketio.emit('price_update', price_data, room=room)
-        
-        time.sleep(1)  # Update every second
-    
-    print(f"Stopped price stream for {symbol}")
+    return quote_engine.fetch_quotes([symbol]).get(symbol)
+
+class PriceHub:
+    """
+    Shared price fan-out for every connected client.
+
+    One background task polls each subscribed symbol once per tick, keeps the
+    last quote in memory and broadcasts it once to the Socket.IO room named
+    after the symbol. Upstream calls and emits scale with the number of
+    symbols, not with the number of clients.
+    """
+
+    def __init__(self, socketio, interval=1.0):
+        self.socketio = socketio
+        self.interval = interval
+        self.subscribers = {}  # {symbol: set(sids)}
+        self.last_quotes = {}  # {symbol: price_data}
+        self._lock = threading.Lock()
+        self._running = False
+
+    def subscribe(self, sid, symbol):
+        """Register a client and return the cached quote (if any) for immediate delivery"""
+        with self._lock:
+            self.subscribers.setdefault(symbol, set()).add(sid)
+            start_worker = not self._running
+            self._running = True
+            count = len(self.subscribers[symbol])
+
+        if start_worker:
+            self.socketio.start_background_task(self._run)
+
+        return self.last_quotes.get(symbol), count
+
+    def unsubscribe(self, sid, symbol):
+        with self._lock:
+            self._discard(sid, symbol)
+
+    def unsubscribe_all(self, sid):
+        """Remove a client from every symbol; returns the symbols it was subscribed to"""
+        with self._lock:
+            symbols = [s for s, sids in self.subscribers.items() if sid in sids]
+            for symbol in symbols:
+                self._discard(sid, symbol)
+        return symbols
+
+    def _discard(self, sid, symbol):
+        sids = self.subscribers.get(symbol)
+        if sids is None:
+            return
+        sids.discard(sid)
+        if not sids:
+            # Nobody left: stop polling the symbol and drop its stale quote
+            del self.subscribers[symbol]
+            self.last_quotes.pop(symbol, None)
+
+    def active_symbols(self):
+        with self._lock:
+            return list(self.subscribers.keys())
+
+    def poll(self, symbols):
+        """Fetch every symbol with one bulk request; returns {symbol: price_data}"""
+        return quote_engine.fetch_quotes(symbols)
+
+    def _run(self):
+        """Background task: one upstream fetch and one room broadcast per symbol per tick"""
+        print("Starting price hub")
+
+        while True:
+            with self._lock:
+                if not self.subscribers:
+                    self._running = False
+                    break
+                symbols = list(self.subscribers.keys())
+
+            started = time.time()
+            quotes = self.poll(symbols)
+
+            for symbol, price_data in quotes.items():
+                # Skip symbols that lost their last subscriber during the fetch
+                if symbol in self.subscribers:
+                    self.last_quotes[symbol] = price_data
+                    self.socketio.emit('price_update', price_data, to=symbol)
+
+            self.socketio.sleep(max(0, self.interval - (time.time() - started)))
+
+        print("Stopped price hub")
+
+price_hub = PriceHub(socketio)
 
 @socketio.on('connect')
 def handle_connect():
@@ -66,69 +112,56 @@ def handle_connect():
 def handle_subscribe(data):
     """Handle client subscription to a symbol"""
     symbol = data.get('symbol', 'BTC-USD')
-    room = request.sid
-    
-    # Join the room
-    join_room(room)
-    
-    # Initialize subscription tracking
-    if symbol not in active_subscriptions:
-        active_subscriptions[symbol] = set()
-        subscription_locks[symbol] = threading.Lock()
-    
-    with subscription_locks[symbol]:
-        # Add client to subscriptions
-        was_empty = len(active_subscriptions[symbol]) == 0
-        active_subscriptions[symbol].add(room)
-        
-        # Start worker thread if this is the first subscriber
-        if was_empty:
-            thread = threading.Thread(target=price_stream_worker, args=(symbol,))
-            thread.daemon = True
-            thread.start()
-    
-    # Send immediate price update
-    price_data = get_real_time_price(symbol)
+
+    # One room per symbol: the hub broadcasts once to all its subscribers
+    join_room(symbol)
+    price_data, count = price_hub.subscribe(request.sid, symbol)
+
+    # Send the cached quote right away; the next tick covers a cold symbol
     if price_data:
-        emit('price_update', price_data, room=room)
-    
-    print(f'📊 Client {room} subscribed to {symbol} ({len(active_subscriptions[symbol])} total subscribers)')
+        emit('price_update', price_data)
+
+    print(f'📊 Client {request.sid} subscribed to {symbol} ({count} total subscribers)')
 
 @socketio.on('unsubscribe')
 def handle_unsubscribe(data):
     """Handle client unsubscription from a symbol"""
     symbol = data.get('symbol')
-    room = request.sid
-    
-    if symbol in active_subscriptions:
-        with subscription_locks[symbol]:
-            active_subscriptions[symbol].discard(room)
-            
-            # Clean up if no more subscribers
-            if not active_subscriptions[symbol]:
-                del active_subscriptions[symbol]
-                del subscription_locks[symbol]
-    
-    leave_room(room)
-    print(f'❌ Client {room} unsubscribed from {symbol}')
+
+    price_hub.unsubscribe(request.sid, symbol)
+    leave_room(symbol)
+    print(f'❌ Client {request.sid} unsubscribed from {symbol}')
+
+# Room of the clients following the macro sentiment score
+SENTIMENT_ROOM = 'macro_sentiment'
+
+def broadcast_sentiment(payload, previous):
+    """Sentiment stream listener: one emit to the room when the score crosses a band"""
+    socketio.emit('sentiment_update', {**payload, 'previous': previous['sentiment']}, to=SENTIMENT_ROOM)
+
+@socketio.on('subscribe_sentiment')
+def handle_subscribe_sentiment(data=None):
+    """Handle client subscription to the sentiment score band changes"""
+    join_room(SENTIMENT_ROOM)
+
+    # Current score right away, computed by the scheduler (never here)
+    if sentiment_stream.current:
+        emit('sentiment_update', sentiment_stream.current)
+
+    print(f'🎯 Client {request.sid} subscribed to sentiment updates')
+
+@socketio.on('unsubscribe_sentiment')
+def handle_unsubscribe_sentiment(data=None):
+    leave_room(SENTIMENT_ROOM)
+    print(f'❌ Client {request.sid} unsubscribed from sentiment updates')
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnect - clean up all subscriptions"""
-    room = request.sid
-    
-    # Clean up all subscriptions for this client
-    for symbol in list(active_subscriptions.keys()):
-        if symbol in subscription_locks:
-            with subscription_locks[symbol]:
-                active_subscriptions[symbol].discard(room)
-                
-                # Clean up if no more subscribers
-                if not active_subscriptions[symbol]:
-                    del active_subscriptions[symbol]
-                    del subscription_locks[symbol]
-    
-    print(f'🔌 Client disconnected: {room}')
+    # Socket.IO drops the client from its rooms itself
+    price_hub.unsubscribe_all(request.sid)
+
+    print(f'🔌 Client disconnected: {request.sid}')
 
 @socketio.on('ping')
 def handle_ping():
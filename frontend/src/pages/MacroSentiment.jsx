@@ -14,6 +14,7 @@ import {
     Target
 } from 'lucide-react';
 import AuthNavbar from '../components/AuthNavbar';
+import websocketService from '../services/websocket';
 import {
     Chart as ChartJS,
     CategoryScale,
@@ -34,6 +35,7 @@ const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000';
 const MacroSentiment = () => {
     const [indicators, setIndicators] = useState([]);
     const [sentimentScore, setSentimentScore] = useState(null);
+    const [sentimentHistory, setSentimentHistory] = useState(null);
     const [correlationData, setCorrelationData] = useState(null);
     const [selectedIndicator, setSelectedIndicator] = useState('^TNX');
     const [historicalData, setHistoricalData] = useState(null);
@@ -43,7 +45,16 @@ const MacroSentiment = () => {
     useEffect(() => {
         fetchMacroIndicators();
         fetchSentimentScore();
+        fetchSentimentHistory();
         fetchCorrelation();
+
+        // Score poussé par le serveur quand il change de bande
+        const onSentiment = (data) => {
+            setSentimentScore(data);
+            fetchSentimentHistory();
+        };
+        websocketService.subscribeSentiment(onSentiment);
+        return () => websocketService.unsubscribeSentiment(onSentiment);
     }, []);
 
     useEffect(() => {
@@ -74,6 +85,17 @@ const MacroSentiment = () => {
         }
     };
 
+    const fetchSentimentHistory = async (period = '3mo') => {
+        try {
+            const response = await axios.get(`${API_URL}/api/macro/sentiment-score/history/${period}`);
+            if (response.data.success) {
+                setSentimentHistory(response.data);
+            }
+        } catch (error) {
+            console.error('Error fetching sentiment history:', error);
+        }
+    };
+
     const fetchCorrelation = async (period = '6mo') => {
         try {
             const response = await axios.get(`${API_URL}/api/macro/correlation/${period}`);
@@ -102,11 +124,11 @@ const MacroSentiment = () => {
         if (!correlationData) return null;
 
         return {
-            labels: correlationData.spy_data.map(d => d.date),
+            labels: correlationData.series.dates,
             datasets: [
                 {
                     label: 'S&P 500 (SPY)',
-                    data: correlationData.spy_data.map(d => d.value),
+                    data: correlationData.series.spy,
                     borderColor: '#00ff9d',
                     backgroundColor: 'rgba(0, 255, 157, 0.1)',
                     tension: 0.4,
@@ -114,7 +136,7 @@ const MacroSentiment = () => {
                 },
                 {
                     label: 'US 10Y Treasury (TNX)',
-                    data: correlationData.tnx_data.map(d => d.value),
+                    data: correlationData.series.tnx,
                     borderColor: '#ff0055',
                     backgroundColor: 'rgba(255, 0, 85, 0.1)',
                     tension: 0.4,
@@ -128,11 +150,11 @@ const MacroSentiment = () => {
         if (!historicalData) return null;
 
         return {
-            labels: historicalData.data.map(d => d.date),
+            labels: historicalData.data.dates,
             datasets: [
                 {
                     label: historicalData.name,
-                    data: historicalData.data.map(d => d.close),
+                    data: historicalData.data.close,
                     borderColor: '#00ff9d',
                     backgroundColor: 'rgba(0, 255, 157, 0.2)',
                     tension: 0.4,
@@ -142,6 +164,25 @@ const MacroSentiment = () => {
         };
     };
 
+    const getSentimentHistoryChartData = () => {
+        if (!sentimentHistory) return null;
+
+        return {
+            labels: sentimentHistory.timestamps.map(t => t.slice(0, 10)),
+            datasets: [
+                {
+                    label: 'Score de sentiment',
+                    data: sentimentHistory.score,
+                    borderColor: '#FF8C00',
+                    backgroundColor: 'rgba(255, 140, 0, 0.1)',
+                    pointRadius: 0,
+                    tension: 0.2,
+                    fill: true
+                }
+            ]
+        };
+    };
+
     const chartOptions = {
         responsive: true,
         maintainAspectRatio: false,
@@ -249,6 +290,18 @@ const MacroSentiment = () => {
                                 </div>
                             </div>
                         </div>
+                        {getSentimentHistoryChartData() && (
+                            <div className="mt-6 h-40">
+                                <Line
+                                    data={getSentimentHistoryChartData()}
+                                    options={{
+                                        ...chartOptions,
+                                        plugins: { ...chartOptions.plugins, legend: { display: false } },
+                                        scales: { ...chartOptions.scales, y: { ...chartOptions.scales.y, min: 0, max: 100 } }
+                                    }}
+                                />
+                            </div>
+                        )}
                     </motion.div>
                 )}
 
@@ -5,6 +5,7 @@ class WebSocketService {
     constructor() {
         this.socket = null;
         this.subscribers = new Map(); // symbol -> array of callbacks
+        this.sentimentCallbacks = []; // macro sentiment score band changes
         this.isConnected = false;
     }
 
@@ -32,6 +33,9 @@ class WebSocketService {
             this.subscribers.forEach((callbacks, symbol) => {
                 this.socket.emit('subscribe', { symbol });
             });
+            if (this.sentimentCallbacks.length > 0) {
+                this.socket.emit('subscribe_sentiment');
+            }
         });
 
         this.socket.on('disconnect', (reason) => {
@@ -54,6 +58,16 @@ class WebSocketService {
             });
         });
 
+        this.socket.on('sentiment_update', (data) => {
+            this.sentimentCallbacks.forEach(callback => {
+                try {
+                    callback(data);
+                } catch (error) {
+                    console.error('Error in sentiment update callback:', error);
+                }
+            });
+        });
+
         this.socket.on('connect_error', (error) => {
             console.error('🔴 WebSocket connection error:', error);
         });
@@ -105,6 +119,28 @@ class WebSocketService {
         }
     }
 
+    // Current sentiment score on subscription, then every time it crosses a band
+    subscribeSentiment(callback) {
+        if (!this.socket) {
+            this.connect();
+        }
+
+        if (!this.sentimentCallbacks.includes(callback)) {
+            this.sentimentCallbacks.push(callback);
+        }
+
+        if (this.isConnected) {
+            this.socket.emit('subscribe_sentiment');
+        }
+    }
+
+    unsubscribeSentiment(callback) {
+        this.sentimentCallbacks = this.sentimentCallbacks.filter(cb => cb !== callback);
+        if (this.sentimentCallbacks.length === 0 && this.socket && this.isConnected) {
+            this.socket.emit('unsubscribe_sentiment');
+        }
+    }
+
     unsubscribeAll(symbol) {
         if (this.subscribers.has(symbol)) {
             this.subscribers.delete(symbol);
@@ -122,6 +158,7 @@ class WebSocketService {
             this.socket = null;
             this.isConnected = false;
             this.subscribers.clear();
+            this.sentimentCallbacks = [];
         }
     }
 